@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 import json
+import logging
+import os
 import re
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
 from models.schemas import LogEntry, LogLevel, PipelineState
+from utils.signal_scanner import scan_message
 
 
 SYSTEM_PROMPT = """\
@@ -48,6 +51,16 @@ LOG_PATTERNS = [
     ),
 ]
 
+log = logging.getLogger(__name__)
+
+# Lines no regex matched are parsed by the LLM this many per request, at most _get_llm_max_lines() per run
+LLM_CHUNK_LINES = 200
+
+
+def _get_llm_max_lines() -> int:
+    """Most lines per run parsed by the LLM; 0 sends every unmatched line."""
+    return int(os.getenv("CLASSIFIER_LLM_MAX_LINES", "2000"))
+
 LEVEL_MAP = {
     "critical": LogLevel.CRITICAL,
     "error": LogLevel.ERROR,
@@ -63,36 +76,50 @@ def _parse_level(raw: str) -> LogLevel:
     return LEVEL_MAP.get(raw.strip().lower(), LogLevel.UNKNOWN)
 
 
-def _try_regex_parse(lines: list[str]) -> list[LogEntry] | None:
-    """Try to parse all lines with regex. Returns None if any line fails."""
+def _regex_parse(lines: list[str]) -> tuple[list[LogEntry], list[tuple[int, str]]]:
+    """Parse lines with regex. Returns (entries, (line_number, line) of every line no pattern matched)."""
     entries = []
+    unmatched = []
     for i, line in enumerate(lines, start=1):
         line = line.strip()
         if not line:
             continue
-        matched = False
         for pattern in LOG_PATTERNS:
             m = pattern.match(line)
             if m:
+                message = m.group("message").strip()
                 entries.append(
                     LogEntry(
                         line_number=i,
                         timestamp=m.group("timestamp").strip(),
                         level=_parse_level(m.group("level")),
                         service=m.group("service") or "unknown",
-                        message=m.group("message").strip(),
+                        message=message,
                         raw=line,
+                        signals=scan_message(message),
                     )
                 )
-                matched = True
                 break
-        if not matched:
-            return None  # Fall back to LLM
-    return entries
-
-
-def _parse_llm_response(response_text: str, raw_lines: list[str]) -> list[LogEntry]:
-    """Parse the LLM JSON response into LogEntry objects."""
+        else:
+            unmatched.append((i, line))
+    return entries, unmatched
+
+
+def _unparsed_entry(line_number: int, line: str) -> LogEntry:
+    """Entry for a line kept as it is, without an LLM parse."""
+    return LogEntry(
+        line_number=line_number,
+        timestamp="",
+        level=LogLevel.UNKNOWN,
+        service="unknown",
+        message=line,
+        raw=line,
+        signals=scan_message(line),
+    )
+
+
+def _parse_llm_response(response_text: str, raw_lines: dict[int, str]) -> list[LogEntry]:
+    """Parse the LLM JSON response into LogEntry objects (raw_lines maps line numbers to lines)."""
     # Strip markdown code fences if present
     text = response_text.strip()
     if text.startswith("```"):
@@ -103,40 +130,70 @@ def _parse_llm_response(response_text: str, raw_lines: list[str]) -> list[LogEnt
     entries = []
     for item in parsed:
         line_num = item.get("line_number", 0)
-        raw = ""
-        if 1 <= line_num <= len(raw_lines):
-            raw = raw_lines[line_num - 1].strip()
+        raw = raw_lines.get(line_num, "").strip()
+        message = item.get("message", "")
         entries.append(
             LogEntry(
                 line_number=line_num,
                 timestamp=item.get("timestamp", ""),
                 level=_parse_level(item.get("level", "UNKNOWN")),
                 service=item.get("service", "unknown"),
-                message=item.get("message", ""),
-                raw=raw or item.get("message", ""),
+                message=message,
+                raw=raw or message,
+                signals=scan_message(message),
             )
         )
     return entries
 
 
+def _llm_parse(unmatched: list[tuple[int, str]], llm) -> list[LogEntry]:
+    """Parse lines the regexes missed with the LLM, LLM_CHUNK_LINES lines per request.
+
+    Lines beyond CLASSIFIER_LLM_MAX_LINES (logged as a warning), and chunks
+    whose response is not valid JSON, are kept as UNKNOWN entries.
+    """
+    max_lines = _get_llm_max_lines() or len(unmatched)
+    if len(unmatched) > max_lines:
+        log.warning(
+            "%d lines match no known log format; only the first %d are parsed by the LLM, "
+            "the rest are kept as UNKNOWN without timestamp (raise CLASSIFIER_LLM_MAX_LINES)",
+            len(unmatched), max_lines,
+        )
+    entries = []
+    for start in range(0, min(len(unmatched), max_lines), LLM_CHUNK_LINES):
+        chunk = unmatched[start:min(start + LLM_CHUNK_LINES, max_lines)]
+        numbered = "\n".join(f"{n}: {line}" for n, line in chunk)
+        response = llm.invoke([
+            SystemMessage(content=SYSTEM_PROMPT),
+            HumanMessage(
+                content="Parse these log lines. Each starts with its line number and a colon; "
+                f"use that number as line_number.\n\n{numbered}"
+            ),
+        ])
+        try:
+            entries.extend(_parse_llm_response(response.content, dict(chunk)))
+        except (json.JSONDecodeError, AttributeError, TypeError):
+            entries.extend(_unparsed_entry(n, line) for n, line in chunk)
+    entries.extend(_unparsed_entry(n, line) for n, line in unmatched[max_lines:])
+    return entries
+
+
 def run(state: dict, llm) -> dict:
-    """Classify raw logs into structured entries."""
+    """Classify raw logs into structured entries.
+
+    Lines in a known format are parsed with regexes; only the lines that are
+    not go to the LLM, in chunks, so one odd line does not send a whole file
+    to it in a single prompt.
+    """
     raw_logs: str = state["raw_logs"]
-    lines = raw_logs.splitlines()
-    non_empty = [l for l in lines if l.strip()]
+    non_empty = [l for l in raw_logs.splitlines() if l.strip()]
 
     if not non_empty:
         return {"log_entries": [], "current_agent": "log_classifier"}
 
-    # Try fast regex parsing first
-    entries = _try_regex_parse(non_empty)
-    if entries is not None:
-        return {"log_entries": [e.model_dump() for e in entries], "current_agent": "log_classifier"}
-
-    # Fall back to LLM for non-standard formats
-    response = llm.invoke([
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=f"Parse these log lines:\n\n{raw_logs}"),
-    ])
-    entries = _parse_llm_response(response.content, lines)
+    # Fast regex parsing first, LLM fallback for non-standard lines
+    entries, unmatched = _regex_parse(non_empty)
+    if unmatched:
+        entries.extend(_llm_parse(unmatched, llm))
+        entries.sort(key=lambda e: e.line_number)
     return {"log_entries": [e.model_dump() for e in entries], "current_agent": "log_classifier"}
@@ -1,4 +1,4 @@
-"""Notification Agent — formats and sends Slack notifications."""
+"""Notification Agent — formats Slack notifications and queues them for delivery."""
 
 from __future__ import annotations
 
@@ -7,7 +7,7 @@ import os
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
-from utils.slack_client import send_slack_message
+from utils import slack_outbox
 
 
 def _get_channel() -> str:
@@ -34,7 +34,7 @@ Return ONLY the notification text (Slack markdown). No JSON wrapping.
 
 
 def run(state: dict, llm) -> dict:
-    """Format a Slack notification and optionally send it."""
+    """Format a Slack notification and queue it in the Slack outbox (delivered in the background)."""
     issues = state.get("issues", [])
     cookbook = state.get("cookbook", "")
 
@@ -80,15 +80,17 @@ def run(state: dict, llm) -> dict:
         ],
     }
 
-    # Try to send via Slack webhook
-    sent, mode = send_slack_message(payload)
+    # Delivery is asynchronous: coalesced, deduplicated by issue, rate limited and retried by the outbox.
+    # "sent" therefore means handed to the outbox ("queued") or already notified ("deduplicated"),
+    # not that Slack confirmed this message.
+    mode = slack_outbox.notify(payload, issues)
 
     return {
         "notification": {
             "channel": _get_channel(),
             "summary": summary_text,
             "payload": payload,
-            "sent": sent,
+            "sent": mode in ("queued", "deduplicated"),
             "mode": mode,
         },
         "current_agent": "notification",
@@ -2,21 +2,33 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
+import math
+import os
 import re
 from collections import defaultdict
 from datetime import datetime
 
+import numpy as np
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from utils import risk_state
+from utils.baselines import load_baselines, observations
+from utils.signal_scanner import METRIC_NAMES, entry_signals
+
 
 SYSTEM_PROMPT = """\
 You are a Predictive Risk Agent for a DevOps incident analysis pipeline.
 
 You receive detected escalation signals from log analysis. Each signal includes:
 - The service affected
-- The type of signal (frequency_acceleration, numeric_trend, known_pattern)
+- The type of signal (frequency_acceleration, numeric_trend, known_pattern, stream_escalation)
 - Supporting evidence (specific log entries and values)
+- For numeric trends: the fitted slope, and an estimated time until the metric reaches its limit
+- For frequency acceleration: event rates before/after the detected change point and the rate increase
+- For stream escalation: short- vs long-term event rates accumulated across previous log files
+- Optionally a `baseline`: how far the signal sits above what is normal for the service at that hour of day
 
 Your job is to assess each signal and predict what will happen next if no action is taken.
 
@@ -27,6 +39,7 @@ For each risk prediction, return:
 - evidence: list of evidence strings (log excerpts, values)
 - preventive_action: concrete step to prevent escalation
 - time_horizon: "minutes", "hours", or "eventual"
+- metric: for a prediction based on a numeric_trend signal, that signal's metric; otherwise ""
 
 Risk level guidelines:
 - HIGH: Imminent failure likely (accelerating errors, resources near exhaustion)
@@ -37,25 +50,35 @@ Return a JSON array. If no risks are predicted, return [].
 Do NOT wrap the JSON in markdown code fences. Return ONLY valid JSON.
 """
 
-# Regex patterns for extracting numeric values from log messages
-NUMERIC_PATTERNS = {
-    "disk_percent": re.compile(r"(\d+)%"),
-    "latency_ms": re.compile(r"(\d+)\s*ms"),
-    "retry_count": re.compile(r"retry\s*(\d+)", re.IGNORECASE),
-    "pool_usage": re.compile(r"(\d+)/(\d+)\s*connections?", re.IGNORECASE),
-    "rate_value": re.compile(r"(\d+)/(\d+)\s*req", re.IGNORECASE),
+# Frequency acceleration: bucket width, minimum events, minimum rate increase,
+# and (significance level, CUSUM threshold) per RISK_ACCEL_SENSITIVITY
+ACCEL_BUCKET_SECONDS = 60
+ACCEL_MIN_EVENTS = 4
+ACCEL_MIN_RATE_INCREASE = 2.0
+ACCEL_EVIDENCE_BUCKETS = 20
+ACCEL_SENSITIVITY = {
+    "low": (0.001, 5.0),
+    "medium": (0.01, 4.0),
+    "high": (0.05, 3.0),
 }
 
-# Known escalation pattern signatures
-KNOWN_PATTERNS = {
-    "brute_force": re.compile(
-        r"(failed.*(?:auth|login|credentials)|brute\s*force|locked|failed\s*attempts)",
-        re.IGNORECASE,
-    ),
-    "disk_critical": re.compile(r"disk.*(\d+)%", re.IGNORECASE),
-    "pool_exhaustion": re.compile(r"(connection\s*pool|pool\s*utilization)", re.IGNORECASE),
-    "circuit_breaker": re.compile(r"(circuit\s*breaker|retries?\s*exhausted)", re.IGNORECASE),
-}
+# Signals whose most anomalous hour stays within this many standard deviations
+# of the service's baseline for that hour of day are suppressed
+BASELINE_SUPPRESS_Z = 2.0
+
+# Known patterns backed by a metric are scored on that metric, everything else on level counts
+PATTERN_METRICS = {"disk_critical": "disk_percent", "pool_exhaustion": "pool_usage"}
+
+# Level at which a metric is exhausted, used for time-to-threshold extrapolation
+METRIC_THRESHOLDS = {"disk_percent": 100.0, "pool_usage": 100.0, "rate_value": 100.0}
+
+# Trend detection: minimum readings, minimum rise (last vs first) unless the
+# metric reaches its threshold within a day, minimum slope/time correlation
+# (only meaningful from 3 readings), EWMA smoothing
+MIN_TREND_POINTS = 2
+MIN_RELATIVE_RISE = 0.1
+MIN_TREND_CORRELATION = 0.6
+EWMA_ALPHA = 0.5
 
 
 def _parse_timestamp(ts: str) -> datetime | None:
@@ -66,94 +89,304 @@ def _parse_timestamp(ts: str) -> datetime | None:
         return None
 
 
-def _detect_frequency_acceleration(entries_by_service: dict[str, list[dict]]) -> list[dict]:
-    """Detect services where WARN/ERROR entries are arriving at an increasing rate."""
-    signals = []
-
+def _get_sensitivity() -> tuple[float, float]:
+    """(significance level, CUSUM threshold) for the configured acceleration sensitivity."""
+    level = os.getenv("RISK_ACCEL_SENSITIVITY", "medium").lower()
+    return ACCEL_SENSITIVITY.get(level, ACCEL_SENSITIVITY["medium"])
+
+
+def _binomial_sf(k: int, n: int, p: float) -> float:
+    """P(X >= k) for X ~ Binomial(n, p); exact for small n, normal approximation above."""
+    if k <= 0:
+        return 1.0
+    if k > n:
+        return 0.0
+    if n > 1000:
+        mean, sd = n * p, math.sqrt(n * p * (1 - p))
+        return 0.5 * math.erfc((k - 0.5 - mean) / (sd * math.sqrt(2))) if sd > 0 else float(k <= mean)
+    log_p, log_q = math.log(p), math.log1p(-p)
+    return min(1.0, sum(
+        math.exp(math.lgamma(n + 1) - math.lgamma(i + 1) - math.lgamma(n - i + 1) + i * log_p + (n - i) * log_q)
+        for i in range(k, n + 1)
+    ))
+
+
+def _cusum_change_point(counts: np.ndarray, baseline: float, threshold: float) -> int | None:
+    """Upward CUSUM over bucket counts. Returns the bucket where the shift began, or None."""
+    drift = max(0.5 * baseline, 0.5)
+    limit = threshold * math.sqrt(max(baseline, 1.0))
+    score, start = 0.0, 0
+    for i, x in enumerate(counts):
+        score = max(0.0, score + x - baseline - drift)
+        if score == 0.0:
+            start = i + 1
+        elif score > limit:
+            return start
+    return None
+
+
+def _bucket_counts(entries_by_service: dict[str, list[dict]]) -> dict[str, tuple[float, np.ndarray]]:
+    """Per-service event counts in fixed ACCEL_BUCKET_SECONDS buckets, in one linear pass.
+
+    Returns {service: (first timestamp, counts per bucket)}.
+    """
+    services: list[str] = []
+    svc_ids: list[int] = []
+    times: list[float] = []
     for service, entries in entries_by_service.items():
-        timestamps = []
+        idx = len(services)
+        services.append(service)
         for e in entries:
             dt = _parse_timestamp(e.get("timestamp", ""))
             if dt:
-                timestamps.append((dt, e))
-        timestamps.sort(key=lambda x: x[0])
+                svc_ids.append(idx)
+                times.append(dt.timestamp())
+    if not times:
+        return {}
+
+    ids = np.asarray(svc_ids, dtype=np.int64)
+    t = np.asarray(times, dtype=np.float64)
+    t0 = np.full(len(services), np.inf)
+    np.minimum.at(t0, ids, t)
+    buckets = ((t - t0[ids]) // ACCEL_BUCKET_SECONDS).astype(np.int64)
+    n_buckets = np.zeros(len(services), dtype=np.int64)
+    np.maximum.at(n_buckets, ids, buckets + 1)
+    offsets = np.concatenate(([0], np.cumsum(n_buckets)[:-1]))
+    flat = np.bincount(offsets[ids] + buckets, minlength=int(n_buckets.sum()))
+
+    return {
+        services[i]: (float(t0[i]), flat[offsets[i]:offsets[i] + n_buckets[i]])
+        for i in np.unique(ids)
+    }
 
-        if len(timestamps) < 3:
+
+def _detect_frequency_acceleration(entries_by_service: dict[str, list[dict]]) -> list[dict]:
+    """Detect services whose WARN/ERROR rate shifted upward (CUSUM + Poisson rate-ratio test)."""
+    alpha, cusum_threshold = _get_sensitivity()
+    signals = []
+
+    for service, (t0, counts) in _bucket_counts(entries_by_service).items():
+        total = int(counts.sum())
+        if total < ACCEL_MIN_EVENTS or len(counts) < 3:
             continue
 
-        # Compute gaps between consecutive entries
-        gaps = []
-        for i in range(1, len(timestamps)):
-            gap = (timestamps[i][0] - timestamps[i - 1][0]).total_seconds()
-            gaps.append(gap)
-
-        # Check if gaps are decreasing (acceleration)
-        if len(gaps) >= 2:
-            decreasing = sum(1 for i in range(1, len(gaps)) if gaps[i] < gaps[i - 1])
-            if decreasing >= len(gaps) // 2 and decreasing >= 1:
-                evidence = [
-                    f"Event gaps: {[f'{g:.0f}s' for g in gaps]}",
-                    f"Latest entries: {[e.get('message', '')[:80] for _, e in timestamps[-3:]]}",
-                ]
-                signals.append({
-                    "service": service,
-                    "signal_type": "frequency_acceleration",
-                    "evidence": evidence,
-                    "entry_count": len(timestamps),
-                })
+        # Locate the shift with CUSUM against the first half's rate; fall back to the midpoint
+        half = len(counts) // 2
+        split = _cusum_change_point(counts, float(counts[:half].mean()), cusum_threshold)
+        if not split or split >= len(counts):
+            split = half
+
+        before, after = int(counts[:split].sum()), int(counts[split:].sum())
+        n_before, n_after = split, len(counts) - split
+        # Conditional on the total, events after the split are Binomial under a constant rate
+        p_value = _binomial_sf(after, total, n_after / len(counts))
+        rate_before = before / n_before * 60 / ACCEL_BUCKET_SECONDS
+        rate_after = after / n_after * 60 / ACCEL_BUCKET_SECONDS
+        increase = rate_after / max(rate_before, 0.5 / n_before * 60 / ACCEL_BUCKET_SECONDS)
+
+        if p_value >= alpha or increase < ACCEL_MIN_RATE_INCREASE:
+            continue
+
+        change_at = datetime.fromtimestamp(t0 + split * ACCEL_BUCKET_SECONDS).strftime("%Y-%m-%d %H:%M:%S")
+        signals.append({
+            "service": service,
+            "signal_type": "frequency_acceleration",
+            "evidence": [
+                f"{rate_before:.2f}/min before {change_at} vs {rate_after:.2f}/min after "
+                f"({increase:.1f}x increase, p={p_value:.2g})",
+                f"Events per {ACCEL_BUCKET_SECONDS}s bucket: {counts[-ACCEL_EVIDENCE_BUCKETS:].tolist()}",
+            ],
+            "entry_count": total,
+            "rate_before_per_min": round(rate_before, 3),
+            "rate_after_per_min": round(rate_after, 3),
+            "rate_increase": round(increase, 2),
+            "p_value": float(f"{p_value:.3g}"),
+            "change_point": change_at,
+        })
 
     return signals
 
 
-def _detect_numeric_trends(entries_by_service: dict[str, list[dict]]) -> list[dict]:
-    """Extract numeric values from log messages and detect upward trends."""
-    signals = []
+def _collect_series(entries_by_service: dict[str, list[dict]]) -> tuple[list[tuple[str, str]], np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten timestamped metric readings into (keys, series_ids, times, values) arrays."""
+    keys: list[tuple[str, str]] = []
+    key_index: dict[tuple[str, str], int] = {}
+    ids: list[int] = []
+    times: list[float] = []
+    values: list[float] = []
 
     for service, entries in entries_by_service.items():
-        # Collect numeric values per pattern
-        pattern_values: dict[str, list[tuple[str, float]]] = defaultdict(list)
-
         for e in entries:
-            msg = e.get("message", "")
-            ts = e.get("timestamp", "")
-
-            for name, pattern in NUMERIC_PATTERNS.items():
-                match = pattern.search(msg)
-                if match:
-                    try:
-                        val = float(match.group(1))
-                        pattern_values[name].append((ts, val))
-                    except (ValueError, IndexError):
-                        pass
-
-        # Check for upward trends (at least 2 values, last > first)
-        for name, values in pattern_values.items():
-            if len(values) >= 2:
-                first_val = values[0][1]
-                last_val = values[-1][1]
-                if last_val > first_val:
-                    signals.append({
-                        "service": service,
-                        "signal_type": "numeric_trend",
-                        "metric": name,
-                        "evidence": [
-                            f"{name}: {first_val} -> {last_val} (trending up)",
-                            f"From entries at {values[0][0]} to {values[-1][0]}",
-                        ],
-                    })
+            dt = _parse_timestamp(e.get("timestamp", ""))
+            if dt is None:
+                continue
+            signals = entry_signals(e)
+            for name in METRIC_NAMES:
+                value = signals.get(name)
+                if value is None:
+                    continue
+                key = (service, name)
+                if key not in key_index:
+                    key_index[key] = len(keys)
+                    keys.append(key)
+                ids.append(key_index[key])
+                times.append(dt.timestamp())
+                values.append(value)
+
+    return (
+        keys,
+        np.asarray(ids, dtype=np.int64),
+        np.asarray(times, dtype=np.float64),
+        np.asarray(values, dtype=np.float64),
+    )
+
+
+def _trend_stats(ids: np.ndarray, times: np.ndarray, values: np.ndarray, n_series: int) -> dict[str, np.ndarray]:
+    """Per-series least-squares slope, correlation and EWMA level, computed in bulk.
+
+    Every series id in [0, n_series) must have at least one reading. All
+    series are processed at once with grouped sums (`np.bincount`), so the
+    cost is one sort plus a handful of linear passes over every reading.
+    """
+    # Readings arrive in log order, so a stable (radix, for < 65536 series) sort by
+    # series id usually leaves each series time-ordered; fall back to a full lexsort
+    key_dtype = np.uint16 if n_series <= np.iinfo(np.uint16).max else np.int64
+    order = np.argsort(ids.astype(key_dtype), kind="stable")
+    ids, times, values = ids[order], times[order], values[order]
+    if np.any((np.diff(times) < 0) & (np.diff(ids) == 0)):
+        order = np.lexsort((times, ids))
+        ids, times, values = ids[order], times[order], values[order]
+
+    n = np.bincount(ids, minlength=n_series).astype(np.float64)
+    starts = np.concatenate(([0], np.cumsum(n)[:-1])).astype(np.int64)
+    ends = starts + n.astype(np.int64) - 1
+
+    # Center time per series (seconds since its first reading) for numerical stability
+    t = times - times[starts[ids]]
+    y = values
+
+    def group_sum(w: np.ndarray) -> np.ndarray:
+        return np.bincount(ids, weights=w, minlength=n_series)
+
+    st, sy = group_sum(t), group_sum(y)
+    stt, sty, syy = group_sum(t * t), group_sum(t * y), group_sum(y * y)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_t = n * stt - st * st
+        var_y = n * syy - sy * sy
+        cov = n * sty - st * sy
+        slope = np.where(var_t > 0, cov / var_t, np.nan)
+        corr = np.where((var_t > 0) & (var_y > 0), cov / np.sqrt(var_t * var_y), 0.0)
+
+        # EWMA of the latest level: weight (1 - alpha)^(readings after this one)
+        rank = np.arange(len(ids)) - starts[ids]
+        weights = (1.0 - EWMA_ALPHA) ** (n[ids] - 1 - rank)
+        ewma = group_sum(weights * y) / group_sum(weights)
+
+    return {
+        "count": n,
+        "slope": slope,
+        "corr": corr,
+        "ewma": ewma,
+        "first_value": y[starts],
+        "last_value": y[ends],
+        "span": t[ends],
+    }
+
+
+def _time_horizon(seconds: float | None) -> str:
+    """Map an estimated time-to-threshold onto the agent's time_horizon vocabulary."""
+    if seconds is None:
+        return "unknown"
+    if seconds <= 3600:
+        return "minutes"
+    if seconds <= 86400:
+        return "hours"
+    return "eventual"
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 90:
+        return f"~{seconds:.0f} s"
+    if seconds < 5400:
+        return f"~{seconds / 60:.0f} min"
+    return f"~{seconds / 3600:.1f} h"
+
+
+def _detect_numeric_trends(entries_by_service: dict[str, list[dict]]) -> list[dict]:
+    """Detect sustained upward metric trends and extrapolate time-to-threshold."""
+    keys, ids, times, values = _collect_series(entries_by_service)
+    if not keys:
+        return []
+
+    stats = _trend_stats(ids, times, values, len(keys))
+    thresholds = np.array([METRIC_THRESHOLDS.get(name, np.nan) for _, name in keys])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eta = np.maximum((thresholds - stats["ewma"]) / stats["slope"], 0.0)
+    rising = stats["last_value"] > stats["first_value"] * (1 + MIN_RELATIVE_RISE)
+    near_limit = eta <= 86400  # NaN (no threshold) compares False
+
+    trending = np.flatnonzero(
+        (stats["count"] >= MIN_TREND_POINTS)
+        & (stats["slope"] > 0)
+        & (stats["corr"] >= MIN_TREND_CORRELATION)
+        & (stats["last_value"] > stats["first_value"])
+        & (rising | near_limit)
+    )
+
+    signals = []
+    for i in trending:
+        service, name = keys[i]
+        slope = float(stats["slope"][i])
+        level = float(stats["ewma"][i])
+        evidence = [
+            f"{name}: {stats['first_value'][i]:g} -> {stats['last_value'][i]:g} "
+            f"over {_format_duration(float(stats['span'][i]))} "
+            f"({slope * 60:+.2f}/min, r={stats['corr'][i]:.2f}, EWMA {level:.1f})",
+        ]
+
+        eta_i = None if np.isnan(eta[i]) else float(eta[i])
+        if eta_i == 0.0:
+            evidence.append(f"{name} already at or above its limit of {thresholds[i]:g}")
+        elif eta_i is not None:
+            evidence.append(f"{name} hits {thresholds[i]:g} in {_format_duration(eta_i)} at the current rate")
+
+        signals.append({
+            "service": service,
+            "signal_type": "numeric_trend",
+            "metric": name,
+            "evidence": evidence,
+            "slope_per_min": round(slope * 60, 4),
+            "eta_seconds": round(eta_i) if eta_i is not None else None,
+            "time_horizon": _time_horizon(eta_i),
+        })
 
     return signals
 
 
+def _trend_horizon(item: dict, service: str, horizons: dict[tuple[str, str], str]) -> str | None:
+    """Computed horizon of the numeric trend a prediction is based on, if any.
+
+    The trend is the prediction's `metric`, or a trending metric of the
+    service that its evidence names.
+    """
+    metric = item.get("metric") or ""
+    if (service, metric) in horizons:
+        return horizons[service, metric]
+    evidence = " ".join(str(e) for e in item.get("evidence", []))
+    named = [h for (svc, name), h in horizons.items() if svc == service and name in evidence]
+    return named[0] if len(named) == 1 else None
+
+
 def _detect_known_patterns(entries_by_service: dict[str, list[dict]]) -> list[dict]:
     """Match against known escalation signatures."""
     signals = []
 
     for service, entries in entries_by_service.items():
+        scanned = [(e, entry_signals(e)) for e in entries]
+
         # Brute force: 3+ auth failures in service's entries
-        auth_failures = [
-            e for e in entries if KNOWN_PATTERNS["brute_force"].search(e.get("message", ""))
-        ]
+        auth_failures = [e for e, sig in scanned if sig.get("brute_force")]
         if len(auth_failures) >= 3:
             signals.append({
                 "service": service,
@@ -166,58 +399,44 @@ def _detect_known_patterns(entries_by_service: dict[str, list[dict]]) -> list[di
             })
 
         # Disk usage > 80%
-        for e in entries:
-            disk_match = KNOWN_PATTERNS["disk_critical"].search(e.get("message", ""))
-            if disk_match:
-                try:
-                    pct = int(disk_match.group(1))
-                    if pct > 80:
-                        signals.append({
-                            "service": service,
-                            "signal_type": "known_pattern",
-                            "pattern": "disk_critical",
-                            "evidence": [
-                                f"Disk usage at {pct}% (threshold: 80%)",
-                                f"Entry: {e.get('message', '')[:80]}",
-                            ],
-                        })
-                        break  # One signal per service per pattern
-                except (ValueError, IndexError):
-                    pass
+        for e, sig in scanned:
+            pct = sig.get("disk_critical", 0)
+            if pct > 80:
+                signals.append({
+                    "service": service,
+                    "signal_type": "known_pattern",
+                    "pattern": "disk_critical",
+                    "evidence": [
+                        f"Disk usage at {pct}% (threshold: 80%)",
+                        f"Entry: {e.get('message', '')[:80]}",
+                    ],
+                })
+                break  # One signal per service per pattern
 
         # Connection pool > 75%
-        for e in entries:
-            pool_match = KNOWN_PATTERNS["pool_exhaustion"].search(e.get("message", ""))
-            if pool_match:
-                # Try to extract ratio
-                ratio_match = re.search(r"(\d+)/(\d+)", e.get("message", ""))
-                if ratio_match:
-                    try:
-                        current = int(ratio_match.group(1))
-                        total = int(ratio_match.group(2))
-                        if total > 0 and (current / total) > 0.75:
-                            signals.append({
-                                "service": service,
-                                "signal_type": "known_pattern",
-                                "pattern": "pool_exhaustion",
-                                "evidence": [
-                                    f"Pool at {current}/{total} ({100 * current // total}%)",
-                                    f"Entry: {e.get('message', '')[:80]}",
-                                ],
-                            })
-                            break
-                    except (ValueError, IndexError):
-                        pass
+        for e, sig in scanned:
+            current, total = sig.get("pool_exhaustion", (0, 0))
+            if total > 0 and (current / total) > 0.75:
+                signals.append({
+                    "service": service,
+                    "signal_type": "known_pattern",
+                    "pattern": "pool_exhaustion",
+                    "evidence": [
+                        f"Pool at {current}/{total} ({100 * current // total}%)",
+                        f"Entry: {e.get('message', '')[:80]}",
+                    ],
+                })
+                break
 
         # Circuit breaker / retries exhausted
-        for e in entries:
-            if KNOWN_PATTERNS["circuit_breaker"].search(e.get("message", "")):
+        for e, sig in scanned:
+            if sig.get("circuit_breaker"):
                 signals.append({
                     "service": service,
                     "signal_type": "known_pattern",
                     "pattern": "circuit_breaker",
                     "evidence": [
-                        f"Circuit breaker or retry exhaustion detected",
+                        "Circuit breaker or retry exhaustion detected",
                         f"Entry: {e.get('message', '')[:80]}",
                     ],
                 })
@@ -226,6 +445,101 @@ def _detect_known_patterns(entries_by_service: dict[str, list[dict]]) -> list[di
     return signals
 
 
+def _detect_stream_escalation(entries_by_service: dict[str, list[dict]]) -> list[dict]:
+    """Update persisted per-service state and flag services escalating across runs."""
+    events_by_service: dict[str, list[tuple[float, str, dict[str, float]]]] = defaultdict(list)
+    for service, entries in entries_by_service.items():
+        occurrences: dict[str, int] = defaultdict(int)
+        for e in entries:
+            dt = _parse_timestamp(e.get("timestamp", ""))
+            if dt is None:
+                continue
+            # The n-th copy of a line: a burst of identical lines counts in full, while
+            # re-reading the same lines (a re-analyzed file) still yields the same keys
+            raw = e.get("raw") or e.get("message", "")
+            occurrences[raw] += 1
+            key = hashlib.blake2b(f"{occurrences[raw]}\0{raw}".encode(), digest_size=8).hexdigest()
+            sig = entry_signals(e)
+            metrics = {name: sig[name] for name in METRIC_NAMES if name in sig}
+            events_by_service[service].append((dt.timestamp(), key, metrics))
+
+    signals = []
+    for service, state in sorted(risk_state.observe(events_by_service).items()):
+        if not state.is_escalating():
+            continue
+        short_rate, long_rate = state.rates()
+        evidence = [
+            f"Event rate {short_rate:.2f}/min over the last ~{risk_state.SHORT_HALF_LIFE // 60} min "
+            f"vs {long_rate:.2f}/min long-term ({short_rate / max(long_rate, 1e-9):.1f}x)",
+            f"{state.events} events seen across runs; mean gap {state.gap_mean:.0f}s ± {state.gap_std():.0f}s",
+        ]
+        for name, history in sorted(state.metrics.items()):
+            if len(history) >= 2:
+                evidence.append(f"Recent {name}: {[round(v, 1) for _, v in history[-5:]]}")
+        signals.append({
+            "service": service,
+            "signal_type": "stream_escalation",
+            "evidence": evidence,
+            "rate_ratio": round(short_rate / max(long_rate, 1e-9), 2),
+        })
+
+    return signals
+
+
+def _baseline_score(signal: dict, hours: dict[int, list[dict]], baselines) -> dict | None:
+    """Score a signal's most anomalous hour in this run against the service's baseline."""
+    service = signal["service"]
+    metric = signal.get("metric") or PATTERN_METRICS.get(signal.get("pattern", ""))
+    best = None
+    for hour, buckets in hours.items():
+        for bucket in buckets:
+            if metric:
+                if metric not in bucket["metrics"]:
+                    continue
+                value = bucket["metrics"][metric]
+                scores = [({"metric": metric, "value": value}, baselines.metric_score(service, hour, metric, value))]
+            else:
+                scores = [
+                    ({"level": level, "value": count}, baselines.level_score(service, hour, level, count))
+                    for level, count in bucket["levels"].items()
+                ]
+            for observed, score in scores:
+                if score and (best is None or score["z_score"] > best["z_score"]):
+                    best = {**observed, "hour": hour, **score}
+    return best
+
+
+def _apply_baselines(signals: list[dict], entries_by_service: dict[str, list[dict]]) -> tuple[list[dict], list[dict]]:
+    """Attach baseline scores to signals and drop the ones within the service's normal range.
+
+    Returns (kept, suppressed). Signals without enough history are kept unscored.
+    """
+    baselines = load_baselines()
+    hours_by_service: dict[str, dict[int, list[dict]]] = defaultdict(dict)
+    for (service, hour), buckets in observations(
+        [e for entries in entries_by_service.values() for e in entries]
+    ).items():
+        hours_by_service[service][hour] = buckets
+
+    kept, suppressed = [], []
+    for signal in signals:
+        score = _baseline_score(signal, hours_by_service.get(signal["service"], {}), baselines)
+        if score is None:
+            kept.append(signal)
+            continue
+        signal["baseline"] = score
+        if score["z_score"] <= BASELINE_SUPPRESS_Z:
+            suppressed.append(signal)
+            continue
+        subject = score.get("metric") or f"{score['level']} count"
+        signal["evidence"] = signal["evidence"] + [
+            f"{subject} {score['value']:g} at {score['hour']:02d}:00 vs usual {score['mean']:g} ± {score['std']:g} "
+            f"(z={score['z_score']:.1f}, p{score['percentile']:.0f}, {score['samples']} past hours)"
+        ]
+        kept.append(signal)
+    return kept, suppressed
+
+
 def run(state: dict, llm) -> dict:
     """Detect escalation signals and predict risks."""
     log_entries = state.get("log_entries", [])
@@ -244,15 +558,20 @@ def run(state: dict, llm) -> dict:
     if not entries_by_service:
         return {"risk_predictions": [], "current_agent": "predictive_risk"}
 
-    # Run all three detectors
+    # Run all detectors
     freq_signals = _detect_frequency_acceleration(entries_by_service)
     trend_signals = _detect_numeric_trends(entries_by_service)
     pattern_signals = _detect_known_patterns(entries_by_service)
+    stream_signals = _detect_stream_escalation(entries_by_service)
 
-    all_signals = freq_signals + trend_signals + pattern_signals
+    # Drop signals that are normal for the service at this hour of day
+    all_signals, suppressed = _apply_baselines(
+        freq_signals + trend_signals + pattern_signals + stream_signals, entries_by_service
+    )
+    trend_signals = [s for s in all_signals if s["signal_type"] == "numeric_trend"]
 
     if not all_signals:
-        return {"risk_predictions": [], "current_agent": "predictive_risk"}
+        return {"risk_predictions": [], "risk_suppressed": suppressed, "current_agent": "predictive_risk"}
 
     # Send to LLM for risk assessment
     signals_text = json.dumps(all_signals, indent=2, default=str)
@@ -274,10 +593,18 @@ def run(state: dict, llm) -> dict:
     except json.JSONDecodeError:
         return {
             "risk_predictions": [],
+            "risk_suppressed": suppressed,
             "error": f"Predictive risk agent returned invalid JSON: {text[:200]}",
             "current_agent": "predictive_risk",
         }
 
+    # Deterministic time-to-threshold beats the LLM's guess for predictions based on a numeric trend
+    computed_horizons = {
+        (sig["service"], sig["metric"]): sig["time_horizon"]
+        for sig in trend_signals
+        if sig["time_horizon"] != "unknown"
+    }
+
     # Normalize output
     predictions = []
     for item in parsed:
@@ -285,13 +612,14 @@ def run(state: dict, llm) -> dict:
         if risk_raw not in {"HIGH", "MEDIUM", "LOW"}:
             risk_raw = "MEDIUM"
 
+        service = item.get("service", "unknown")
         predictions.append({
-            "service": item.get("service", "unknown"),
+            "service": service,
             "risk_level": risk_raw,
             "prediction": item.get("prediction", ""),
             "evidence": item.get("evidence", []),
             "preventive_action": item.get("preventive_action", ""),
-            "time_horizon": item.get("time_horizon", "unknown"),
+            "time_horizon": _trend_horizon(item, service, computed_horizons) or item.get("time_horizon", "unknown"),
         })
 
-    return {"risk_predictions": predictions, "current_agent": "predictive_risk"}
+    return {"risk_predictions": predictions, "risk_suppressed": suppressed, "current_agent": "predictive_risk"}
@@ -3,20 +3,38 @@
 from __future__ import annotations
 
 import json
+import os
 import re
-from collections import defaultdict
-from datetime import datetime
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from utils.correlation import TIME_WINDOW, correlate, parse_timestamp
+from utils.service_graph import ESTABLISHED_EDGE_COUNT, GRAPH_CHAIN_SOURCE, ServiceGraph, load_graph
+
+# Weight of learned dependency support added on top of the correlation score
+GRAPH_WEIGHT = 0.2
+
+# Events kept per cluster in the prompt (first/last, first per service, most severe)
+MAX_REPRESENTATIVES = 8
+
+MESSAGE_CHARS = 200
+
+
+def _get_max_candidates() -> int:
+    return int(os.getenv("RCA_MAX_CANDIDATES", "5"))
+
+
+def _get_token_budget() -> int:
+    return int(os.getenv("RCA_TOKEN_BUDGET", "6000"))
 
-# Default time window (seconds) for grouping related events
-TIME_WINDOW = 60
 
 SYSTEM_PROMPT = """\
 You are a Root Cause Correlator Agent for a DevOps incident analysis pipeline.
 
-You receive clusters of temporally-close, cross-referenced log events.
+You receive ranked clusters of correlated log events. Each cluster lists the
+services involved, how the events are linked (temporal proximity, service
+references, shared request IDs) and a representative sample of its events;
+`omitted_events` tells you how many similar events were left out.
 Your job is to identify directed causal chains — which event caused which.
 
 For each causal chain you find, return:
@@ -37,116 +55,157 @@ Do NOT wrap the JSON in markdown code fences. Return ONLY valid JSON.
 """
 
 
-def _parse_timestamp(ts: str) -> datetime | None:
-    """Parse a YYYY-MM-DD HH:MM:SS timestamp. Returns None on failure."""
-    try:
-        return datetime.strptime(ts.strip(), "%Y-%m-%d %H:%M:%S")
-    except (ValueError, AttributeError):
+def _apply_dependency_graph(candidates: list[dict], graph: ServiceGraph) -> tuple[list[dict], list[dict]]:
+    """Boost clusters backed by known service dependencies and drop ones the graph rules out.
+
+    Returns (kept, pruned).
+    """
+    known = graph.known_services()
+    kept, pruned = [], []
+    for cluster in candidates:
+        services = cluster["services"]
+        support = graph.support(services)
+        explicit = cluster["links"]["service_ref"] + cluster["links"]["request_id"]
+        if support == 0 and explicit == 0 and len(services) > 1 and set(services) <= known:
+            pruned.append(cluster)  # Well-known services never seen affecting each other
+            continue
+        graph_score = round(support / (support + ESTABLISHED_EDGE_COUNT), 3)
+        cluster["score_breakdown"]["dependency_graph"] = graph_score
+        cluster["score"] = round(cluster["score"] + GRAPH_WEIGHT * graph_score, 3)
+        kept.append(cluster)
+    kept.sort(key=lambda c: (-c["score"], min(e.get("line_number", 0) for e in c["entries"])))
+    return kept, pruned
+
+
+def _representatives(cluster: dict) -> list[dict]:
+    """Pick a compact, time-ordered sample: first/last event, first per service, most severe."""
+    entries = cluster["entries"]
+    picked: dict[int, dict] = {}
+
+    def pick(entry: dict) -> None:
+        if len(picked) < MAX_REPRESENTATIVES:
+            picked.setdefault(id(entry), entry)
+
+    pick(entries[0])
+    pick(entries[-1])
+    seen_services = set()
+    for entry in entries:
+        if entry.get("service") not in seen_services:
+            seen_services.add(entry.get("service"))
+            pick(entry)
+    for level in ("CRITICAL", "ERROR"):
+        for entry in entries:
+            if entry.get("level") == level:
+                pick(entry)
+
+    return [
+        {
+            "line_number": e.get("line_number", 0),
+            "timestamp": e.get("timestamp", ""),
+            "level": e.get("level", ""),
+            "service": e.get("service", ""),
+            "message": e.get("message", "")[:MESSAGE_CHARS],
+        }
+        for e in entries
+        if id(e) in picked
+    ]
+
+
+def _estimate_tokens(obj) -> int:
+    """Rough token estimate (~4 characters per token) of the JSON the LLM will see."""
+    return len(json.dumps(obj, default=str)) // 4
+
+
+def _summarize_cluster(cluster: dict, rank: int) -> dict:
+    """Compact description of a candidate for the pruning record."""
+    return {
+        "rank": rank,
+        "score": cluster["score"],
+        "services": cluster["services"],
+        "events": len(cluster["entries"]),
+        "start": cluster["start"],
+        "end": cluster["end"],
+    }
+
+
+def _select_candidates(candidates: list[dict], max_candidates: int, token_budget: int) -> tuple[list[dict], dict]:
+    """Keep the top-k clusters that fit the token budget, as representative events.
+
+    Returns (prompt clusters, pruning record). The best cluster is always kept.
+    """
+    selected, sent, dropped = [], [], []
+    used = 0
+    for rank, cluster in enumerate(candidates, start=1):
+        if len(selected) >= max_candidates:
+            dropped.append({**_summarize_cluster(cluster, rank), "reason": "top_k"})
+            continue
+        events = _representatives(cluster)
+        compact = {
+            "rank": rank,
+            "score": cluster["score"],
+            "services": cluster["services"],
+            "links": cluster["links"],
+            "start": cluster["start"],
+            "end": cluster["end"],
+            "events": events,
+            "omitted_events": len(cluster["entries"]) - len(events),
+        }
+        cost = _estimate_tokens(compact)
+        if selected and used + cost > token_budget:
+            dropped.append({**_summarize_cluster(cluster, rank), "reason": "token_budget"})
+            continue
+        selected.append(compact)
+        sent.append(_summarize_cluster(cluster, rank))
+        used += cost
+
+    record = {
+        "max_candidates": max_candidates,
+        "token_budget": token_budget,
+        "estimated_tokens": used,
+        "sent": sent,
+        "dropped": dropped,
+    }
+    return selected, record
+
+
+def _chain_from_graph(cluster: dict, graph: ServiceGraph) -> dict | None:
+    """Build a HIGH-confidence chain when every hop is a well-established edge with a plausible lag."""
+    first_events: dict[str, dict] = {}
+    for entry in cluster["entries"]:
+        first_events.setdefault(entry.get("service", "unknown"), entry)
+    path = list(first_events)
+    if len(path) < 2:
         return None
 
-
-def _build_time_groups(entries: list[dict], window: int = TIME_WINDOW) -> list[list[dict]]:
-    """Group entries that fall within `window` seconds of each other."""
-    # Sort by timestamp
-    timed = []
-    for e in entries:
-        dt = _parse_timestamp(e.get("timestamp", ""))
-        if dt:
-            timed.append((dt, e))
-    timed.sort(key=lambda x: x[0])
-
-    if not timed:
-        return []
-
-    groups: list[list[dict]] = []
-    current_group = [timed[0][1]]
-    group_start = timed[0][0]
-
-    for dt, entry in timed[1:]:
-        if (dt - group_start).total_seconds() <= window:
-            current_group.append(entry)
-        else:
-            if len(current_group) >= 2:
-                groups.append(current_group)
-            current_group = [entry]
-            group_start = dt
-
-    if len(current_group) >= 2:
-        groups.append(current_group)
-
-    return groups
-
-
-def _find_cross_references(entries: list[dict], all_services: set[str]) -> list[list[dict]]:
-    """Find entries that mention other services in their message text."""
-    cross_ref_clusters: dict[str, set[int]] = defaultdict(set)
-
-    for i, entry in enumerate(entries):
-        msg = entry.get("message", "").lower()
-        entry_service = entry.get("service", "").lower()
-        for svc in all_services:
-            if svc.lower() != entry_service and svc.lower() in msg:
-                # This entry references another service
-                cross_ref_clusters[svc.lower()].add(i)
-                cross_ref_clusters[entry_service].add(i)
-
-    # Build clusters of cross-referencing entries
-    if not cross_ref_clusters:
-        return []
-
-    seen: set[int] = set()
-    clusters = []
-    for indices in cross_ref_clusters.values():
-        cluster_indices = indices - seen
-        if len(cluster_indices) >= 2:
-            cluster = [entries[i] for i in sorted(cluster_indices) if i < len(entries)]
-            if len(cluster) >= 2:
-                clusters.append(cluster)
-                seen.update(cluster_indices)
-
-    return clusters
-
-
-def _merge_candidates(time_groups: list[list[dict]], cross_refs: list[list[dict]]) -> list[list[dict]]:
-    """Merge time-window groups with cross-reference clusters. Prefer clusters that appear in both."""
-    if not time_groups and not cross_refs:
-        return []
-
-    # Use all candidates, deduplicate by entry line numbers
-    candidates = []
-    seen_sets: list[set[int]] = []
-
-    # Cross-referenced groups that also overlap temporally are strongest
-    for cluster in cross_refs:
-        line_nums = {e.get("line_number", 0) for e in cluster}
-        for tg in time_groups:
-            tg_lines = {e.get("line_number", 0) for e in tg}
-            overlap = line_nums & tg_lines
-            if len(overlap) >= 2:
-                merged = {e.get("line_number", 0): e for e in cluster + tg}
-                merged_entries = list(merged.values())
-                merged_set = set(merged.keys())
-                if merged_set not in seen_sets:
-                    candidates.append(merged_entries)
-                    seen_sets.append(merged_set)
-
-    # If no overlap, use cross-refs (stronger signal than time alone)
-    if not candidates:
-        for cluster in cross_refs:
-            line_nums = {e.get("line_number", 0) for e in cluster}
-            if line_nums not in seen_sets:
-                candidates.append(cluster)
-                seen_sets.append(line_nums)
-
-    # Add time groups that aren't already covered
-    if not candidates:
-        for tg in time_groups:
-            line_nums = {e.get("line_number", 0) for e in tg}
-            if line_nums not in seen_sets:
-                candidates.append(tg)
-                seen_sets.append(line_nums)
-
-    return candidates
+    for src, dst in zip(path, path[1:]):
+        if not graph.is_established(src, dst):
+            return None
+        t_src = parse_timestamp(first_events[src].get("timestamp", ""))
+        t_dst = parse_timestamp(first_events[dst].get("timestamp", ""))
+        mean_lag = graph.mean_lag(src, dst)
+        if t_src and t_dst and mean_lag is not None:
+            if (t_dst - t_src).total_seconds() > max(3 * mean_lag, TIME_WINDOW):
+                return None
+
+    events = [
+        {
+            "service": svc,
+            "event": first_events[svc].get("message", ""),
+            "timestamp": first_events[svc].get("timestamp", ""),
+            "line_number": first_events[svc].get("line_number", 0),
+        }
+        for svc in path
+    ]
+    seen = min(graph.count(src, dst) for src, dst in zip(path, path[1:]))
+    return {
+        "chain": events,
+        "root_cause": events[0]["event"],
+        "blast_radius": len(path),
+        "affected_services": path,
+        "confidence": "HIGH",
+        "summary": f"{' → '.join(path)} cascade matching a dependency seen in {seen}+ past incidents.",
+        "source": GRAPH_CHAIN_SOURCE,
+    }
 
 
 def run(state: dict, llm) -> dict:
@@ -168,17 +227,39 @@ def run(state: dict, llm) -> dict:
     all_services = {e.get("service", "") for e in log_entries if e.get("service", "")}
     all_services.discard("unknown")
 
-    # Deterministic: time-window grouping + service cross-referencing
-    time_groups = _build_time_groups(actionable)
-    cross_refs = _find_cross_references(actionable, all_services)
-    candidates = _merge_candidates(time_groups, cross_refs)
+    # Deterministic: event graph (time, service references, request IDs) → ranked clusters
+    candidates = correlate(actionable, all_services)
+
+    # Learned service dependencies: rescore/prune, and confirm well-known chains without the LLM
+    graph = load_graph()
+    candidates, graph_pruned = _apply_dependency_graph(candidates, graph)
+    graph_chains = []
+    remaining = []
+    for cluster in candidates:
+        chain = _chain_from_graph(cluster, graph)
+        if chain:
+            graph_chains.append(chain)
+        else:
+            remaining.append(cluster)
+
+    # Top-k under a token budget, as representative events; record what was dropped
+    selected, pruning = _select_candidates(remaining, _get_max_candidates(), _get_token_budget())
+    pruning["candidates_total"] = len(candidates) + len(graph_pruned)
+    pruning["graph_confirmed"] = len(graph_chains)
+    pruning["graph_pruned"] = [
+        {**_summarize_cluster(c, 0), "reason": "dependency_graph"} for c in graph_pruned
+    ]
 
-    if not candidates:
-        return {"causal_chains": [], "current_agent": "root_cause"}
+    if not selected:
+        return {"causal_chains": graph_chains, "rca_pruning": pruning, "current_agent": "root_cause"}
 
     # Send candidates to LLM for causal reasoning
-    candidates_text = json.dumps(candidates, indent=2, default=str)
-    issues_text = json.dumps(issues[:10], indent=2, default=str) if issues else "[]"
+    candidates_text = json.dumps(selected, indent=2, default=str)
+    issues_context = [
+        {"issue": i.get("issue", ""), "severity": i.get("severity", ""), "source_entries": i.get("source_entries", [])}
+        for i in issues[:10]
+    ]
+    issues_text = json.dumps(issues_context, indent=2, default=str)
 
     response = llm.invoke([
         SystemMessage(content=SYSTEM_PROMPT),
@@ -200,13 +281,14 @@ def run(state: dict, llm) -> dict:
         parsed = json.loads(text)
     except json.JSONDecodeError:
         return {
-            "causal_chains": [],
+            "causal_chains": graph_chains,
+            "rca_pruning": pruning,
             "error": f"Root cause agent returned invalid JSON: {text[:200]}",
             "current_agent": "root_cause",
         }
 
     # Normalize output
-    chains = []
+    chains = list(graph_chains)
     for item in parsed:
         confidence_raw = item.get("confidence", "MEDIUM").upper()
         if confidence_raw not in {"HIGH", "MEDIUM", "LOW"}:
@@ -229,6 +311,7 @@ def run(state: dict, llm) -> dict:
             "affected_services": affected,
             "confidence": confidence_raw,
             "summary": item.get("summary", ""),
+            "source": "llm",
         })
 
-    return {"causal_chains": chains, "current_agent": "root_cause"}
+    return {"causal_chains": chains, "rca_pruning": pruning, "current_agent": "root_cause"}
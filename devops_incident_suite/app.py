@@ -4,9 +4,8 @@ from __future__ import annotations
 
 import sys
 import os
-import threading
 import time
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
 import streamlit as st
 
@@ -15,8 +14,21 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from graph import run_pipeline
 from models.schemas import Severity
-from utils.watcher import start_watcher, stop_watcher
-from utils.results_store import save_result, load_results, SEVERITY_ORDER
+from utils import compressed, job_store
+from utils.entry_index import EntryIndex
+from utils.results_store import (
+    save_result, query_results, range_totals, daily_totals, issue_rollups, load_result, search,
+    SEVERITY_ORDER,
+)
+from worker import STALE_HEALTH_SECONDS, load_health
+
+# Incidents shown per dashboard page, log entries per Log Entries page, history search hits
+DASHBOARD_PAGE_SIZE = 25
+LOG_PAGE_SIZE = 200
+SEARCH_LIMIT = 50
+
+# Largest decompressed upload analyzed in the UI; bigger archives go to live_logs/ (analyzed in slices)
+MAX_UPLOAD_TEXT_BYTES = 256 * 1024 * 1024
 
 
 # --- Page Config ---
@@ -81,36 +93,39 @@ with st.sidebar:
 
     st.divider()
 
-    # --- Live Folder Watcher ---
+    # --- Worker Daemon (python -m worker) ---
     st.subheader("Live Folder Watcher")
 
     _app_dir = os.path.dirname(os.path.abspath(__file__))
-    _watch_dir = os.path.join(_app_dir, "live_logs")
-    _processed_dir = os.path.join(_watch_dir, "processed")
-
-    watcher_on = st.toggle("Enable Watcher", value=True)
-
-    if watcher_on:
-        # Start watcher if not already running
-        if "watcher_stop_event" not in st.session_state:
-            stop_event = threading.Event()
-            thread = threading.Thread(
-                target=start_watcher,
-                args=(_watch_dir, _processed_dir, stop_event),
-                daemon=True,
+    _processed_dir = os.path.join(_app_dir, "live_logs", "processed")
+
+    health = load_health()
+    if health and health["status"] == "running" and time.time() - health["heartbeat_at"] < STALE_HEALTH_SECONDS:
+        st.markdown(f":green[Worker daemon running] — {health['processes']} processes, pid {health['pid']}")
+        wcol1, wcol2 = st.columns(2)
+        wcol1.metric("Workers busy", f"{sum(1 for w in health['workers'] if w['current'])}/{health['processes']}")
+        wcol2.metric("Files / min", f"{health['files_per_minute']:.1f}")
+        st.caption(
+            f"Utilization {health['utilization']:.0%} · {health['jobs_done']} done, "
+            f"{health['jobs_failed']} failed since start"
+        )
+        if health["follow_patterns"]:
+            st.caption(f"Following (tail -F): {', '.join(health['follow_patterns'])}")
+        ingest = health.get("ingest")
+        if ingest:
+            st.caption(
+                f"HTTP ingest: {ingest['lines_per_second']:.0f} lines/s · {ingest['pending_batches']} batches pending · "
+                f"{ingest['rejected']} pushes refused (429)"
+            )
+        slack = health.get("slack")
+        if slack:
+            st.caption(
+                f"Slack: {slack['sent']} messages sent for {slack['queued']} notifications · "
+                f"{slack['deduplicated']} deduplicated · {slack['pending']} pending · {slack['failed']} failed"
             )
-            thread.start()
-            st.session_state["watcher_stop_event"] = stop_event
-            st.session_state["watcher_thread"] = thread
-        st.markdown(":green[Watching live_logs/]")
     else:
-        # Stop watcher if running
-        if "watcher_stop_event" in st.session_state:
-            stop_watcher(st.session_state["watcher_stop_event"])
-            st.session_state["watcher_thread"].join(timeout=10)
-            del st.session_state["watcher_stop_event"]
-            del st.session_state["watcher_thread"]
-        st.markdown(":gray[Stopped]")
+        st.markdown(":gray[Worker daemon not running]")
+        st.caption("Start it with `python -m worker` to process files dropped into live_logs/.")
 
     # Show processed file count
     processed_count = 0
@@ -118,13 +133,28 @@ with st.sidebar:
         processed_count = len([f for f in os.listdir(_processed_dir) if f.endswith(".results.json")])
     st.metric("Files processed", processed_count)
 
+    job_counts = job_store.counts()
+    st.caption(
+        f"Jobs: {job_counts['queued']} queued · {job_counts['running']} running · "
+        f"{job_counts['done']} done · {job_counts['failed']} dead-lettered"
+    )
+    dead = job_store.dead_letters()
+    if dead:
+        with st.expander(f"Dead-lettered files ({len(dead)})"):
+            for job in dead:
+                st.markdown(f"**{job['filename']}** — {job['attempts']} attempts")
+                st.caption(job["last_error"] or "")
+                if st.button("Retry", key=f"retry_job_{job['id']}"):
+                    job_store.retry(job["id"])
+                    st.rerun()
+
 
 # --- File Upload ---
 
 uploaded_file = st.file_uploader(
     "Upload a log file",
-    type=["log", "txt", "csv", "json"],
-    help="Supported formats: plain text logs, CSV, JSON",
+    type=["log", "txt", "csv", "json", "gz", "zst"],
+    help="Supported formats: plain text logs, CSV, JSON, also compressed as .gz or .zst",
 )
 
 # Determine which content to analyze
@@ -133,7 +163,11 @@ file_name = None
 _source = None
 
 if uploaded_file is not None:
-    raw_logs = uploaded_file.read().decode("utf-8", errors="replace")
+    try:
+        raw_logs = compressed.read_text(uploaded_file, uploaded_file.name, MAX_UPLOAD_TEXT_BYTES)
+    except Exception as e:
+        st.error(f"Could not read {uploaded_file.name}: {e}. Large archives can be dropped into live_logs/ instead.")
+        st.stop()
     file_name = uploaded_file.name
     _source = "upload"
 elif "sample_content" in st.session_state:
@@ -193,43 +227,84 @@ with dcol1:
 with dcol2:
     to_date = st.date_input("To", value=_today, min_value=_min_date, max_value=_today)
 
-# Load and display filtered results
-dashboard_results = load_results(from_date, to_date)
-
-# Summary metrics
-total_incidents = len(dashboard_results)
-total_issues = sum(len(r.get("issues", [])) for r in dashboard_results)
-total_crit_high = sum(
-    1 for r in dashboard_results
-    for issue in r.get("issues", [])
-    if issue.get("severity") in ("CRITICAL", "HIGH")
-)
-total_chains = sum(len(r.get("causal_chains", [])) for r in dashboard_results)
+# Summary metrics (from the results index; payloads are only read on "Load Full Results")
+totals = range_totals(from_date, to_date)
 
 mc1, mc2, mc3, mc4 = st.columns(4)
-mc1.metric("Total Incidents", total_incidents)
-mc2.metric("Total Issues", total_issues)
-mc3.metric("CRITICAL / HIGH", total_crit_high)
-mc4.metric("Causal Chains", total_chains)
+mc1.metric("Total Incidents", totals["incidents"])
+mc2.metric("Total Issues", totals["issues"])
+mc3.metric("CRITICAL / HIGH", totals["critical_high"])
+mc4.metric("Causal Chains", totals["chains"])
+
+# Trends (per-day rollups)
+if totals["incidents"]:
+    with st.expander("Trends", expanded=False):
+        days = daily_totals(from_date, to_date)
+        st.markdown("**Incidents and issues per day**")
+        st.line_chart(
+            {
+                "day": [d["day"] for d in days],
+                "Incidents": [d["incidents"] for d in days],
+                "Issues": [d["issues"] for d in days],
+                "CRITICAL / HIGH": [d["critical_high"] for d in days],
+            },
+            x="day",
+        )
+        tcol1, tcol2 = st.columns(2)
+        with tcol1:
+            st.markdown("**Issues by severity**")
+            by_severity = issue_rollups(from_date, to_date, by="severity")
+            if by_severity:
+                st.bar_chart(by_severity, x="day", y="issues", color="severity")
+        with tcol2:
+            st.markdown("**Issues by service**")
+            by_service = issue_rollups(from_date, to_date, by="service")
+            if by_service:
+                st.bar_chart(by_service, x="day", y="issues", color="service")
+
+# Full-text search across all stored incidents
+scol1, scol2 = st.columns([3, 1])
+with scol1:
+    search_text = st.text_input(
+        "Search history", placeholder='e.g. "SSL handshake timeout" — log messages, issues, root causes, tickets'
+    )
+with scol2:
+    search_service = st.text_input("Service", placeholder="any")
+if search_text:
+    hits = search(search_text, service=search_service.strip() or None, limit=SEARCH_LIMIT)
+    st.caption(f"{len(hits)} match(es){' (showing newest ' + str(SEARCH_LIMIT) + ')' if len(hits) == SEARCH_LIMIT else ''}")
+    for i, hit in enumerate(hits):
+        hcol1, hcol2 = st.columns([6, 1])
+        line_ref = f" line {hit['line_number']}" if hit["line_number"] else ""
+        hcol1.markdown(
+            f"`{hit['processed_at'][:19].replace('T', ' ')}` **{hit['filename']}**{line_ref} — "
+            f"`{hit['kind']}` [{hit['service']}] {hit['snippet']}"
+        )
+        if hcol2.button("Open", key=f"search_open_{i}"):
+            full = load_result(hit["result_file"])
+            if full is None:
+                st.error("Result payload is missing or unreadable.")
+            else:
+                st.session_state["result"] = full
+                st.session_state["focus_line"] = hit["line_number"] or None
+                st.rerun()
+
+n_pages = max(1, -(-totals["incidents"] // DASHBOARD_PAGE_SIZE))
+page = 1
+if n_pages > 1:
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+dashboard_results = query_results(
+    from_date, to_date, limit=DASHBOARD_PAGE_SIZE, offset=(page - 1) * DASHBOARD_PAGE_SIZE
+)
 
 # Incident rows
 if dashboard_results:
     for idx, dr in enumerate(dashboard_results):
-        fname = dr.get("filename", "unknown")
-        processed_at = dr.get("processed_at", "unknown")
-        source = dr.get("source", "unknown")
-        n_issues = len(dr.get("issues", []))
-        n_chains = len(dr.get("causal_chains", []))
-        n_risks = len(dr.get("risk_predictions", []))
-        proc_time = dr.get("processing_time_seconds", "?")
-
-        # Highest severity
-        issues = dr.get("issues", [])
-        highest = min(
-            (i.get("severity", "LOW") for i in issues),
-            key=lambda s: SEVERITY_ORDER.get(s, 4),
-            default=None,
-        )
+        fname = dr["filename"]
+        processed_at = dr["processed_at"]
+        source = dr["source"]
+        proc_time = dr["processing_time_seconds"] if dr["processing_time_seconds"] is not None else "?"
+        highest = dr["highest_severity"]
 
         sev_icon = {"CRITICAL": "🔴", "HIGH": "🟠", "MEDIUM": "🟡", "LOW": "🟢"}.get(highest, "⚪")
         source_badge = {"upload": "upload", "sample": "sample", "watcher": "watcher"}.get(source, source)
@@ -246,24 +321,25 @@ if dashboard_results:
 
         with st.expander(f"{sev_icon} **{fname}** — {display_time} — `{source_badge}`", expanded=is_loaded):
             st.markdown(
-                f"**Issues:** {n_issues} | "
-                f"**Causal Chains:** {n_chains} | "
-                f"**Risk Predictions:** {n_risks} | "
+                f"**Issues:** {dr['issue_count']} | "
+                f"**Causal Chains:** {dr['chain_count']} | "
+                f"**Risk Predictions:** {dr['risk_count']} | "
                 f"**Processing Time:** {proc_time}s"
             )
 
             # Severity distribution
-            sev_counts = {}
-            for issue in issues:
-                s = issue.get("severity", "LOW")
-                sev_counts[s] = sev_counts.get(s, 0) + 1
-            if sev_counts:
-                dist_parts = [f"{k}: {v}" for k, v in sorted(sev_counts.items(), key=lambda x: SEVERITY_ORDER.get(x[0], 4))]
+            sev_counts = {sev: dr[f"{sev.lower()}_count"] for sev in SEVERITY_ORDER}
+            dist_parts = [f"{k}: {v}" for k, v in sev_counts.items() if v]
+            if dist_parts:
                 st.caption(f"Severity breakdown: {' | '.join(dist_parts)}")
 
-            if st.button("Load Full Results", key=f"dash_load_{idx}"):
-                st.session_state["result"] = dr
-                st.rerun()
+            if st.button("Load Full Results", key=f"dash_load_{dr['result_file']}"):
+                full = load_result(dr["result_file"])
+                if full is None:
+                    st.error("Result payload is missing or unreadable.")
+                else:
+                    st.session_state["result"] = full
+                    st.rerun()
 else:
     st.info("No incidents found in the selected date range.")
 
@@ -284,12 +360,17 @@ if "result" in st.session_state:
     risk_predictions = result.get("risk_predictions", [])
 
     col1, col2, col3, col4, col5, col6 = st.columns(6)
-    col1.metric("Log Entries", len(log_entries))
+    col1.metric("Log Entries", result.get("log_entries_total", len(log_entries)))
     col2.metric("Issues", len(issues))
     col3.metric("Causal Chains", len(causal_chains))
     col4.metric("Risk Predictions", len(risk_predictions))
     col5.metric("JIRA Tickets", len(jira_tickets))
-    notify_status = "Sent" if notification and notification.get("sent") else "Dry Run"
+    if notification and notification.get("mode") in ("queued", "deduplicated"):
+        notify_status = notification["mode"].capitalize()
+    elif notification and notification.get("sent"):
+        notify_status = "Sent"
+    else:
+        notify_status = "Dry Run"
     col6.metric("Notification", notify_status)
 
     st.divider()
@@ -308,24 +389,84 @@ if "result" in st.session_state:
     # Tab 1: Log Entries
     with tab1:
         st.subheader("Parsed Log Entries")
-        if log_entries:
-            severity_filter = st.multiselect(
-                "Filter by level",
-                ["CRITICAL", "ERROR", "WARN", "WARNING", "INFO", "DEBUG"],
-                default=["CRITICAL", "ERROR", "WARN", "WARNING"],
+        if result.get("log_entries_total", 0) > len(log_entries):
+            st.caption(
+                f"Analyzed in {result.get('slices', 0)} slices: showing a sample of {len(log_entries)} of "
+                f"{result['log_entries_total']} entries (those behind issues and causal chains, and the first "
+                f"errors and warnings of each slice)."
             )
-            filtered = [e for e in log_entries if e.get("level") in severity_filter]
-            for entry in filtered:
-                level = entry.get("level", "UNKNOWN")
-                color = {
-                    "CRITICAL": "red", "ERROR": "red",
-                    "WARN": "orange", "WARNING": "orange",
-                    "INFO": "blue", "DEBUG": "gray",
-                }.get(level, "gray")
-                st.markdown(
-                    f"**:{color}[{level}]** `{entry.get('timestamp', '')}` "
-                    f"**[{entry.get('service', '')}]** {entry.get('message', '')}"
+        if log_entries:
+            # Columnar index built once per loaded result; each rerun only filters and slices it
+            index_key = (result.get("filename"), result.get("processed_at"), len(log_entries))
+            if st.session_state.get("entry_index_key") != index_key:
+                st.session_state["entry_index"] = EntryIndex(log_entries)
+                st.session_state["entry_index_key"] = index_key
+            entry_index = st.session_state["entry_index"]
+
+            fcol1, fcol2, fcol3 = st.columns([2, 2, 3])
+            with fcol1:
+                level_filter = st.multiselect(
+                    "Filter by level",
+                    ["CRITICAL", "ERROR", "WARN", "WARNING", "INFO", "DEBUG"],
+                    default=["CRITICAL", "ERROR", "WARN", "WARNING"],
                 )
+            with fcol2:
+                service_filter = st.multiselect("Filter by service", sorted(entry_index.services))
+            with fcol3:
+                text_filter = st.text_input("Message contains")
+
+            start = end = None
+            time_range = entry_index.time_range()
+            if time_range and time_range[1] > time_range[0]:
+                t_from, t_to = st.slider(
+                    "Time range",
+                    min_value=datetime.fromtimestamp(time_range[0]),
+                    max_value=datetime.fromtimestamp(time_range[1]),
+                    value=(datetime.fromtimestamp(time_range[0]), datetime.fromtimestamp(time_range[1])),
+                    format="YYYY-MM-DD HH:mm:ss",
+                )
+                if (t_from.timestamp(), t_to.timestamp()) != time_range:
+                    start, end = t_from.timestamp(), t_to.timestamp()
+
+            matches = entry_index.match(level_filter, service_filter or None, start, end, text_filter)
+            total = len(matches)
+            n_pages = max(1, -(-total // LOG_PAGE_SIZE))
+
+            # Jump to the line a history search hit pointed at
+            focus_line = st.session_state.pop("focus_line", None)
+            if focus_line is not None:
+                pos = entry_index.locate(matches, focus_line)
+                if pos is not None:
+                    st.session_state["log_page"] = pos // LOG_PAGE_SIZE + 1
+                    focused = entry_index.page(matches, pos, 1)[0]
+                    st.info(
+                        f"Line {focus_line} — `{focused.get('timestamp', '')}` {focused.get('level', '')} "
+                        f"[{focused.get('service', '')}] {focused.get('message', '')}"
+                    )
+                else:
+                    st.warning(f"Line {focus_line} is hidden by the current filters.")
+
+            page = 1
+            if n_pages > 1:
+                page = st.number_input(
+                    f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key="log_page"
+                )
+            page_entries = entry_index.page(matches, offset=(page - 1) * LOG_PAGE_SIZE, limit=LOG_PAGE_SIZE)
+            st.caption(f"{total} of {len(log_entries)} entries match")
+            st.dataframe(
+                [
+                    {
+                        "line": e.get("line_number", 0),
+                        "timestamp": e.get("timestamp", ""),
+                        "level": e.get("level", "UNKNOWN"),
+                        "service": e.get("service", ""),
+                        "message": e.get("message", ""),
+                    }
+                    for e in page_entries
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
         else:
             st.info("No log entries parsed.")
 
@@ -376,6 +517,24 @@ if "result" in st.session_state:
         else:
             st.info("No causal chains detected — issues may be independent.")
 
+        rca_pruning = result.get("rca_pruning") or {}
+        if rca_pruning:
+            with st.expander("Candidate Selection"):
+                tokens, budget = rca_pruning.get("estimated_tokens", 0), rca_pruning.get("token_budget", 0)
+                if rca_pruning.get("slices", 1) > 1:
+                    usage = f"~{tokens} tokens over {rca_pruning['slices']} slices, budget {budget} per slice"
+                else:
+                    usage = f"~{tokens} of {budget} tokens"
+                st.caption(
+                    f"{rca_pruning.get('candidates_total', 0)} candidate clusters — "
+                    f"{len(rca_pruning.get('sent', []))} sent to the LLM ({usage}), "
+                    f"{rca_pruning.get('graph_confirmed', 0)} confirmed from the dependency graph"
+                )
+                dropped = rca_pruning.get("dropped", []) + rca_pruning.get("graph_pruned", [])
+                if dropped:
+                    st.markdown("**Dropped candidates:**")
+                    st.json(dropped)
+
     # Tab 4: Risk Forecast
     with tab4:
         st.subheader("Risk Forecast")
@@ -404,6 +563,19 @@ if "result" in st.session_state:
         else:
             st.success("No escalation risks detected.")
 
+        risk_suppressed = result.get("risk_suppressed") or []
+        if risk_suppressed:
+            with st.expander(f"Suppressed by Baseline ({len(risk_suppressed)})"):
+                st.caption("Signals within the service's usual range for that hour of day — not sent to the LLM.")
+                for sig in risk_suppressed:
+                    base = sig.get("baseline", {})
+                    subject = base.get("metric") or f"{base.get('level', '')} count"
+                    st.markdown(
+                        f"- **{sig.get('service', '?')}** `{sig.get('signal_type', '')}` — {subject} "
+                        f"{base.get('value', 0):g} vs usual {base.get('mean', 0):g} ± {base.get('std', 0):g} "
+                        f"at {base.get('hour', 0):02d}:00 (z={base.get('z_score', 0):.1f})"
+                    )
+
     # Tab 5: Cookbook
     with tab5:
         st.subheader("Remediation Cookbook")
@@ -439,7 +611,14 @@ if "result" in st.session_state:
             mode = notification.get("mode", "dry-run")
             sent = notification.get("sent", False)
 
-            if sent:
+            if mode == "queued":
+                st.success(
+                    f"Queued for {notification.get('channel', '#devops-alerts')} — delivered in the background, "
+                    "combined with other notifications of the next few seconds"
+                )
+            elif mode == "deduplicated":
+                st.info("Not sent again — the same issues were notified recently")
+            elif sent:
                 st.success(f"Message sent to {notification.get('channel', '#devops-alerts')} (mode: {mode})")
             else:
                 st.warning(f"Dry run mode — message not sent (mode: {mode})")
@@ -0,0 +1,133 @@
+"""Benchmark: streaming .gz/.zst log reading versus decompressing to disk first.
+
+Usage (from devops_incident_suite/):
+    python benchmarks/bench_decompress.py [--mb 128] [--slice-mb 16] [--members 4] [--repeat 3]
+
+Builds a log of --mb MB from sample_logs/ lines and stores it plain, as
+multi-member gzip and as multi-frame zstd (--members parts each). Each
+input is then read through the watcher's slicer (utils.log_slicer):
+
+    plain              the uncompressed file
+    gzip/zstd stream   decompressed while it is read (utils.compressed)
+    gzip/zstd to disk  decompressed to a temporary file first, then read
+
+Reported: seconds (best of --repeat runs), decompressed MB/s, peak Python
+memory while slicing (tracemalloc, separate pass) and extra disk space used. The
+peak follows the slice size, not the file size: try a larger --mb.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.compressed import open_log  # noqa: E402
+from utils.log_slicer import iter_slices  # noqa: E402
+
+
+def build_log(size: int) -> bytes:
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sample_logs")
+    base = []
+    for path in sorted(glob.glob(os.path.join(sample_dir, "*.log"))):
+        with open(path, "rb") as f:
+            base.extend(line if line.endswith(b"\n") else line + b"\n" for line in f if line.strip())
+    rng = random.Random(42)
+    chunk = b"".join(rng.choice(base) for _ in range(20000))
+    return (chunk * (size // len(chunk) + 1))[:size].rsplit(b"\n", 1)[0] + b"\n"
+
+
+def parts(data: bytes, count: int) -> list[bytes]:
+    """data cut into count pieces at line boundaries."""
+    pieces, start = [], 0
+    for i in range(1, count + 1):
+        end = len(data) if i == count else data.index(b"\n", i * len(data) // count) + 1
+        pieces.append(data[start:end])
+        start = end
+    return [p for p in pieces if p]
+
+
+def consume(path: str, slice_bytes: int) -> int:
+    return sum(len(piece.text) for piece in iter_slices(path, slice_bytes))
+
+
+def to_disk(path: str, directory: str) -> str:
+    target = os.path.join(directory, "decompressed.log")
+    with open_log(path) as src, open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    return target
+
+
+def measure(label: str, path: str, slice_bytes: int, size: int, scratch: str | None, repeat: int) -> None:
+    elapsed = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        source = to_disk(path, scratch) if scratch else path
+        consume(source, slice_bytes)
+        elapsed = min(elapsed, time.perf_counter() - started)
+        extra_disk = os.path.getsize(source) if scratch else 0
+        if scratch:
+            os.remove(source)
+
+    tracemalloc.start()
+    source = to_disk(path, scratch) if scratch else path
+    consume(source, slice_bytes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if scratch:
+        os.remove(source)
+
+    print(f"{label:<18} {elapsed:>8.2f} {size / elapsed / 1e6:>9.1f} {peak / 1e6:>10.1f} {extra_disk / 1e6:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=128, help="decompressed log size")
+    parser.add_argument("--slice-mb", type=float, default=16, help="slice size (WATCHER_SLICE_MB)")
+    parser.add_argument("--members", type=int, default=4, help="gzip members / zstd frames per file")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per input (best is reported)")
+    args = parser.parse_args()
+
+    data = build_log(int(args.mb * 1e6))
+    slice_bytes = int(args.slice_mb * 1024 * 1024)
+    pieces = parts(data, args.members)
+    with tempfile.TemporaryDirectory(prefix="bench-decompress-") as root:
+        inputs = {"plain": os.path.join(root, "bench.log"), "gzip": os.path.join(root, "bench.log.gz")}
+        with open(inputs["plain"], "wb") as f:
+            f.write(data)
+        with open(inputs["gzip"], "wb") as f:
+            for piece in pieces:
+                f.write(gzip.compress(piece, compresslevel=6))
+        try:
+            import zstandard
+            inputs["zstd"] = os.path.join(root, "bench.log.zst")
+            compressor = zstandard.ZstdCompressor(level=3)
+            with open(inputs["zstd"], "wb") as f:
+                for piece in pieces:
+                    f.write(compressor.compress(piece))
+        except ImportError:
+            print("zstandard not installed: skipping zstd")
+
+        sizes = ", ".join(f"{kind} {os.path.getsize(path) / 1e6:.1f} MB" for kind, path in inputs.items())
+        print(f"{len(data) / 1e6:.0f} MB log, {len(pieces)} members/frames, {args.slice_mb:g} MB slices ({sizes})")
+        print(f"{'input':<18} {'seconds':>8} {'MB/s':>9} {'peak MB':>10} {'disk MB':>10}")
+        scratch = os.path.join(root, "scratch")
+        os.makedirs(scratch)
+        measure("plain", inputs["plain"], slice_bytes, len(data), None, args.repeat)
+        for kind in ("gzip", "zstd"):
+            if kind in inputs:
+                measure(f"{kind} stream", inputs[kind], slice_bytes, len(data), None, args.repeat)
+                measure(f"{kind} to disk", inputs[kind], slice_bytes, len(data), scratch, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
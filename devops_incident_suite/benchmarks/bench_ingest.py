@@ -0,0 +1,169 @@
+"""Benchmark: HTTP ingestion throughput, latency and backpressure.
+
+Usage (from devops_incident_suite/):
+    python benchmarks/bench_ingest.py [--clients 32] [--duration 10] [--lines 100]
+    python benchmarks/bench_ingest.py --url http://127.0.0.1:8086   # a running worker daemon
+
+Without --url, an ingestion server is started in-process with a stub
+analysis that sleeps --analyze-ms per batch, so the numbers measure the
+HTTP, buffering and batching path rather than the LLM. Each client keeps
+one connection open and pushes NDJSON (or --format text) lines sampled from
+sample_logs/ as fast as it is allowed; a 429 makes it wait Retry-After.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from agents.log_classifier import LOG_PATTERNS  # noqa: E402
+from utils.ingest import IngestServer, percentiles  # noqa: E402
+
+
+def load_records() -> list[dict]:
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sample_logs")
+    records = []
+    for path in sorted(glob.glob(os.path.join(sample_dir, "*.log"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                for pattern in LOG_PATTERNS:
+                    m = pattern.match(line.strip())
+                    if m:
+                        records.append({
+                            "timestamp": m.group("timestamp").strip(),
+                            "level": m.group("level"),
+                            "service": m.group("service") or "unknown",
+                            "message": m.group("message").strip(),
+                        })
+                        break
+    return records
+
+
+def build_body(records: list[dict], fmt: str) -> tuple[bytes, str]:
+    if fmt == "text":
+        lines = [f"{r['timestamp']} {r['level']} [{r['service']}] {r['message']}" for r in records]
+        return ("\n".join(lines) + "\n").encode(), "text/plain"
+    return ("\n".join(json.dumps(r) for r in records) + "\n").encode(), "application/x-ndjson"
+
+
+async def client(
+    host: str, port: int, path: str, bodies: list[tuple[bytes, str]], deadline: float, results: dict
+) -> None:
+    reader = writer = None
+    i = 0
+    while time.perf_counter() < deadline:
+        if writer is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        body, ctype = bodies[i % len(bodies)]
+        i += 1
+        request = (
+            f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {ctype}\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n"
+        ).encode() + body
+        started = time.perf_counter()
+        writer.write(request)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        await reader.readexactly(int(headers.get("content-length", "0")))
+        results["latency"].append(time.perf_counter() - started)
+
+        if status == 202:
+            results["accepted_requests"] += 1
+            results["accepted_bytes"] += len(body)
+        else:
+            results["rejected" if status == 429 else "errors"] += 1
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+            reader = writer = None
+        if status == 429:
+            await asyncio.sleep(float(headers.get("retry-after", "1")))
+
+
+async def run_clients(args, host: str, port: int, bodies: list[tuple[bytes, str]]) -> dict:
+    results = {"latency": [], "accepted_requests": 0, "accepted_bytes": 0, "rejected": 0, "errors": 0}
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(
+        client(host, port, f"/ingest/bench-{i % args.sources}", bodies, deadline, results)
+        for i in range(args.clients)
+    ))
+    return results
+
+
+async def fetch_health(host: str, port: int) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET /health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return json.loads(data.split(b"\r\n\r\n", 1)[1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="ingestion server to load (default: start one in-process)")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--sources", type=int, default=8, help="distinct sources the clients push as")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--lines", type=int, default=100, help="lines per request")
+    parser.add_argument("--format", choices=("ndjson", "text"), default="ndjson")
+    parser.add_argument("--analyze-ms", type=float, default=200.0, help="stub analysis time per batch")
+    parser.add_argument("--buffer-mb", type=float, default=64.0, help="in-process server buffer bound")
+    args = parser.parse_args()
+
+    base = load_records()
+    rng = random.Random(42)
+    bodies = [build_body([rng.choice(base) for _ in range(args.lines)], args.format) for _ in range(64)]
+
+    stop = threading.Event()
+    server = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        server = IngestServer(
+            lambda source, lines: time.sleep(args.analyze_ms / 1000),
+            port=0,
+            batch_seconds=1.0,
+            max_buffered_bytes=int(args.buffer_mb * 1024 * 1024),
+        )
+        thread = threading.Thread(target=server.run, args=(stop,), daemon=True)
+        thread.start()
+        while server.bound_port is None:
+            time.sleep(0.01)
+        host, port = "127.0.0.1", server.bound_port
+
+    print(f"{args.clients} clients x {args.lines} {args.format} lines/request, {args.duration:.0f}s -> {host}:{port}")
+    results = asyncio.run(run_clients(args, host, port, bodies))
+    health = asyncio.run(fetch_health(host, port))
+    if server is not None:
+        stop.set()
+        thread.join()
+
+    accepted_lines = results["accepted_requests"] * args.lines
+    latency = {k: v * 1000 for k, v in percentiles(results["latency"]).items()}
+    batch = health["batch_latency"]
+    print(f"accepted: {results['accepted_requests']:,} requests, {accepted_lines / args.duration:,.0f} lines/s, "
+          f"{results['accepted_bytes'] / args.duration / 1e6:.1f} MB/s")
+    print(f"refused (429): {results['rejected']:,}   errors: {results['errors']:,}")
+    print(f"request latency ms: p50 {latency['p50']:.1f}  p95 {latency['p95']:.1f}  "
+          f"p99 {latency['p99']:.1f}  max {latency['max']:.1f}")
+    print(f"server: {health['batches']:,} batches, batch latency s (first line -> analyzed): "
+          f"p50 {batch['p50']:.2f}  p95 {batch['p95']:.2f}  max {batch['max']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark: single-pass signal scanner vs. the legacy per-pattern detectors.
+
+Usage (from devops_incident_suite/):
+    python benchmarks/bench_signal_scanner.py [--entries 1000000]
+
+Messages are sampled from sample_logs/. The legacy path reproduces the
+regex passes the Predictive Risk agent used to run per entry: five
+NUMERIC_PATTERNS searches, four KNOWN_PATTERNS searches and the uncompiled
+ratio search for pool checks.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from agents.log_classifier import LOG_PATTERNS  # noqa: E402
+from utils.signal_scanner import scan_message  # noqa: E402
+
+LEGACY_NUMERIC_PATTERNS = {
+    "disk_percent": re.compile(r"(\d+)%"),
+    "latency_ms": re.compile(r"(\d+)\s*ms"),
+    "retry_count": re.compile(r"retry\s*(\d+)", re.IGNORECASE),
+    "pool_usage": re.compile(r"(\d+)/(\d+)\s*connections?", re.IGNORECASE),
+    "rate_value": re.compile(r"(\d+)/(\d+)\s*req", re.IGNORECASE),
+}
+
+LEGACY_KNOWN_PATTERNS = {
+    "brute_force": re.compile(
+        r"(failed.*(?:auth|login|credentials)|brute\s*force|locked|failed\s*attempts)",
+        re.IGNORECASE,
+    ),
+    "disk_critical": re.compile(r"disk.*(\d+)%", re.IGNORECASE),
+    "pool_exhaustion": re.compile(r"(connection\s*pool|pool\s*utilization)", re.IGNORECASE),
+    "circuit_breaker": re.compile(r"(circuit\s*breaker|retries?\s*exhausted)", re.IGNORECASE),
+}
+
+
+def legacy_scan(msg: str) -> int:
+    """Run every legacy regex pass over one message. Returns the number of hits."""
+    hits = 0
+    for pattern in LEGACY_NUMERIC_PATTERNS.values():
+        if pattern.search(msg):
+            hits += 1
+    if LEGACY_KNOWN_PATTERNS["brute_force"].search(msg):
+        hits += 1
+    if LEGACY_KNOWN_PATTERNS["disk_critical"].search(msg):
+        hits += 1
+    if LEGACY_KNOWN_PATTERNS["pool_exhaustion"].search(msg):
+        hits += 1
+        if re.search(r"(\d+)/(\d+)", msg):
+            hits += 1
+    if LEGACY_KNOWN_PATTERNS["circuit_breaker"].search(msg):
+        hits += 1
+    return hits
+
+
+def load_messages() -> list[str]:
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sample_logs")
+    messages = []
+    for path in sorted(glob.glob(os.path.join(sample_dir, "*.log"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                for pattern in LOG_PATTERNS:
+                    m = pattern.match(line.strip())
+                    if m:
+                        messages.append(m.group("message").strip())
+                        break
+    return messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    base = load_messages()
+    rng = random.Random(42)
+    messages = [rng.choice(base) for _ in range(args.entries)]
+    print(f"{len(messages):,} messages sampled from {len(base)} sample log lines")
+
+    start = time.perf_counter()
+    for msg in messages:
+        legacy_scan(msg)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for msg in messages:
+        scan_message(msg)
+    single = time.perf_counter() - start
+
+    print(f"legacy detectors (10 passes): {legacy:7.2f}s  ({len(messages) / legacy:,.0f} entries/s)")
+    print(f"single-pass scanner:          {single:7.2f}s  ({len(messages) / single:,.0f} entries/s)")
+    print(f"speedup: {legacy / single:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
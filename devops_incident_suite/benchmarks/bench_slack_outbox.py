@@ -0,0 +1,169 @@
+"""Benchmark: Slack notification storm, inline delivery versus the outbox, against a local webhook stub.
+
+Usage (from devops_incident_suite/):
+    python benchmarks/bench_slack_outbox.py [--notifications 200] [--incidents 5] [--storm 10]
+
+A stub webhook on 127.0.0.1 behaves like Slack's: it answers after
+--stub-ms, allows one message per second (429 with Retry-After beyond
+that) and fails --fail-rate of requests with a 500. --notifications
+notifications about --incidents distinct incidents (numbers in their text
+vary) are produced by --producers threads over --storm seconds, once sent
+inline as before (a blocking POST per notification) and once through the
+outbox (utils.slack_outbox) with --coalesce seconds of coalescing.
+
+Reported: how long producers were blocked per notification, messages
+Slack received, notifications lost, and (outbox) deduplicated, coalesced
+and retried counts and the mean delay until delivery.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.ingest import percentiles  # noqa: E402
+from utils.slack_client import send_slack_message  # noqa: E402
+from utils.slack_outbox import SlackOutbox, issue_fingerprint  # noqa: E402
+
+INCIDENTS = [
+    ("CRITICAL", "Database connection pool exhausted on primary ({n} waiting)"),
+    ("HIGH", "Payment service p99 latency at {n} ms"),
+    ("CRITICAL", "Pod crash loop in checkout deployment, restart {n}"),
+    ("MEDIUM", "Disk usage on log volume at {n}%"),
+    ("HIGH", "Auth token validation failures: {n} in 1 minute"),
+    ("HIGH", "Message queue consumer lag {n} messages"),
+    ("MEDIUM", "Certificate for api gateway expires in {n} days"),
+    ("CRITICAL", "DNS resolution failing for internal zone, {n} errors"),
+]
+
+
+class StubWebhook(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        stub = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))))
+        time.sleep(stub.latency)
+        with stub.lock:
+            now = time.time()
+            if stub.rng.random() < stub.fail_rate:
+                status = 500
+            elif now - stub.last_accepted < 1.0:
+                status = 429
+            else:
+                status = 200
+                stub.last_accepted = now
+                stub.received.append(payload)
+            stub.statuses[status] = stub.statuses.get(status, 0) + 1
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def start_stub(latency_ms: float, fail_rate: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubWebhook)
+    server.latency, server.fail_rate = latency_ms / 1000, fail_rate
+    server.rng, server.lock = random.Random(1), threading.Lock()
+    server.last_accepted, server.received, server.statuses = 0.0, [], {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def notifications(args) -> list[tuple[dict, list[dict]]]:
+    rng = random.Random(3)
+    items = []
+    for i in range(args.notifications):
+        severity, text = INCIDENTS[rng.randrange(min(args.incidents, len(INCIDENTS)))]
+        issue = {"severity": severity, "issue": text.format(n=rng.randint(10, 999))}
+        summary = f":red_circle: *{severity}* {issue['issue']}\nRecommended: follow the runbook (notification {i})"
+        payload = {"channel": "#bench", "text": summary,
+                   "blocks": [{"type": "section", "text": {"type": "mrkdwn", "text": summary}}]}
+        items.append((payload, [issue]))
+    return items
+
+
+def storm(items, producers: int, duration: float, send) -> list[float]:
+    """Produce items from several threads spread over duration; returns per-item blocking time."""
+    blocked: list[float] = []
+    lock = threading.Lock()
+    interval = duration / max(len(items), 1)
+    started = time.time()
+
+    def produce(offset: int) -> None:
+        for i in range(offset, len(items), producers):
+            time.sleep(max(0.0, started + i * interval - time.time()))
+            t0 = time.perf_counter()
+            send(*items[i])
+            with lock:
+                blocked.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=produce, args=(p,)) for p in range(producers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return blocked
+
+
+def report(label: str, blocked: list[float], stub, extra: str = "") -> None:
+    p = {k: v * 1000 for k, v in percentiles(blocked).items()}
+    print(f"{label}: producer blocked ms p50 {p['p50']:.1f}  p99 {p['p99']:.1f}  max {p['max']:.1f}")
+    print(f"  Slack received {len(stub.received)} messages; answers {dict(sorted(stub.statuses.items()))}{extra}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notifications", type=int, default=200)
+    parser.add_argument("--incidents", type=int, default=5, help="distinct incidents in the storm")
+    parser.add_argument("--producers", type=int, default=8, help="threads producing notifications")
+    parser.add_argument("--storm", type=float, default=10.0, help="seconds the storm lasts")
+    parser.add_argument("--coalesce", type=float, default=5.0, help="outbox coalescing window, seconds")
+    parser.add_argument("--stub-ms", type=float, default=50.0, help="webhook stub response time")
+    parser.add_argument("--fail-rate", type=float, default=0.1, help="share of requests the stub fails with 500")
+    args = parser.parse_args()
+
+    items = notifications(args)
+    distinct = len({issue_fingerprint(i) for _, issues in items for i in issues})
+    print(f"{len(items)} notifications about {distinct} distinct issues from {args.producers} producers "
+          f"over {args.storm:.0f}s; stub {args.stub_ms:.0f} ms, 1 msg/s, {args.fail_rate:.0%} errors")
+
+    stub = start_stub(args.stub_ms, args.fail_rate)
+    os.environ["SLACK_WEBHOOK_URL"] = f"http://127.0.0.1:{stub.server_address[1]}/webhook"
+    results = []
+    blocked = storm(items, args.producers, args.storm, lambda payload, _: results.append(send_slack_message(payload)))
+    lost = sum(1 for sent, _ in results if not sent)
+    report("inline", blocked, stub, f"\n  notifications lost (not delivered): {lost}")
+    stub.shutdown()
+
+    stub = start_stub(args.stub_ms, args.fail_rate)
+    url = f"http://127.0.0.1:{stub.server_address[1]}/webhook"
+    outbox = SlackOutbox(coalesce_seconds=args.coalesce).start()
+    blocked = storm(
+        items, args.producers, args.storm,
+        lambda payload, issues: outbox.submit(url, payload, [issue_fingerprint(i) for i in issues]),
+    )
+    outbox.close(timeout=120)
+    stats = outbox.stats()
+    report(
+        "outbox", blocked, stub,
+        f"\n  {stats['queued']} queued, {stats['deduplicated']} deduplicated, {stats['coalesced']} coalesced, "
+        f"{stats['retries']} retries, {stats['failed']} lost; "
+        f"mean delay to delivery {stats['mean_delivery_seconds']:.1f}s",
+    )
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
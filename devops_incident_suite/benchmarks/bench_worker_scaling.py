@@ -0,0 +1,155 @@
+"""Benchmark: worker daemon throughput as workers are added, with the stub LLM.
+
+Usage (from devops_incident_suite/):
+    python benchmarks/bench_worker_scaling.py [--workers 1 2 4] [--files 48] [--llm-ms 200]
+    python benchmarks/bench_worker_scaling.py --daemons 2     # two daemons share the watch directory
+
+For each worker count, --daemons worker daemons (python -m worker) are
+started with LLM_PROVIDER=stub, the workers split between them. Each daemon
+runs from its own copy of the app, so it has its own job store and results
+like a daemon on another host; all of them watch one shared directory.
+Once every worker is up, --files distinct log files are dropped into it and
+the time until all of them are processed gives files/s. The run also checks
+that every file was analyzed exactly once across the daemons.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import random
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+_APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+_COPY_IGNORE = shutil.ignore_patterns("results_history", "live_logs", "__pycache__", ".env")
+
+
+def sample_lines() -> list[str]:
+    lines = []
+    for path in sorted(glob.glob(os.path.join(_APP_DIR, "sample_logs", "*.log"))):
+        with open(path, encoding="utf-8") as f:
+            lines.extend(line.rstrip("\n") for line in f if line.strip())
+    return lines
+
+
+def write_files(directory: str, count: int, lines_per_file: int, base: list[str]) -> list[str]:
+    rng = random.Random(7)
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"bench_{i:04d}.log")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"2024-01-15 10:00:00 INFO [bench] file {i}\n")  # Distinct content hashes
+            f.write("\n".join(rng.choice(base) for _ in range(lines_per_file)) + "\n")
+        paths.append(path)
+    return paths
+
+
+def split(total: int, parts: int) -> list[int]:
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+
+def jobs_done(app_copy: str) -> int:
+    path = os.path.join(app_copy, "results_history", "jobs.db")
+    if not os.path.exists(path):
+        return 0
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE state = 'done'").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run(workers: int, args, base: list[str]) -> dict:
+    root = tempfile.mkdtemp(prefix="bench-scaling-")
+    watch_dir = os.path.join(root, "watch")
+    staging = os.path.join(root, "staging")
+    processed = os.path.join(watch_dir, "processed")
+    os.makedirs(watch_dir)
+    os.makedirs(staging)
+    env = {
+        **os.environ,
+        "LLM_PROVIDER": "stub",
+        "STUB_LLM_LATENCY_MS": str(args.llm_ms),
+        "SLACK_WEBHOOK_URL": "",
+        "FOLLOW_PATHS": "",
+        "INGEST_PORT": "0",
+        "WORKER_METRICS_PORT": "0",
+    }
+
+    daemons = []
+    try:
+        for d, count in enumerate(c for c in split(workers, args.daemons) if c):
+            app_copy = os.path.join(root, f"app{d}")
+            shutil.copytree(_APP_DIR, app_copy, ignore=_COPY_IGNORE)
+            log = open(os.path.join(root, f"daemon{d}.log"), "w")
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "worker", "--watch-dir", watch_dir, "--processed-dir", processed,
+                 "--workers", str(count), "--poll-interval", "1"],
+                cwd=app_copy, env=env, stdout=log, stderr=subprocess.STDOUT,
+            )
+            log.close()
+            daemons.append((app_copy, proc))
+
+        # Workers write their claim heartbeat once they are imported and ready to claim
+        owners_dir = os.path.join(watch_dir, ".claimed", ".owners")
+        deadline = time.time() + 120
+        while not os.path.isdir(owners_dir) or len(os.listdir(owners_dir)) < workers:
+            if time.time() > deadline or any(p.poll() is not None for _, p in daemons):
+                raise RuntimeError(f"workers did not start, see the daemon logs in {root}")
+            time.sleep(0.2)
+
+        files = write_files(staging, args.files, args.lines, base)
+        started = time.perf_counter()
+        for path in files:
+            os.rename(path, os.path.join(watch_dir, os.path.basename(path)))
+        while len(glob.glob(os.path.join(processed, "*.results.json"))) < len(files):
+            if time.perf_counter() - started > args.timeout:
+                raise RuntimeError(f"timed out, see the daemon logs in {root}")
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+    finally:
+        for _, proc in daemons:
+            proc.send_signal(signal.SIGTERM)
+        for _, proc in daemons:
+            proc.wait(timeout=60)
+
+    analyzed = [jobs_done(app_copy) for app_copy, _ in daemons]
+    shutil.rmtree(root, ignore_errors=True)
+    return {"workers": workers, "elapsed": elapsed, "files_per_second": len(files) / elapsed, "analyzed": analyzed}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="total worker counts to compare")
+    parser.add_argument("--daemons", type=int, default=1, help="daemons sharing the watch directory")
+    parser.add_argument("--files", type=int, default=48)
+    parser.add_argument("--lines", type=int, default=200, help="log lines per file")
+    parser.add_argument("--llm-ms", type=float, default=200.0, help="stub LLM latency per call")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    base = sample_lines()
+    print(f"{args.files} files x {args.lines} lines, stub LLM {args.llm_ms:.0f} ms/call, "
+          f"{args.daemons} daemon(s), {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>8} {'files/s':>8} {'speedup':>8} {'efficiency':>10}  analyzed per daemon")
+    first = None
+    for workers in args.workers:
+        result = run(workers, args, base)
+        first = first or result
+        speedup = result["files_per_second"] / first["files_per_second"]
+        efficiency = speedup / (workers / first["workers"])
+        exact = "" if sum(result["analyzed"]) == args.files else f"  (expected {args.files} in total!)"
+        print(f"{workers:>8} {result['elapsed']:>8.2f} {result['files_per_second']:>8.2f} "
+              f"{speedup:>7.2f}x {efficiency:>9.0%}  {result['analyzed']}{exact}")
+
+
+if __name__ == "__main__":
+    main()
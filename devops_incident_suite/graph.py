@@ -39,7 +39,9 @@ class PipelineState(TypedDict):
     jira_tickets: Annotated[list, _merge_lists]
     notification: Annotated[Any, _last_value]
     causal_chains: Annotated[list, _merge_lists]
+    rca_pruning: Annotated[dict, _last_value]
     risk_predictions: Annotated[list, _merge_lists]
+    risk_suppressed: Annotated[list, _last_value]
     current_agent: Annotated[str, _last_value]
     error: Annotated[str, _last_value]
 
@@ -49,10 +51,14 @@ class PipelineState(TypedDict):
 def get_llm():
     """Create the LLM instance based on environment configuration.
 
-    Supports: openai, anthropic, openrouter (default).
+    Supports: openai, anthropic, openrouter (default), and stub (offline, no API calls).
     """
     provider = os.getenv("LLM_PROVIDER", "openrouter").lower()
 
+    if provider == "stub":
+        from utils.stub_llm import StubLLM
+        return StubLLM(float(os.getenv("STUB_LLM_LATENCY_MS", "500")) / 1000)
+
     if provider == "openai":
         from langchain_openai import ChatOpenAI
         return ChatOpenAI(
@@ -123,7 +129,7 @@ def predictive_risk_node(state: dict) -> dict:
 
 # --- Graph Definition ---
 
-def build_graph() -> StateGraph:
+def build_graph(notify: bool = True) -> StateGraph:
     """Build and compile the LangGraph pipeline.
 
     Flow:
@@ -132,6 +138,8 @@ def build_graph() -> StateGraph:
                                         jira_ticket ──────→ END
                                         root_cause ───────→ END
                                         predictive_risk ──→ notification → END
+
+    With notify=False, predictive_risk goes straight to END (no Slack notification).
     """
     graph = StateGraph(PipelineState)
 
@@ -142,7 +150,8 @@ def build_graph() -> StateGraph:
     graph.add_node("jira_ticket", jira_ticket_node)
     graph.add_node("root_cause", root_cause_node)
     graph.add_node("predictive_risk", predictive_risk_node)
-    graph.add_node("notification", notification_node)
+    if notify:
+        graph.add_node("notification", notification_node)
 
     # Define edges: sequential then fan-out
     graph.set_entry_point("log_classifier")
@@ -154,24 +163,28 @@ def build_graph() -> StateGraph:
     graph.add_edge("remediation", "root_cause")
     graph.add_edge("remediation", "predictive_risk")
 
-    # Notification runs after predictive_risk (needs risk predictions for Slack)
-    graph.add_edge("predictive_risk", "notification")
-
-    # All converge to END
+    # All converge to END; notification runs after predictive_risk (needs risk predictions for Slack)
     graph.add_edge("cookbook", END)
     graph.add_edge("jira_ticket", END)
     graph.add_edge("root_cause", END)
-    graph.add_edge("notification", END)
+    if notify:
+        graph.add_edge("predictive_risk", "notification")
+        graph.add_edge("notification", END)
+    else:
+        graph.add_edge("predictive_risk", END)
 
     return graph.compile()
 
 
-def run_pipeline(raw_logs: str, file_name: str = "upload") -> dict:
-    """Run the full pipeline and return the final state."""
+def run_pipeline(raw_logs: str, file_name: str = "upload", notify: bool = True) -> dict:
+    """Run the full pipeline and return the final state.
+
+    notify=False skips the Slack notification (e.g. for one slice of a larger file).
+    """
     global _llm
     _llm = None  # Reset to pick up any env changes
 
-    compiled = build_graph()
+    compiled = build_graph(notify)
     initial_state = {
         "raw_logs": raw_logs,
         "file_name": file_name,
@@ -181,7 +194,9 @@ def run_pipeline(raw_logs: str, file_name: str = "upload") -> dict:
         "jira_tickets": [],
         "notification": None,
         "causal_chains": [],
+        "rca_pruning": {},
         "risk_predictions": [],
+        "risk_suppressed": [],
         "current_agent": "",
         "error": "",
     }
@@ -51,6 +51,10 @@ class LogEntry(BaseModel):
     service: str = Field(default="unknown", description="Service or component name")
     message: str = Field(description="Log message content")
     raw: str = Field(description="Original raw log line")
+    signals: dict = Field(
+        default_factory=dict,
+        description="Metrics and escalation pattern hits extracted from the message",
+    )
 
 
 class Issue(BaseModel):
@@ -81,7 +85,7 @@ class SlackNotification(BaseModel):
     summary: str = Field(description="Notification summary text")
     payload: dict = Field(default_factory=dict, description="Full Slack message payload")
     sent: bool = Field(default=False, description="Whether the message was actually sent")
-    mode: str = Field(default="dry-run", description="'live' or 'dry-run'")
+    mode: str = Field(default="dry-run", description="'queued', 'deduplicated', 'live' or 'dry-run'")
 
 
 class ChainEvent(BaseModel):
@@ -100,6 +104,7 @@ class CausalChain(BaseModel):
     affected_services: list[str] = Field(default_factory=list, description="Service names impacted")
     confidence: Confidence = Field(default=Confidence.MEDIUM, description="Confidence level")
     summary: str = Field(description="One-sentence explanation of the causal chain")
+    source: str = Field(default="llm", description="'llm' or 'dependency_graph' (deterministic match)")
 
 
 class RiskPrediction(BaseModel):
@@ -129,6 +134,8 @@ class PipelineState(BaseModel):
     jira_tickets: list[JiraTicket] = Field(default_factory=list)
     notification: SlackNotification | None = None
     causal_chains: list[CausalChain] = Field(default_factory=list)
+    rca_pruning: dict = Field(default_factory=dict)
     risk_predictions: list[RiskPrediction] = Field(default_factory=list)
+    risk_suppressed: list[dict] = Field(default_factory=list)
     current_agent: str = ""
     error: str = ""
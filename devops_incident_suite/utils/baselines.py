@@ -0,0 +1,224 @@
+"""Service baselines — per-service, per-hour-of-day aggregates learned from past results.
+
+Every saved result contributes one observation per (service, clock hour) it
+covers: the count of entries at each level, and the peak value of each
+metric seen in that hour. Observations are folded into the aggregates of
+the matching hour of day (0-23) as running [n, sum, sum of squares, min, max],
+so a new run can be scored as a z-score or percentile rank against what is
+normal for that service at that time of day.
+
+The aggregates are persisted as a compact JSON index next to the results
+history and used by the Predictive Risk agent to suppress signals that fall
+within a service's usual range before the LLM is called.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+
+from utils import file_lock
+from utils.correlation import parse_timestamp
+from utils.signal_scanner import METRIC_NAMES, entry_signals
+
+_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "results_history", "baselines.json"
+)
+
+# Observations an hour-of-day slot needs before it is trusted for scoring
+MIN_BASELINE_SAMPLES = 5
+
+_lock = threading.Lock()
+_cache: tuple[float, "Baselines"] | None = None
+
+
+def observations(entries: list[dict]) -> dict[tuple[str, int], list[dict]]:
+    """Group entries into per-(service, clock hour) observations.
+
+    Returns {(service, hour_of_day): [{"levels": {level: count}, "metrics": {name: peak}}, ...]},
+    one observation per distinct date-hour.
+    """
+    buckets: dict[tuple[str, str], dict] = {}
+    for e in entries:
+        dt = parse_timestamp(e.get("timestamp", ""))
+        if dt is None:
+            continue
+        service = e.get("service", "unknown")
+        bucket = buckets.setdefault(
+            (service, dt.strftime("%Y-%m-%d %H")), {"levels": defaultdict(int), "metrics": {}}
+        )
+        bucket["levels"][e.get("level", "UNKNOWN")] += 1
+        signals = entry_signals(e)
+        for name in METRIC_NAMES:
+            value = signals.get(name)
+            if value is not None and value > bucket["metrics"].get(name, -math.inf):
+                bucket["metrics"][name] = value
+
+    grouped: dict[tuple[str, int], list[dict]] = defaultdict(list)
+    for (service, date_hour), bucket in buckets.items():
+        grouped[(service, int(date_hour[-2:]))].append(bucket)
+    return grouped
+
+
+def _add(stats: list[float], value: float) -> None:
+    stats[0] += 1
+    stats[1] += value
+    stats[2] += value * value
+    stats[3] = min(stats[3], value)
+    stats[4] = max(stats[4], value)
+
+
+def _score(stats: list[float] | None, n: int, value: float) -> dict | None:
+    """z-score and normal-approximation percentile of value against [count, sum, sumsq, min, max].
+
+    `n` is the number of observations of the slot; for level counts it exceeds
+    stats[0] only if the level was absent from some hours (which count as zero).
+    """
+    if n < MIN_BASELINE_SAMPLES:
+        return None
+    total, total_sq = (stats[1], stats[2]) if stats else (0.0, 0.0)
+    mean = total / n
+    var = max((total_sq - total * total / n) / (n - 1), 0.0)
+    # Floor the spread so a perfectly flat history doesn't turn any change into z = inf
+    std = max(math.sqrt(var), 0.1 * abs(mean), 1.0)
+    z = (value - mean) / std
+    return {
+        "z_score": round(z, 2),
+        "percentile": round(50 * math.erfc(-z / math.sqrt(2)), 1),
+        "mean": round(mean, 2),
+        "std": round(std, 2),
+        "samples": n,
+    }
+
+
+class Baselines:
+    """Per-service, per-hour-of-day level count and metric aggregates."""
+
+    def __init__(self, services: dict[str, dict[str, dict]] | None = None):
+        # service -> "HH" -> {"n": observations, "levels": {level: stats}, "metrics": {name: stats}}
+        # where stats is [count, sum, sum_sq, min, max]
+        self.services: dict[str, dict[str, dict]] = services or {}
+
+    def _slot(self, service: str, hour: int) -> dict | None:
+        return self.services.get(service, {}).get(f"{hour:02d}")
+
+    def add_entries(self, entries: list[dict]) -> int:
+        """Fold a result's log entries into the aggregates. Returns the number of observations."""
+        added = 0
+        for (service, hour), buckets in observations(entries).items():
+            if service == "unknown":
+                continue
+            slot = self.services.setdefault(service, {}).setdefault(
+                f"{hour:02d}", {"n": 0, "levels": {}, "metrics": {}}
+            )
+            for bucket in buckets:
+                slot["n"] += 1
+                for level, count in bucket["levels"].items():
+                    _add(slot["levels"].setdefault(level, [0, 0.0, 0.0, math.inf, -math.inf]), count)
+                for name, value in bucket["metrics"].items():
+                    _add(slot["metrics"].setdefault(name, [0, 0.0, 0.0, math.inf, -math.inf]), value)
+                added += 1
+        return added
+
+    def level_score(self, service: str, hour: int, level: str, count: int) -> dict | None:
+        """Score an hourly level count; None until the slot has MIN_BASELINE_SAMPLES observations."""
+        slot = self._slot(service, hour)
+        if not slot:
+            return None
+        return _score(slot["levels"].get(level), slot["n"], count)
+
+    def metric_score(self, service: str, hour: int, name: str, value: float) -> dict | None:
+        """Score a metric value against the hourly peaks seen for it; None without enough history."""
+        slot = self._slot(service, hour)
+        stats = slot["metrics"].get(name) if slot else None
+        if not stats:
+            return None
+        score = _score(stats, int(stats[0]), value)
+        if score:
+            score["range"] = [stats[3], stats[4]]
+        return score
+
+    def to_dict(self) -> dict:
+        return {"version": 1, "services": self.services}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Baselines":
+        return cls(data.get("services", {}))
+
+
+def _write(baselines: Baselines) -> None:
+    os.makedirs(os.path.dirname(_INDEX_PATH), exist_ok=True)
+    tmp_path = f"{_INDEX_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baselines.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp_path, _INDEX_PATH)
+
+
+def _read() -> Baselines | None:
+    try:
+        with open(_INDEX_PATH, "r", encoding="utf-8") as f:
+            return Baselines.from_dict(json.load(f))
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def _rebuild() -> Baselines:
+    from utils.results_store import iter_results
+
+    baselines = Baselines()
+    for result in iter_results():
+        baselines.add_entries(result.get("log_entries", []))
+    _write(baselines)
+    return baselines
+
+
+def _remember(mtime: float, baselines: Baselines) -> None:
+    global _cache
+    with _lock:
+        _cache = (mtime, baselines)
+
+
+def rebuild() -> Baselines:
+    """Rebuild the index from every result in the results history."""
+    with file_lock.locked(_INDEX_PATH):
+        baselines = _rebuild()
+        _remember(os.path.getmtime(_INDEX_PATH), baselines)
+    return baselines
+
+
+def load_baselines() -> Baselines:
+    """Return the persisted baselines, building them from history on first use."""
+    try:
+        mtime = os.path.getmtime(_INDEX_PATH)
+    except OSError:
+        mtime = None
+    with _lock:
+        if mtime is not None and _cache is not None and _cache[0] == mtime:
+            return _cache[1]
+
+    baselines = _read() if mtime is not None else None
+    if baselines is not None:
+        _remember(mtime, baselines)  # Stat before read: a newer write only forces a re-read
+        return baselines
+    with file_lock.locked(_INDEX_PATH):
+        baselines = _read() or _rebuild()  # Another process may have built it meanwhile
+        _remember(os.path.getmtime(_INDEX_PATH), baselines)
+    return baselines
+
+
+def record_entries(entries: list[dict]) -> None:
+    """Incrementally add a new result's log entries to the persisted baselines.
+
+    The index is re-read and rewritten under an inter-process file lock, so
+    concurrent savers (worker processes, several daemons) don't lose updates.
+    """
+    if not entries:
+        return
+    with file_lock.locked(_INDEX_PATH):
+        baselines = _read() or _rebuild()
+        if baselines.add_entries(entries):
+            _write(baselines)
+        _remember(os.path.getmtime(_INDEX_PATH), baselines)
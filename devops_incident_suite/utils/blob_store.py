@@ -0,0 +1,96 @@
+"""Blob store — content-addressed, compressed storage for result payloads.
+
+A payload is serialized as compact JSON, hashed (SHA-256) and written once
+to results_history/blobs/<aa>/<digest>.<gz|zst>; storing identical content
+again only refreshes the blob's mtime. Callers leave volatile fields
+(timestamps, timings) out of the payload so repeated content dedupes. Compression is gzip by default, or
+zstd with RESULTS_COMPRESSION=zstd (requires the `zstandard` package).
+Blobs are read back by magic bytes, so both formats can coexist.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Iterator
+
+_BLOB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results_history", "blobs")
+
+_EXTENSIONS = (".gz", ".zst")
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def _get_compression() -> str:
+    return os.getenv("RESULTS_COMPRESSION", "gzip").lower()
+
+
+def _compress(data: bytes) -> tuple[bytes, str]:
+    if _get_compression() == "zstd":
+        import zstandard
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), ".zst"
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0), ".gz"
+
+
+def _decompress(blob: bytes) -> bytes:
+    if blob.startswith(_ZSTD_MAGIC):
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def _path(digest: str) -> str | None:
+    """Path of the stored blob for digest, whatever its compression, or None."""
+    for ext in _EXTENSIONS:
+        path = os.path.join(_BLOB_DIR, digest[:2], digest + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def put_json(obj) -> str:
+    """Store obj as compressed compact JSON. Returns its content digest."""
+    data = json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+
+    existing = _path(digest)
+    if existing:
+        os.utime(existing)  # Keep a shared blob out of the compactor's grace window
+        return digest
+
+    blob, ext = _compress(data)
+    path = os.path.join(_BLOB_DIR, digest[:2], digest + ext)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return digest
+
+
+def get_json(digest: str):
+    """Load a stored payload. Raises OSError if the blob is missing."""
+    path = _path(digest)
+    if path is None:
+        raise FileNotFoundError(f"blob {digest} not found")
+    with open(path, "rb") as f:
+        return json.loads(_decompress(f.read()))
+
+
+def iter_blobs() -> Iterator[tuple[str, str]]:
+    """Yield (digest, path) for every stored blob."""
+    if not os.path.isdir(_BLOB_DIR):
+        return
+    for prefix in os.listdir(_BLOB_DIR):
+        shard = os.path.join(_BLOB_DIR, prefix)
+        if not os.path.isdir(shard):
+            continue
+        for fname in os.listdir(shard):
+            digest, ext = os.path.splitext(fname)
+            if ext in _EXTENSIONS:
+                yield digest, os.path.join(shard, fname)
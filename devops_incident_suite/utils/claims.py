@@ -0,0 +1,189 @@
+"""File claims — split a shared watch directory between worker processes and hosts.
+
+Before analyzing a file, a worker claims it by renaming it from the watch
+directory to .claimed/<owner>@<name>, keeping its extension. A rename is
+atomic (also on NFS and SMB volumes), so when several workers or hosts race
+for the same file exactly one of them wins; the others find it gone and
+move on.
+
+Owners are "host+pid" (not "host:pid": ":" is invalid in SMB/NTFS names).
+Each owner touches a heartbeat file, .claimed/.owners/<owner>, every
+CLAIM_LEASE_SECONDS / 3 while it runs. A claim is expired when its owner is
+gone: on the same host, when the process no longer exists; on another
+host, when its heartbeat is older than CLAIM_LEASE_SECONDS.
+reclaim_expired() renames expired claims back into the watch directory,
+where they are picked up again like new files.
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+
+CLAIM_DIR = ".claimed"
+OWNER_DIR = ".owners"
+
+
+def _get_lease_seconds() -> float:
+    """Seconds without a heartbeat after which another host takes over an owner's claims."""
+    return float(os.getenv("CLAIM_LEASE_SECONDS", "120"))
+
+
+def owner_name(pid: int | None = None) -> str:
+    return f"{socket.gethostname()}+{pid or os.getpid()}"
+
+
+def _claim_dir(watch_dir: str) -> str:
+    return os.path.join(watch_dir, CLAIM_DIR)
+
+
+def _heartbeat_path(watch_dir: str, owner: str) -> str:
+    return os.path.join(_claim_dir(watch_dir), OWNER_DIR, owner)
+
+
+def claim(path: str, owner: str) -> str | None:
+    """Claim a file in the watch directory for owner.
+
+    Returns the claimed path, or None if the file is gone (another worker claimed it first).
+    """
+    watch_dir, fname = os.path.split(path)
+    claimed = os.path.join(_claim_dir(watch_dir), f"{owner}@{fname}")
+    os.makedirs(os.path.dirname(claimed), exist_ok=True)
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return None
+    return claimed
+
+
+def unclaim(claimed: str, path: str) -> None:
+    """Put a claimed file back into the watch directory (e.g. to be retried later)."""
+    try:
+        os.rename(claimed, path)
+    except FileNotFoundError:
+        pass
+
+
+def heartbeat(watch_dir: str, owner: str) -> None:
+    path = _heartbeat_path(watch_dir, owner)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "a").close()
+
+
+def keep_alive(watch_dir: str, owner: str, stop_event, lease_seconds: float | None = None) -> None:
+    """Touch owner's heartbeat until stop_event is set (run in a daemon thread), then remove it."""
+    interval = (lease_seconds or _get_lease_seconds()) / 3
+    try:
+        while not stop_event.is_set():
+            try:
+                heartbeat(watch_dir, owner)
+            except OSError:
+                pass  # Shared volume briefly unavailable; the next beat retries
+            stop_event.wait(interval)
+    finally:
+        try:
+            os.remove(_heartbeat_path(watch_dir, owner))
+        except OSError:
+            pass
+
+
+def start_keep_alive(watch_dir: str, owner: str, stop_event) -> threading.Thread:
+    heartbeat(watch_dir, owner)  # Before the first claim, so no other host takes it for dead
+    thread = threading.Thread(target=keep_alive, args=(watch_dir, owner, stop_event), daemon=True)
+    thread.start()
+    return thread
+
+
+def _owner_alive(watch_dir: str, owner: str, lease_seconds: float) -> bool:
+    host, _, pid = owner.rpartition("+")
+    if host == socket.gethostname() and pid.isdigit():
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass  # Exists, owned by another user
+        return True
+    try:
+        return time.time() - os.stat(_heartbeat_path(watch_dir, owner)).st_mtime < lease_seconds
+    except FileNotFoundError:
+        return False
+
+
+def _restore(claimed: str, target: str) -> str | None:
+    """Move a claimed file to target unless target exists, atomically.
+
+    Returns the restored path, or None if it can't be restored now.
+    """
+    try:
+        os.link(claimed, target)  # Fails if target exists, unlike rename
+    except (FileExistsError, FileNotFoundError):
+        return None  # A new file of that name arrived, or another worker reclaimed it first
+    except OSError:
+        # No hard links on this volume: rename to the claim's own name, which nothing else uses
+        target = os.path.join(os.path.dirname(target), os.path.basename(claimed))
+        try:
+            os.rename(claimed, target)
+        except FileNotFoundError:
+            return None
+        return target
+    try:
+        os.unlink(claimed)
+    except FileNotFoundError:
+        pass
+    return target
+
+
+def reclaim_expired(watch_dir: str, lease_seconds: float | None = None) -> list[str]:
+    """Move the claims of owners that are gone back into watch_dir. Returns the restored paths.
+
+    Several workers may reclaim at once; each claim is restored by only one of them.
+    """
+    lease_seconds = lease_seconds or _get_lease_seconds()
+    claim_dir = _claim_dir(watch_dir)
+    try:
+        names = os.listdir(claim_dir)
+    except FileNotFoundError:
+        return []
+
+    restored = []
+    alive: dict[str, bool] = {}
+    for claimed_name in names:
+        owner, _, fname = claimed_name.partition("@")
+        if not fname or not owner:
+            continue  # .owners/ and anything not written by claim()
+        if owner not in alive:
+            alive[owner] = _owner_alive(watch_dir, owner, lease_seconds)
+        if alive[owner]:
+            continue
+        # If a new file of the same name arrived, this one is restored once that one is processed
+        restored_path = _restore(os.path.join(claim_dir, claimed_name), os.path.join(watch_dir, fname))
+        if restored_path is not None:
+            restored.append(restored_path)
+
+    for owner, is_alive in alive.items():
+        if not is_alive:
+            try:
+                os.remove(_heartbeat_path(watch_dir, owner))
+            except OSError:
+                pass
+    return restored
+
+
+def claimed_counts(watch_dir: str) -> dict[str, int]:
+    """Number of files currently claimed, per owner."""
+    counts: dict[str, int] = {}
+    try:
+        names = os.listdir(_claim_dir(watch_dir))
+    except FileNotFoundError:
+        return counts
+    for claimed_name in names:
+        owner, _, fname = claimed_name.partition("@")
+        if fname and owner:
+            counts[owner] = counts.get(owner, 0) + 1
+    return counts
@@ -0,0 +1,85 @@
+"""Compressed log inputs — read .gz and .zst log files as decompressed streams.
+
+open_log() returns a binary stream of a log file's decompressed bytes that
+decompresses as it is read, so an archived log is never expanded as a
+whole, neither in memory nor on disk. Multi-member gzip files (e.g. from
+`cat a.gz b.gz`) and zstd files of several concatenated frames are read to
+the end. Reading .zst requires the `zstandard` package.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import os
+from typing import BinaryIO
+
+COMPRESSED_EXTENSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+# Read size of the buffered readers that line iteration goes through
+READ_SIZE = 1024 * 1024
+
+
+def compression(name: str) -> str | None:
+    """"gzip" or "zstd" by file name extension, or None for an uncompressed file."""
+    return COMPRESSED_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+
+
+def base_name(name: str) -> str:
+    """File name without its compression extension ("api.log.gz" -> "api.log")."""
+    stem, ext = os.path.splitext(name)
+    return stem if ext.lower() in COMPRESSED_EXTENSIONS else name
+
+
+def _zstd_reader(fileobj: BinaryIO, closefd: bool) -> BinaryIO:
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("reading .zst logs requires the zstandard package (pip install zstandard)") from None
+    reader = zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True, closefd=closefd)
+    return io.BufferedReader(reader, READ_SIZE)
+
+
+def open_stream(fileobj: BinaryIO, name: str) -> BinaryIO:
+    """Decompressed view of an open binary file named name (e.g. an upload).
+
+    Closing the returned stream leaves fileobj open, unless it is fileobj itself.
+    """
+    kind = compression(name)
+    if kind == "gzip":
+        # GzipFile reads across members; iterating its lines directly costs a Python call per line
+        return io.BufferedReader(gzip.GzipFile(fileobj=fileobj, mode="rb"), READ_SIZE)
+    if kind == "zstd":
+        return _zstd_reader(fileobj, closefd=False)
+    return fileobj
+
+
+def open_log(path: str) -> BinaryIO:
+    """Open a log file for reading its decompressed bytes (plain files are opened as they are)."""
+    kind = compression(path)
+    if kind == "gzip":
+        return io.BufferedReader(gzip.open(path, "rb"), READ_SIZE)
+    if kind == "zstd":
+        f = open(path, "rb")
+        try:
+            return _zstd_reader(f, closefd=True)
+        except Exception:
+            f.close()
+            raise
+    return open(path, "rb")
+
+
+def read_text(fileobj: BinaryIO, name: str, max_bytes: int) -> str:
+    """Decoded text of a possibly compressed file object.
+
+    Raises ValueError if it decompresses to more than max_bytes.
+    """
+    stream = open_stream(fileobj, name)
+    try:
+        data = stream.read(max_bytes + 1)
+    finally:
+        if stream is not fileobj:
+            stream.close()
+    if len(data) > max_bytes:
+        raise ValueError(f"{name} decompresses to more than {max_bytes // (1024 * 1024)} MB")
+    return data.decode("utf-8", errors="replace")
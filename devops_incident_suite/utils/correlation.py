@@ -0,0 +1,343 @@
+"""Event correlation engine — links log entries into an event graph and ranks clusters.
+
+Nodes are log entries. Edges connect entries that are close in time, that
+reference another service by name, or that share a request/trace ID.
+Temporal edges alone never chain events further than MAX_TEMPORAL_SPAN
+apart, so a busy log is not merged into one cluster.
+Connected components (via union-find) become candidate clusters for the
+Root Cause Correlator agent.
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# Max gap (seconds) between consecutive events for a temporal edge
+TIME_WINDOW = 60
+
+# Max span (seconds) of a run of events linked by temporal edges alone
+MAX_TEMPORAL_SPAN = 300
+
+# Max distance (seconds) between a service mention and the entry it links to
+REFERENCE_WINDOW = 300
+
+REQUEST_ID_PATTERN = re.compile(
+    r"\b(?:x-request-id|request[_-]?id|req[_-]?id|trace[_-]?id|correlation[_-]?id)"
+    r"[\s:=#]+([\w.-]{4,})",
+    re.IGNORECASE,
+)
+
+# Streaming: force-close sessions older than this many seconds behind the newest event
+MAX_SESSION_SPAN = 900
+
+# Streaming: max buffered events per deployment before the oldest are force-closed
+MAX_BUFFERED_EVENTS = 10_000
+
+ACTIONABLE_LEVELS = {"CRITICAL", "ERROR", "WARN", "WARNING"}
+
+SEVERITY_WEIGHTS = {"CRITICAL": 3, "ERROR": 2, "WARN": 1, "WARNING": 1}
+
+EDGE_KINDS = ("temporal", "service_ref", "request_id")
+
+# Weights of the normalized cluster score components (sum to 1)
+SCORE_WEIGHTS = {
+    "service_diversity": 0.3,
+    "severity": 0.25,
+    "cross_reference": 0.3,
+    "time_tightness": 0.15,
+}
+
+
+def parse_timestamp(ts: str) -> datetime | None:
+    """Parse a YYYY-MM-DD HH:MM:SS timestamp. Returns None on failure."""
+    try:
+        ts = ts.strip()[:19]
+        if len(ts) != 19:
+            return None
+        return datetime.fromisoformat(ts)
+    except (ValueError, AttributeError):
+        return None
+
+
+def epoch_seconds(entries: list[dict]) -> list[float | None]:
+    """Parse each entry's timestamp once into (naive) epoch seconds."""
+    times: list[float | None] = []
+    for e in entries:
+        dt = parse_timestamp(e.get("timestamp", ""))
+        times.append(dt.timestamp() if dt else None)
+    return times
+
+
+class _DisjointSet:
+    """Union-find with path halving and union by size."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
+
+def _service_matcher(services: set[str]) -> re.Pattern | None:
+    """Compile one alternation that finds any known service name in a message."""
+    names = sorted({s.lower() for s in services if s}, key=lambda s: (-len(s), s))
+    if not names:
+        return None
+    return re.compile("|".join(re.escape(n) for n in names))
+
+
+def _nearest(times: list[float], idxs: list[int], t: float, limit: float) -> int | None:
+    """Return the index whose time is closest to `t` within `limit` seconds."""
+    pos = bisect.bisect_left(times, t)
+    best, best_gap = None, limit
+    for p in (pos - 1, pos):
+        if 0 <= p < len(times):
+            gap = abs(times[p] - t)
+            if gap <= best_gap:
+                best, best_gap = idxs[p], gap
+    return best
+
+
+def build_edges(
+    entries: list[dict],
+    all_services: set[str],
+    times: list[float | None],
+    window: int = TIME_WINDOW,
+    reference_window: int = REFERENCE_WINDOW,
+    max_temporal_span: int = MAX_TEMPORAL_SPAN,
+) -> list[tuple[int, int, str]]:
+    """Build the event graph edges as (index_a, index_b, kind) tuples."""
+    edges: list[tuple[int, int, str]] = []
+
+    # Temporal proximity: link consecutive events (sliding, not anchored), but start a
+    # new run once it spans max_temporal_span, so steady traffic doesn't chain forever
+    timed = sorted((t, i) for i, t in enumerate(times) if t is not None)
+    run_start = timed[0][0] if timed else 0.0
+    for (t_prev, i_prev), (t_cur, i_cur) in zip(timed, timed[1:]):
+        if t_cur - t_prev <= window and t_cur - run_start <= max_temporal_span:
+            edges.append((i_prev, i_cur, "temporal"))
+        else:
+            run_start = t_cur
+
+    # Per-service time index for reference lookups
+    by_service: dict[str, tuple[list[float], list[int]]] = defaultdict(lambda: ([], []))
+    for t, i in timed:
+        svc = entries[i].get("service", "").lower()
+        by_service[svc][0].append(t)
+        by_service[svc][1].append(i)
+
+    matcher = _service_matcher(all_services)
+    last_mention: dict[str, tuple[float | None, int]] = {}
+    last_request: dict[str, int] = {}
+
+    for i in sorted(range(len(entries)), key=lambda k: (times[k] is None, times[k] or 0, k)):
+        entry = entries[i]
+        msg = entry.get("message", "")
+        own = entry.get("service", "").lower()
+        t = times[i]
+
+        if matcher is not None:
+            mentioned = {m.group(0) for m in matcher.finditer(msg.lower())}
+            mentioned.discard(own)
+            for svc in sorted(mentioned):
+                # Link to the referenced service's nearest event
+                if t is not None and svc in by_service:
+                    target = _nearest(*by_service[svc], t, reference_window)
+                    if target is not None:
+                        edges.append((i, target, "service_ref"))
+                # Link entries that reference the same service
+                prev = last_mention.get(svc)
+                if prev is not None:
+                    prev_t, prev_i = prev
+                    if t is None or prev_t is None or t - prev_t <= reference_window:
+                        edges.append((prev_i, i, "service_ref"))
+                last_mention[svc] = (t, i)
+
+        for rid in sorted({m.group(1).lower() for m in REQUEST_ID_PATTERN.finditer(msg)}):
+            if rid in last_request:
+                edges.append((last_request[rid], i, "request_id"))
+            last_request[rid] = i
+
+    return edges
+
+
+def _score_cluster(
+    members: list[dict], links: dict[str, int], span: float, window: int
+) -> tuple[float, dict[str, float]]:
+    """Score a cluster in [0, 1] from normalized components. Returns (score, breakdown)."""
+    services = {e.get("service", "") for e in members}
+    gaps = len(members) - 1
+    explicit = links["service_ref"] + 2 * links["request_id"]
+    breakdown = {
+        "service_diversity": min(len(services) / 5, 1.0),
+        "severity": sum(SEVERITY_WEIGHTS.get(e.get("level", ""), 0) for e in members) / (3 * len(members)),
+        "cross_reference": min(explicit / max(gaps, 1), 1.0),
+        "time_tightness": 1.0 / (1.0 + (span / max(gaps, 1)) / max(window, 1)),
+    }
+    breakdown = {k: round(v, 3) for k, v in breakdown.items()}
+    score = sum(SCORE_WEIGHTS[k] * v for k, v in breakdown.items())
+    return round(score, 3), breakdown
+
+
+def correlate(
+    entries: list[dict],
+    all_services: set[str],
+    window: int = TIME_WINDOW,
+    reference_window: int = REFERENCE_WINDOW,
+) -> list[dict]:
+    """Cluster entries into ranked correlation candidates.
+
+    Returns a list of cluster dicts (highest score first), each with
+    `entries`, `services`, `links` (edge counts by kind), `start`, `end`,
+    `score` and `score_breakdown`. Clusters with fewer than two entries are dropped.
+    """
+    if len(entries) < 2:
+        return []
+
+    times = epoch_seconds(entries)
+    edges = build_edges(entries, all_services, times, window, reference_window)
+    dsu = _DisjointSet(len(entries))
+    for a, b, _ in edges:
+        dsu.union(a, b)
+
+    members: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(entries)):
+        members[dsu.find(i)].append(i)
+
+    links: dict[int, dict[str, int]] = defaultdict(lambda: dict.fromkeys(EDGE_KINDS, 0))
+    for a, _, kind in edges:
+        links[dsu.find(a)][kind] += 1
+
+    clusters = []
+    for root, idxs in members.items():
+        if len(idxs) < 2:
+            continue
+        idxs.sort(key=lambda i: (entries[i].get("timestamp", ""), entries[i].get("line_number", 0)))
+        cluster_entries = [entries[i] for i in idxs]
+        stamps = [times[i] for i in idxs if times[i] is not None]
+        span = max(stamps) - min(stamps) if stamps else 0.0
+        score, breakdown = _score_cluster(cluster_entries, links[root], span, window)
+        clusters.append({
+            "entries": cluster_entries,
+            "services": sorted({e.get("service", "unknown") for e in cluster_entries}),
+            "links": links[root],
+            "start": cluster_entries[0].get("timestamp", ""),
+            "end": cluster_entries[-1].get("timestamp", ""),
+            "score": score,
+            "score_breakdown": breakdown,
+        })
+
+    clusters.sort(key=lambda c: (-c["score"], min(e.get("line_number", 0) for e in c["entries"])))
+    return clusters
+
+
+class StreamingCorrelator:
+    """Online sliding-window correlator for live event streams.
+
+    Keeps a time-ordered buffer of recent actionable events per deployment,
+    fed from any number of files. A session closes once an event arrives more
+    than `window` seconds after its last event; closed sessions are clustered
+    with `correlate()` and returned to the caller. Memory is bounded by
+    `max_span` (time-based eviction behind the newest event) and `max_events`.
+    """
+
+    def __init__(
+        self,
+        window: int = TIME_WINDOW,
+        max_span: int = MAX_SESSION_SPAN,
+        max_events: int = MAX_BUFFERED_EVENTS,
+    ):
+        self.window = window
+        self.max_span = max_span
+        self.max_events = max_events
+        self._buffers: dict[str, list[tuple[float, int, dict]]] = defaultdict(list)
+        self._services: dict[str, set[str]] = defaultdict(set)
+        self._last_add: dict[str, float] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, entries: list[dict], deployment: str = "default", source: str = "") -> list[dict]:
+        """Feed parsed entries from one input. Returns clusters whose windows closed."""
+        with self._lock:
+            buf = self._buffers[deployment]
+            services = self._services[deployment]
+            for e in entries:
+                if e.get("level", "") not in ACTIONABLE_LEVELS:
+                    continue
+                dt = parse_timestamp(e.get("timestamp", ""))
+                if dt is None:
+                    continue
+                if e.get("service", "unknown") != "unknown":
+                    services.add(e["service"])
+                bisect.insort(buf, (dt.timestamp(), next(self._seq), dict(e, source_file=source)))
+            self._last_add[deployment] = time.monotonic()
+            return self._drain(deployment, final=False)
+
+    def expire(self, idle_seconds: float) -> list[dict]:
+        """Close every open session of deployments that received no input for `idle_seconds`."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [d for d, t in self._last_add.items() if now - t >= idle_seconds and self._buffers[d]]
+            return [c for d in idle for c in self._drain(d, final=True)]
+
+    def flush(self) -> list[dict]:
+        """Close all open sessions of all deployments."""
+        with self._lock:
+            return [c for d in list(self._buffers) for c in self._drain(d, final=True)]
+
+    def pending(self) -> dict[str, int]:
+        """Number of buffered (not yet emitted) events per deployment."""
+        with self._lock:
+            return {d: len(buf) for d, buf in self._buffers.items() if buf}
+
+    def _drain(self, deployment: str, final: bool) -> list[dict]:
+        """Pop closed sessions off the front of the buffer and cluster them."""
+        buf = self._buffers[deployment]
+        if not buf:
+            return []
+
+        if final:
+            cut = len(buf)
+        else:
+            # Everything before the last gap wider than `window` can no longer grow
+            cut = 0
+            for k in range(len(buf) - 1, 0, -1):
+                if buf[k][0] - buf[k - 1][0] > self.window:
+                    cut = k
+                    break
+            # Time-based eviction behind the newest event, then the hard size cap
+            newest = buf[-1][0]
+            cut = max(cut, bisect.bisect_left(buf, (newest - self.max_span,)))
+            cut = max(cut, len(buf) - self.max_events)
+
+        if cut == 0:
+            return []
+
+        closed = [e for _, _, e in buf[:cut]]
+        del buf[:cut]
+
+        clusters = correlate(closed, self._services[deployment], self.window)
+        for cluster in clusters:
+            cluster["deployment"] = deployment
+            cluster["sources"] = sorted({e.get("source_file", "") for e in cluster["entries"]})
+        return clusters
@@ -0,0 +1,90 @@
+"""Entry index — columnar view of a result's log entries for paginated, filtered display.
+
+Levels and services are dictionary-encoded into small integer arrays and
+timestamps into an epoch-seconds array, so level/service/time filters are a
+few vectorized comparisons regardless of result size. Text search only
+scans the messages that survive those filters. Only the requested page of
+entries is materialized.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from utils.correlation import epoch_seconds
+
+
+class EntryIndex:
+    """Dictionary-encoded level/service columns and epoch times over a list of entries."""
+
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        self.levels, level_codes = self._encode(e.get("level", "UNKNOWN") for e in entries)
+        self.services, service_codes = self._encode(e.get("service", "unknown") for e in entries)
+        self.level_codes = np.asarray(level_codes, dtype=np.int16)
+        self.service_codes = np.asarray(service_codes, dtype=np.int32)
+        self.line_numbers = np.asarray([e.get("line_number", 0) for e in entries], dtype=np.int64)
+        self.times = np.asarray(
+            [np.nan if t is None else t for t in epoch_seconds(entries)], dtype=np.float64
+        )
+        self._messages: list[str] | None = None
+
+    @staticmethod
+    def _encode(values) -> tuple[list[str], list[int]]:
+        vocab: dict[str, int] = {}
+        codes = [vocab.setdefault(v, len(vocab)) for v in values]
+        return list(vocab), codes
+
+    def time_range(self) -> tuple[float, float] | None:
+        """Earliest and latest parsed timestamp (epoch seconds), or None."""
+        if not np.any(~np.isnan(self.times)):
+            return None
+        return float(np.nanmin(self.times)), float(np.nanmax(self.times))
+
+    def _codes(self, vocab: list[str], wanted: list[str] | None) -> np.ndarray | None:
+        if wanted is None:
+            return None
+        wanted = set(wanted)
+        return np.asarray([i for i, v in enumerate(vocab) if v in wanted], dtype=np.int32)
+
+    def match(
+        self,
+        levels: list[str] | None = None,
+        services: list[str] | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        text: str = "",
+    ) -> np.ndarray:
+        """Positions of the entries matching every filter, in log order.
+
+        A None filter matches everything; a time filter drops entries without a timestamp.
+        """
+        mask = np.ones(len(self.entries), dtype=bool)
+        level_codes = self._codes(self.levels, levels)
+        if level_codes is not None:
+            mask &= np.isin(self.level_codes, level_codes)
+        service_codes = self._codes(self.services, services)
+        if service_codes is not None:
+            mask &= np.isin(self.service_codes, service_codes)
+        if start is not None:
+            mask &= self.times >= start
+        if end is not None:
+            mask &= self.times <= end
+
+        matches = np.flatnonzero(mask)
+        needle = text.strip().lower()
+        if needle:
+            if self._messages is None:
+                self._messages = [e.get("message", "").lower() for e in self.entries]
+            messages = self._messages
+            matches = np.asarray([i for i in matches.tolist() if needle in messages[i]], dtype=np.int64)
+        return matches
+
+    def locate(self, matches: np.ndarray, line_number: int) -> int | None:
+        """Position within matches of the entry at line_number, or None if it was filtered out."""
+        hits = np.flatnonzero(self.line_numbers[matches] == line_number)
+        return int(hits[0]) if len(hits) else None
+
+    def page(self, matches: np.ndarray, offset: int = 0, limit: int = 100) -> list[dict]:
+        """Materialize one page of matched entries."""
+        return [self.entries[i] for i in matches[offset:offset + limit].tolist()]
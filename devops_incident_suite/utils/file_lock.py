@@ -0,0 +1,42 @@
+"""File lock — serialize read-modify-write of a shared file across processes.
+
+The JSON indexes next to the results history (service baselines, service
+dependency graph) are updated by every process that saves results: the
+watcher threads, the worker daemon's processes, and other daemons sharing
+results_history/. locked() holds an exclusive flock on a sidecar
+"<path>.lock" file while an update re-reads, changes and rewrites the
+index, so no update is lost. Without fcntl (Windows) only the threads of
+one process are serialized.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_thread_lock = threading.Lock()
+
+
+@contextmanager
+def locked(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on path for the duration of the block. Not re-entrant."""
+    if fcntl is None:
+        with _thread_lock:
+            yield
+        return
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # flock belongs to the open file, so threads of one process exclude each other too
+    with open(f"{path}.lock", "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,234 @@
+"""File follower — `tail -F` for continuously appended log files.
+
+Tracks a byte offset per file and reads only complete new lines. A file
+whose inode changes was rotated: the old file is drained through its open
+handle, then the new one is read from the start. A file that shrinks below
+its offset was truncated and is re-read from the start. New lines are
+grouped into micro-batches per file, closed after `batch_lines` lines or
+`batch_seconds` after their first line.
+
+Offsets are committed only after a batch was handed off, and persisted as
+a small JSON file, so a restart resumes after the last delivered line. A
+batch whose delivery failed is handed back with fail(): it is retried with
+backoff, and its file is not read further until it was delivered, so the
+committed offset never passes undelivered lines. A file seen for the first
+time without a saved offset starts at its current end (like `tail -F`),
+unless it appeared after the follower started.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+_OFFSETS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "results_history", "follow_offsets.json"
+)
+
+# Bytes read from one file per poll, so one busy file cannot starve the others
+MAX_READ_BYTES = 4 * 1024 * 1024
+
+# Backoff before retrying a failed batch, doubling up to RETRY_MAX_SECONDS
+RETRY_BASE_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+
+
+@dataclass
+class _FileState:
+    ino: int
+    dev: int
+    offset: int  # After the last complete line read into `lines`
+    committed: int  # After the last line handed off in a batch
+    handle: BinaryIO | None = None
+    partial: bytes = b""
+    lines: list[str] = field(default_factory=list)
+    batch_started: float | None = None
+    retry: Batch | None = None  # Failed batch; the file is not read further until it is delivered
+
+
+@dataclass
+class Batch:
+    """Complete lines read from one file since its previous batch."""
+    path: str
+    lines: list[str]
+    end_offset: int
+    ino: int
+    attempts: int = 0
+    retry_at: float = 0.0
+
+
+class FileFollower:
+    """Follow files matching glob patterns and emit micro-batches of new lines."""
+
+    def __init__(self, patterns: list[str], batch_lines: int = 500, batch_seconds: float = 10.0):
+        self.patterns = patterns
+        self.batch_lines = batch_lines
+        self.batch_seconds = batch_seconds
+        self.files: dict[str, _FileState] = {}
+        self._saved = _load_offsets()
+        self._initial = True
+        self._orphans: list[Batch] = []  # Failed batches of files since rotated or deleted
+
+    def _paths(self) -> list[str]:
+        paths = set()
+        for pattern in self.patterns:
+            paths.update(p for p in glob.glob(os.path.expanduser(pattern)) if os.path.isfile(p))
+        return sorted(paths)
+
+    def _open(self, path: str, st: os.stat_result) -> _FileState:
+        saved = self._saved.pop(path, None)
+        if saved and (saved["ino"], saved["dev"]) == (st.st_ino, st.st_dev) and saved["offset"] <= st.st_size:
+            offset = saved["offset"]  # Resume after the last delivered line
+        elif saved or not self._initial:
+            offset = 0  # Rotated while we were down, or a new file
+        else:
+            offset = st.st_size  # Pre-existing file, never followed: start at its end
+        return _FileState(ino=st.st_ino, dev=st.st_dev, offset=offset, committed=offset)
+
+    def _read(self, path: str, state: _FileState) -> None:
+        """Read new complete lines into the state's buffer."""
+        if state.handle is None:
+            try:
+                state.handle = open(path, "rb")
+            except OSError:
+                return
+        state.handle.seek(state.offset + len(state.partial))
+        data = state.handle.read(MAX_READ_BYTES)
+        if not data:
+            return
+        data = state.partial + data
+        cut = data.rfind(b"\n") + 1
+        state.partial = data[cut:]
+        if cut:
+            state.lines.extend(data[:cut].decode("utf-8", errors="replace").splitlines())
+            state.offset += cut
+            if state.batch_started is None:
+                state.batch_started = time.time()
+
+    def _take(self, path: str, state: _FileState) -> Batch:
+        batch = Batch(path, state.lines, state.offset, state.ino)
+        state.lines, state.batch_started = [], None
+        return batch
+
+    def poll(self) -> list[Batch]:
+        """Read what was appended since the last poll; return the batches that are due."""
+        now = time.time()
+        batches = [b for b in self._orphans if b.retry_at <= now]
+        self._orphans = [b for b in self._orphans if b.retry_at > now]
+        seen = set()
+        for path in self._paths():
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            state = self.files.get(path)
+            if state is not None and state.retry is not None:
+                if state.retry.retry_at <= now:
+                    batches.append(state.retry)
+                    state.retry = None
+                continue  # Read on once the failed batch was delivered
+            if state is None:
+                state = self.files[path] = self._open(path, st)
+            elif (st.st_ino, st.st_dev) != (state.ino, state.dev):
+                # Rotated: drain the old file through its handle, then start on the new one
+                self._read(path, state)
+                if state.lines:
+                    batches.append(self._take(path, state))
+                if state.handle:
+                    state.handle.close()
+                state = self.files[path] = _FileState(ino=st.st_ino, dev=st.st_dev, offset=0, committed=0)
+            elif st.st_size < state.offset:
+                # Truncated in place: buffered lines are still valid, the rest restarts at 0
+                if state.lines:
+                    batches.append(self._take(path, state))
+                state.offset = state.committed = 0
+                state.partial = b""
+                self._persist()
+
+            self._read(path, state)
+            if state.lines and (
+                len(state.lines) >= self.batch_lines or now - state.batch_started >= self.batch_seconds
+            ):
+                batches.append(self._take(path, state))
+
+        for path in set(self.files) - seen:  # Deleted and not recreated yet
+            state = self.files.pop(path)
+            if state.retry is not None:
+                self._orphans.append(state.retry)
+            if state.lines:
+                batches.append(self._take(path, state))
+            if state.handle:
+                state.handle.close()
+
+        self._initial = False
+        return batches
+
+    def flush(self) -> list[Batch]:
+        """Every buffered and failed batch, due or not (e.g. on shutdown)."""
+        batches, self._orphans = self._orphans, []
+        for path, state in self.files.items():
+            if state.retry is not None:
+                batches.append(state.retry)
+                state.retry = None
+            elif state.lines:
+                batches.append(self._take(path, state))
+        return batches
+
+    def commit(self, batch: Batch) -> None:
+        """Record that a batch was delivered and persist every committed offset."""
+        state = self.files.get(batch.path)
+        if state is not None and state.ino == batch.ino and batch.end_offset <= state.offset:
+            state.committed = max(state.committed, batch.end_offset)
+        self._persist()
+
+    def fail(self, batch: Batch) -> None:
+        """Hand back a batch whose delivery failed, to be retried after a backoff.
+
+        Its lines stay uncommitted, so they are also re-read after a restart.
+        """
+        batch.attempts += 1
+        batch.retry_at = time.time() + min(RETRY_BASE_SECONDS * 2 ** (batch.attempts - 1), RETRY_MAX_SECONDS)
+        state = self.files.get(batch.path)
+        if state is not None and state.ino == batch.ino and state.retry is None:
+            state.retry = batch
+        else:
+            self._orphans.append(batch)
+
+    def _persist(self) -> None:
+        _save_offsets({
+            **self._saved,  # Files not seen again yet keep their offsets
+            **{path: {"ino": s.ino, "dev": s.dev, "offset": s.committed} for path, s in self.files.items()},
+        })
+
+    def pending_lines(self) -> int:
+        return (
+            sum(len(s.lines) + (len(s.retry.lines) if s.retry else 0) for s in self.files.values())
+            + sum(len(b.lines) for b in self._orphans)
+        )
+
+    def close(self) -> None:
+        for state in self.files.values():
+            if state.handle:
+                state.handle.close()
+                state.handle = None
+
+
+def _load_offsets() -> dict[str, dict]:
+    try:
+        with open(_OFFSETS_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _save_offsets(files: dict[str, dict]) -> None:
+    os.makedirs(os.path.dirname(_OFFSETS_PATH), exist_ok=True)
+    tmp_path = f"{_OFFSETS_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "files": files}, f, separators=(",", ":"))
+    os.replace(tmp_path, _OFFSETS_PATH)
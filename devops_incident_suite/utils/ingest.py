@@ -0,0 +1,393 @@
+"""HTTP ingestion — accept log pushes from shippers (Fluent Bit, Vector, curl) over HTTP.
+
+    POST /ingest/<source>     body: NDJSON, a JSON array, or plain text lines
+    GET  /health              buffer, backpressure and latency statistics
+
+An asyncio HTTP/1.1 server (keep-alive, optional gzip request bodies)
+appends pushed lines to a buffer per source. A buffer is flushed as a
+micro-batch once it holds `batch_lines` lines or BATCH_MAX_BYTES, or
+`batch_seconds` after its first line, and the batch is handed to the
+`analyze(source, lines)` callback on a thread pool.
+
+Backpressure: bytes buffered or waiting for analysis are bounded by
+`max_buffered_bytes`, and batches waiting for analysis by 4 per analysis
+worker. A push that would exceed either is refused with 429 and a
+Retry-After header before its body is read, so shippers back off and retry
+instead of the server growing without bound. A gzip body is decompressed up
+to MAX_DECOMPRESSED_BYTES (413 beyond that) and checked again at its
+decompressed size.
+
+The server has acknowledged a batch with 202, so a batch whose analysis
+fails is handed to the `spill(source, lines)` callback, if given, to be
+kept and retried elsewhere instead of being lost.
+
+JSON records are turned into "timestamp LEVEL [service] message" lines when
+they carry those fields, so the log classifier's regex fast path parses them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable
+
+log = logging.getLogger(__name__)
+
+# Largest accepted request body, and largest body after gzip decompression
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_DECOMPRESSED_BYTES = 64 * 1024 * 1024
+
+# A buffer is flushed at this many bytes even below its line limit
+BATCH_MAX_BYTES = 4 * 1024 * 1024
+
+# Recent latencies kept for the percentiles in stats()
+LATENCY_HISTORY = 2000
+
+# Seconds a refused shipper is asked to wait
+RETRY_AFTER_SECONDS = 1
+
+_MESSAGE_KEYS = ("message", "msg", "log", "line")
+_TIMESTAMP_KEYS = ("timestamp", "@timestamp", "time", "date")
+_LEVEL_KEYS = ("level", "severity", "lvl")
+_SERVICE_KEYS = ("service", "app", "component", "logger")
+
+_SOURCE_CHARS = re.compile(r"[^\w.-]")
+
+_REASONS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 411: "Length Required",
+            413: "Payload Too Large", 415: "Unsupported Media Type", 429: "Too Many Requests",
+            431: "Request Header Fields Too Large"}
+
+
+def _first(record: dict, keys: tuple[str, ...]):
+    return next((record[k] for k in keys if record.get(k) not in (None, "")), None)
+
+
+def record_line(record) -> str | None:
+    """One log line from a pushed JSON record, or None if it has no content."""
+    if isinstance(record, str):
+        return record
+    if not isinstance(record, dict):
+        return None
+    message = _first(record, _MESSAGE_KEYS)
+    if message is None:
+        return json.dumps(record, separators=(",", ":"))
+    message = str(message).rstrip("\n")
+    timestamp, level = _first(record, _TIMESTAMP_KEYS), _first(record, _LEVEL_KEYS)
+    if timestamp is None or level is None:
+        return message
+    if isinstance(timestamp, (int, float)):
+        timestamp = datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    service = _first(record, _SERVICE_KEYS)
+    prefix = f"{timestamp} {str(level).upper()}"
+    return f"{prefix} [{service}] {message}" if service else f"{prefix} {message}"
+
+
+def gunzip(body: bytes, limit: int) -> bytes | None:
+    """Decompress a gzip body; None if it decompresses to more than limit bytes.
+
+    Raises ValueError on a corrupt or truncated stream.
+    """
+    out = []
+    size = 0
+    try:
+        while body:  # Concatenated gzip members, like gzip.decompress()
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            chunk = decompressor.decompress(body, limit - size + 1)
+            size += len(chunk)
+            if size > limit:
+                return None
+            out.append(chunk)
+            if not decompressor.eof:
+                raise ValueError("truncated gzip stream")
+            body = decompressor.unused_data
+    except zlib.error as exc:
+        raise ValueError(str(exc)) from None
+    return b"".join(out)
+
+
+def parse_body(body: bytes, content_type: str) -> list[str]:
+    """Log lines from a request body. Raises ValueError on malformed JSON."""
+    text = body.decode("utf-8", errors="replace")
+    if "json" not in content_type:
+        return [line for line in text.splitlines() if line.strip()]
+
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        records = json.loads(stripped)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [line for line in map(record_line, records) if line]
+
+
+def percentiles(values) -> dict:
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    pick = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)]  # noqa: E731
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+@dataclass
+class _Buffer:
+    lines: list[str] = field(default_factory=list)
+    size: int = 0
+    first_at: float = 0.0
+
+
+class IngestServer:
+    """Per-source buffering HTTP ingestion server with size/time micro-batching."""
+
+    def __init__(
+        self,
+        analyze: Callable[[str, list[str]], None],
+        spill: Callable[[str, list[str]], None] | None = None,
+        host: str = "127.0.0.1",
+        port: int = 8086,
+        batch_lines: int = 500,
+        batch_seconds: float = 5.0,
+        max_buffered_bytes: int = 64 * 1024 * 1024,
+        workers: int = 4,
+    ):
+        self.analyze = analyze
+        self.spill = spill
+        self.host = host
+        self.port = port
+        self.batch_lines = batch_lines
+        self.batch_seconds = batch_seconds
+        self.max_buffered_bytes = max_buffered_bytes
+        self.workers = max(1, workers)
+        self.max_pending_batches = 4 * self.workers
+        self._buffers: dict[str, _Buffer] = {}
+        self._buffered_bytes = 0  # In buffers, and in batches waiting for or in analysis
+        self._pending_batches = 0
+        self._tasks: set[asyncio.Future] = set()
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()  # stats() is read from other threads
+        self._request_latency: deque[float] = deque(maxlen=LATENCY_HISTORY)
+        self._batch_latency: deque[float] = deque(maxlen=LATENCY_HISTORY)
+        self._counts = dict.fromkeys(
+            ("requests", "lines", "bytes", "rejected", "errors", "batches", "batch_failures", "spilled"), 0
+        )
+        self._started_at = time.time()
+        self.bound_port: int | None = None
+
+    # --- Buffers and batches ---
+
+    def _add(self, source: str, lines: list[str]) -> None:
+        buffer = self._buffers.setdefault(source, _Buffer())
+        if not buffer.lines:
+            buffer.first_at = time.time()
+        size = sum(len(line) + 1 for line in lines)
+        buffer.lines.extend(lines)
+        buffer.size += size
+        self._buffered_bytes += size
+        if len(buffer.lines) >= self.batch_lines or buffer.size >= BATCH_MAX_BYTES:
+            self._flush(source)
+
+    def _flush(self, source: str) -> None:
+        buffer = self._buffers.pop(source, None)
+        if not buffer or not buffer.lines:
+            return
+        self._pending_batches += 1
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self._executor, self._analyze_batch, source, buffer.lines)
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._batch_done(t, buffer))
+
+    def _analyze_batch(self, source: str, lines: list[str]) -> None:
+        """Analyze one batch on the thread pool; spill it if the analysis fails."""
+        try:
+            self.analyze(source, lines)
+            return
+        except Exception:
+            log.exception("Analysis of a %d-line batch from %s failed", len(lines), source)
+            with self._lock:
+                self._counts["batch_failures"] += 1
+        if self.spill is None:
+            return
+        try:
+            self.spill(source, lines)
+        except Exception:
+            log.exception("Could not spill a failed batch from %s; %d lines lost", source, len(lines))
+            return
+        with self._lock:
+            self._counts["spilled"] += 1
+
+    def _batch_done(self, task: asyncio.Future, buffer: _Buffer) -> None:
+        self._tasks.discard(task)
+        self._pending_batches -= 1
+        self._buffered_bytes -= buffer.size
+        with self._lock:
+            self._counts["batches"] += 1
+            self._batch_latency.append(time.time() - buffer.first_at)
+
+    def _flush_due(self) -> None:
+        now = time.time()
+        for source in [s for s, b in self._buffers.items() if now - b.first_at >= self.batch_seconds]:
+            self._flush(source)
+
+    def _overloaded(self, incoming: int) -> bool:
+        return (
+            self._buffered_bytes + incoming > self.max_buffered_bytes
+            or self._pending_batches >= self.max_pending_batches
+        )
+
+    # --- HTTP ---
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, body: dict, close: bool = False) -> None:
+        payload = json.dumps(body).encode()
+        headers = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(payload)}",
+        ]
+        if status == 429:
+            headers.append(f"Retry-After: {RETRY_AFTER_SECONDS}")
+        if close:
+            headers.append("Connection: close")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except ValueError:  # Longer than the stream limit: readline() raises ValueError
+                    await self._respond(writer, 400, {"error": "request line too long"}, close=True)
+                    break
+                if not request_line:
+                    break
+                started = time.perf_counter()
+                try:
+                    method, target, _ = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, close=True)
+                    break
+                headers: dict | None = {}
+                while True:
+                    try:
+                        line = await reader.readline()
+                    except ValueError:
+                        headers = None
+                        break
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                if headers is None:
+                    await self._respond(writer, 431, {"error": "request header line too long"}, close=True)
+                    break
+                status, body, close = await self._route(method, target.split("?")[0], headers, reader)
+                close = close or headers.get("connection", "").lower() == "close"
+                await self._respond(writer, status, body, close)
+                if method == "POST":
+                    with self._lock:
+                        self._request_latency.append(time.perf_counter() - started)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass  # Client went away mid-request
+        finally:
+            writer.close()
+
+    async def _route(
+        self, method: str, path: str, headers: dict, reader: asyncio.StreamReader
+    ) -> tuple[int, dict, bool]:
+        """(status, response body, close connection) for one request."""
+        if method == "GET" and path == "/health":
+            return 200, self.stats(), False
+        if method != "POST" or not (path == "/ingest" or path.startswith("/ingest/")):
+            return 404, {"error": "POST /ingest/<source>"}, True
+
+        if not headers.get("content-length", "").isdigit():
+            return 411, {"error": "Content-Length required"}, True
+        length = int(headers["content-length"])
+        if length > MAX_BODY_BYTES:
+            return 413, {"error": f"body larger than {MAX_BODY_BYTES} bytes"}, True
+        if self._overloaded(length):
+            # Refuse before reading the body; the connection is closed since the body is left unread
+            with self._lock:
+                self._counts["rejected"] += 1
+            return 429, {"error": "ingestion backlog full, retry later"}, True
+
+        body = await reader.readexactly(length)
+        try:
+            if headers.get("content-encoding", "").lower() == "gzip":
+                body = gunzip(body, MAX_DECOMPRESSED_BYTES)
+                if body is None:
+                    with self._lock:
+                        self._counts["errors"] += 1
+                    return 413, {"error": f"body larger than {MAX_DECOMPRESSED_BYTES} bytes decompressed"}, False
+                if self._overloaded(len(body)):
+                    with self._lock:
+                        self._counts["rejected"] += 1
+                    return 429, {"error": "ingestion backlog full, retry later"}, False
+            lines = parse_body(body, headers.get("content-type", "text/plain").lower())
+        except ValueError as exc:
+            with self._lock:
+                self._counts["errors"] += 1
+            return 400, {"error": f"unreadable body: {exc}"}, False
+
+        source = path[len("/ingest/"):] or headers.get("x-source", "") or "http"
+        source = _SOURCE_CHARS.sub("_", source)[:64]
+        if lines:
+            self._add(source, lines)
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["lines"] += len(lines)
+            self._counts["bytes"] += len(body)
+        return 202, {"accepted": len(lines)}, False
+
+    # --- Lifecycle ---
+
+    async def _serve(self, stop_event: threading.Event) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-batch")
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.bound_port = server.sockets[0].getsockname()[1]
+        tick = min(self.batch_seconds / 4, 0.5)
+        try:
+            while not stop_event.is_set():
+                await asyncio.sleep(tick)
+                self._flush_due()
+        finally:
+            server.close()
+            await server.wait_closed()
+            for source in list(self._buffers):
+                self._flush(source)
+            if self._tasks:
+                await asyncio.wait(self._tasks)
+            self._executor.shutdown(wait=True)
+
+    def run(self, stop_event: threading.Event) -> None:
+        """Serve until stop_event is set, then flush every buffer and wait for its analysis."""
+        asyncio.run(self._serve(stop_event))
+
+    def stats(self) -> dict:
+        """Throughput counters, buffer/backlog state and latency percentiles (seconds)."""
+        with self._lock:
+            counts = dict(self._counts)
+            request_latency = percentiles(self._request_latency)
+            batch_latency = percentiles(self._batch_latency)
+        elapsed = max(time.time() - self._started_at, 1e-9)
+        return {
+            **counts,
+            "lines_per_second": round(counts["lines"] / elapsed, 1),
+            "sources": len(self._buffers),
+            "buffered_bytes": self._buffered_bytes,
+            "max_buffered_bytes": self.max_buffered_bytes,
+            "pending_batches": self._pending_batches,
+            "max_pending_batches": self.max_pending_batches,
+            "request_latency": request_latency,
+            "batch_latency": batch_latency,
+        }
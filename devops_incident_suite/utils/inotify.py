@@ -0,0 +1,96 @@
+"""Minimal Linux inotify binding (ctypes) for the live folder watcher.
+
+Only what the watcher needs: watch one directory for files that finished
+writing (IN_CLOSE_WRITE) or were moved in (IN_MOVED_TO), and wait for those
+events with a timeout. `available()` is False on non-Linux platforms or when
+libc lacks inotify, in which case the watcher falls back to polling.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (name follows, NUL-padded)
+_READ_SIZE = 64 * 1024
+
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None and sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1, libc.inotify_add_watch  # noqa: B018 — raise AttributeError if missing
+            _libc = libc
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+
+def available() -> bool:
+    return _load_libc() is not None
+
+
+class DirectoryWatch:
+    """inotify watch on one directory; yields names of files written or moved into it."""
+
+    def __init__(self, path: str, mask: int = IN_CLOSE_WRITE | IN_MOVED_TO):
+        libc = _load_libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def read(self, timeout: float) -> tuple[list[str], bool]:
+        """Wait up to `timeout` seconds for events.
+
+        Returns (file names, overflowed); on overflow events were lost and the
+        caller should rescan the directory.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return [], False
+        try:
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return [], False
+
+        names, overflowed = [], False
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & (IN_Q_OVERFLOW | IN_IGNORED):
+                overflowed = True
+            elif name:
+                names.append(os.fsdecode(name))
+        return names, overflowed
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self) -> "DirectoryWatch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,283 @@
+"""Job store — durable SQLite queue of watched files for the live folder watcher.
+
+Every file picked up by the watcher becomes a job keyed by the SHA-256 of its
+content, so the same log dropped again under another name is recognized as a
+duplicate instead of being analyzed twice. Jobs move through the states
+
+    queued -> running -> done
+                      -> queued (retry after a backoff) -> ... -> failed
+
+A failed attempt is retried after JOB_RETRY_BASE_SECONDS, doubling up to
+JOB_RETRY_MAX_SECONDS, until JOB_MAX_ATTEMPTS attempts were made; the job is
+then dead-lettered (state "failed") with its last error and stays there
+until retry() requeues it.
+
+Once a job's result has been saved its reference is recorded on the job, so
+a crash between saving the result and moving the file does not re-run the
+pipeline. Jobs still "running" when the watcher starts were interrupted by a
+crash and are requeued by recover(); the interruption counts as an attempt,
+so a file that keeps killing the process still ends up dead-lettered.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_JOBS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results_history", "jobs.db")
+
+# Seconds a writer waits for another process's lock before failing
+_BUSY_TIMEOUT = 30
+
+_HASH_CHUNK = 1024 * 1024
+
+STATES = ("queued", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    state TEXT NOT NULL,
+    critical_count INTEGER NOT NULL DEFAULT 0,
+    error_count INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    result_ref TEXT,
+    worker TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (state, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_path ON jobs (path, state);
+"""
+
+_local = threading.local()
+
+
+def _get_max_attempts() -> int:
+    return int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+
+
+def _get_retry_base() -> float:
+    return float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+
+
+def _get_retry_max() -> float:
+    return float(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+
+
+def _connect() -> sqlite3.Connection:
+    """Per-thread connection to the job store, creating it on first use."""
+    path = _JOBS_PATH
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if columns and "worker" not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN worker TEXT")
+    conn.executescript(_SCHEMA)
+    _local.conn, _local.path = conn, path
+    return conn
+
+
+def content_hash(path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before the next attempt after `attempts` failed ones."""
+    return min(_get_retry_base() * 2 ** max(attempts - 1, 0), _get_retry_max())
+
+
+def enqueue(path: str, digest: str, priority: tuple[int, int] = (0, 0)) -> tuple[dict, bool]:
+    """Queue a file under its content hash. Returns (job, created).
+
+    `created` is False when a job with the same content already exists (in
+    any state); that job is returned unchanged. A file rewritten while its
+    job is still queued replaces that job with one for the new content.
+    """
+    conn = _connect()
+    now = time.time()
+    with conn:
+        stale = conn.execute(
+            "SELECT id FROM jobs WHERE path = ? AND state = 'queued' AND content_hash != ?", (path, digest)
+        ).fetchone()
+        if stale is not None:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (stale["id"],))
+        cursor = conn.execute(
+            """INSERT OR IGNORE INTO jobs
+               (content_hash, path, filename, state, critical_count, error_count,
+                next_attempt_at, created_at, updated_at)
+               VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?)""",
+            (digest, path, os.path.basename(path), priority[0], priority[1], now, now, now),
+        )
+    row = conn.execute("SELECT * FROM jobs WHERE content_hash = ?", (digest,)).fetchone()
+    return dict(row), cursor.rowcount == 1
+
+
+def get(job_id: int) -> dict | None:
+    row = _connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return dict(row) if row else None
+
+
+_DUE = """SELECT * FROM jobs WHERE state = 'queued' AND next_attempt_at <= ?
+          ORDER BY critical_count DESC, error_count DESC, next_attempt_at LIMIT ?"""
+
+
+def due(now: float | None = None, limit: int = 1000) -> list[dict]:
+    """Queued jobs whose next attempt is due, most CRITICAL/ERROR lines first."""
+    rows = _connect().execute(_DUE, (time.time() if now is None else now, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def claim(worker: str) -> dict | None:
+    """Atomically take the most urgent due job and mark it running for worker, or None.
+
+    BEGIN IMMEDIATE serializes concurrent claims, so each job goes to one
+    worker even across processes.
+    """
+    conn = _connect()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(_DUE, (now, 1)).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET state = 'running', worker = ?, updated_at = ? WHERE id = ?",
+                (worker, now, row["id"]),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return {**dict(row), "state": "running", "worker": worker} if row is not None else None
+
+
+def start(job_id: int) -> bool:
+    """Move a queued job to running. False if it is not queued (e.g. claimed elsewhere)."""
+    conn = _connect()
+    with conn:
+        cursor = conn.execute(
+            "UPDATE jobs SET state = 'running', updated_at = ? WHERE id = ? AND state = 'queued'",
+            (time.time(), job_id),
+        )
+    return cursor.rowcount == 1
+
+
+def record_result(job_id: int, ref: dict) -> None:
+    """Remember the saved result of a running job, so a retry skips the pipeline."""
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET result_ref = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(ref), time.time(), job_id),
+        )
+
+
+def result_ref(job: dict) -> dict | None:
+    return json.loads(job["result_ref"]) if job.get("result_ref") else None
+
+
+def finish(job_id: int) -> None:
+    conn = _connect()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET state = 'done', last_error = NULL, updated_at = ? WHERE id = ?",
+            (time.time(), job_id),
+        )
+
+
+def discard(job_id: int) -> None:
+    """Forget a job whose file is gone (claimed by a worker on another host, or removed).
+
+    If the same content shows up again it is queued as a new job.
+    """
+    conn = _connect()
+    with conn:
+        conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+def fail(job_id: int, error: str, retry: bool = True) -> str:
+    """Record a failed attempt. Requeues with backoff, or dead-letters the job.
+
+    Returns the job's new state ("queued" or "failed").
+    """
+    conn = _connect()
+    now = time.time()
+    with conn:
+        row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return "failed"
+        attempts = row["attempts"] + 1
+        state = "queued" if retry and attempts < _get_max_attempts() else "failed"
+        conn.execute(
+            """UPDATE jobs SET state = ?, attempts = ?, last_error = ?, next_attempt_at = ?, updated_at = ?
+               WHERE id = ?""",
+            (state, attempts, error[:2000], now + retry_delay(attempts), now, job_id),
+        )
+    return state
+
+
+def recover() -> int:
+    """Requeue jobs left running by a crash (counting it as a failed attempt). Returns how many."""
+    conn = _connect()
+    ids = [row["id"] for row in conn.execute("SELECT id FROM jobs WHERE state = 'running'")]
+    for job_id in ids:
+        fail(job_id, "interrupted: the watcher stopped while this job was running")
+    return len(ids)
+
+
+def release(worker: str) -> int:
+    """Requeue the running jobs of a worker that exited, like recover(). Returns how many."""
+    conn = _connect()
+    ids = [
+        row["id"] for row in conn.execute("SELECT id FROM jobs WHERE state = 'running' AND worker = ?", (worker,))
+    ]
+    for job_id in ids:
+        fail(job_id, f"interrupted: worker {worker} exited while this job was running")
+    return len(ids)
+
+
+def retry(job_id: int) -> bool:
+    """Requeue a dead-lettered job now, with a fresh attempt budget."""
+    conn = _connect()
+    now = time.time()
+    with conn:
+        cursor = conn.execute(
+            """UPDATE jobs SET state = 'queued', attempts = 0, next_attempt_at = ?, updated_at = ?
+               WHERE id = ? AND state = 'failed'""",
+            (now, now, job_id),
+        )
+    return cursor.rowcount == 1
+
+
+def dead_letters(limit: int = 50) -> list[dict]:
+    """Dead-lettered jobs, most recent first."""
+    rows = _connect().execute(
+        "SELECT * FROM jobs WHERE state = 'failed' ORDER BY updated_at DESC LIMIT ?", (limit,)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def counts() -> dict[str, int]:
+    """Number of jobs per state."""
+    counted = dict(_connect().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+    return {state: counted.get(state, 0) for state in STATES}
@@ -0,0 +1,247 @@
+"""Log slicer — split very large log files into time-ordered slices and merge their results.
+
+A file larger than the slice size is read as a stream (.gz and .zst files
+decompressed as they are read, see utils.compressed) and cut into slices
+of roughly that many bytes. Cuts fall on the first line after the size
+limit that starts a new timestamped entry, so multi-line entries (stack
+traces) are never split. Log files are appended in time order, so slices
+are time-ordered too and can be analyzed independently and concurrently.
+
+Each slice's result is cut down with reduce() as soon as it is done: its
+parsed entries are replaced by a sample (those its issues and causal chains
+refer to, plus the first SAMPLE_ENTRIES_PER_SLICE actionable ones), so the
+memory a large file needs follows the number of slices, not its size.
+
+merge_results() turns the reduced per-slice results into one result: line
+numbers are shifted to whole-file positions, issues with the same
+description are unified, duplicate tickets and risk predictions are
+collapsed, and causal chains that continue across a slice boundary are
+linked into a single chain.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Iterator
+
+from utils.compressed import open_log
+from utils.correlation import ACTIONABLE_LEVELS, TIME_WINDOW, parse_timestamp
+
+SEVERITY_ORDER = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
+PRIORITY_ORDER = {"Highest": 0, "High": 1, "Medium": 2, "Low": 3}
+CONFIDENCE_ORDER = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
+
+# Actionable entries kept per slice besides those referenced by its issues and chains
+SAMPLE_ENTRIES_PER_SLICE = 100
+
+# A line starting a new entry: "2024-01-15 10:23:45 ..." or "[Tue Jan 15 ...] ..."
+_ENTRY_START = re.compile(rb"^(?:\d{4}-\d{2}-\d{2}[\sT]\d{2}:\d{2}|\[)")
+
+
+@dataclass
+class Slice:
+    """Consecutive lines of a file, and how many non-empty lines precede them."""
+    index: int
+    text: str
+    line_offset: int
+
+
+def iter_slices(path: str, slice_bytes: int) -> Iterator[Slice]:
+    """Stream a file as slices of about slice_bytes, cut between entries.
+
+    slice_bytes counts decompressed bytes. If no entry start follows within
+    another slice_bytes, the slice is cut anyway.
+    """
+    index = line_offset = non_empty = 0
+    buffer = bytearray()  # One growing buffer rather than a list of lines: no per-line objects, no join copy
+    with open_log(path) as f:
+        for line in f:
+            size = len(buffer)
+            if size >= slice_bytes and (_ENTRY_START.match(line) or size >= 2 * slice_bytes):
+                yield Slice(index, buffer.decode("utf-8", errors="replace"), line_offset)
+                index += 1
+                line_offset += non_empty
+                buffer.clear()
+                non_empty = 0
+            buffer += line
+            if line.strip():
+                non_empty += 1
+    if buffer:
+        yield Slice(index, buffer.decode("utf-8", errors="replace"), line_offset)
+
+
+def reduce(result: dict) -> dict:
+    """Copy of a slice result with its log entries cut down to a sample.
+
+    Kept are the entries its issues and causal chains refer to, then the first
+    SAMPLE_ENTRIES_PER_SLICE actionable ones. `entry_count` records how many
+    entries the slice had.
+    """
+    entries = result.get("log_entries", [])
+    referenced = {n for issue in result.get("issues", []) for n in issue.get("source_entries", [])}
+    referenced.update(
+        evt.get("line_number") for chain in result.get("causal_chains", []) for evt in chain.get("chain", [])
+    )
+    sample, actionable = [], 0
+    for e in entries:
+        if e.get("line_number") in referenced:
+            sample.append(e)
+        elif actionable < SAMPLE_ENTRIES_PER_SLICE and e.get("level") in ACTIONABLE_LEVELS:
+            sample.append(e)
+            actionable += 1
+    return {**result, "log_entries": sample, "entry_count": len(entries)}
+
+
+def _key(text: str) -> str:
+    """Normalized text for matching the same finding across slices (numbers and case ignored)."""
+    return re.sub(r"\s+", " ", re.sub(r"\d+", "#", text.lower())).strip()
+
+
+def _shift(part: dict, offset: int) -> dict:
+    """Copy of a slice result with line numbers shifted by offset."""
+    if not offset:
+        return part
+    shifted = dict(part)
+    shifted["log_entries"] = [
+        {**e, "line_number": e.get("line_number", 0) + offset} for e in part.get("log_entries", [])
+    ]
+    shifted["issues"] = [
+        {**i, "source_entries": [n + offset for n in i.get("source_entries", [])]} for i in part.get("issues", [])
+    ]
+    shifted["causal_chains"] = [
+        {
+            **c,
+            "chain": [
+                {**evt, "line_number": evt["line_number"] + offset if evt.get("line_number") else 0}
+                for evt in c.get("chain", [])
+            ],
+        }
+        for c in part.get("causal_chains", [])
+    ]
+    return shifted
+
+
+def _merge_issues(parts: list[dict]) -> list[dict]:
+    merged: dict[str, dict] = {}
+    for part in parts:
+        for issue in part.get("issues", []):
+            key = _key(issue.get("issue", ""))
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**issue, "source_entries": list(issue.get("source_entries", []))}
+                continue
+            existing["source_entries"] = sorted(set(existing["source_entries"]) | set(issue.get("source_entries", [])))
+            if SEVERITY_ORDER.get(issue.get("severity"), 9) < SEVERITY_ORDER.get(existing.get("severity"), 9):
+                existing["severity"] = issue["severity"]
+    return list(merged.values())
+
+
+def _merge_tickets(parts: list[dict]) -> list[dict]:
+    merged: dict[str, dict] = {}
+    for part in parts:
+        for ticket in part.get("jira_tickets", []):
+            key = _key(ticket.get("summary", ""))
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**ticket, "labels": list(ticket.get("labels", []))}
+                continue
+            existing["labels"] = list(dict.fromkeys(existing["labels"] + ticket.get("labels", [])))
+            if PRIORITY_ORDER.get(ticket.get("priority"), 9) < PRIORITY_ORDER.get(existing.get("priority"), 9):
+                existing["priority"] = ticket["priority"]
+    return list(merged.values())
+
+
+def _merge_risks(parts: list[dict]) -> list[dict]:
+    merged: dict[tuple[str, str], dict] = {}
+    for part in parts:
+        for pred in part.get("risk_predictions", []):
+            key = (pred.get("service", "unknown"), _key(pred.get("prediction", "")))
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**pred, "evidence": list(pred.get("evidence", []))}
+                continue
+            existing["evidence"] = list(dict.fromkeys(existing["evidence"] + pred.get("evidence", [])))
+            if CONFIDENCE_ORDER.get(pred.get("risk_level"), 9) < CONFIDENCE_ORDER.get(existing.get("risk_level"), 9):
+                existing["risk_level"] = pred["risk_level"]
+    return list(merged.values())
+
+
+def _continues(a: dict, b: dict) -> bool:
+    """Whether chain b picks up where chain a ended: a shared service within the correlation window."""
+    if not a.get("chain") or not b.get("chain"):
+        return False
+    if not set(a.get("affected_services", [])) & set(b.get("affected_services", [])):
+        return False
+    t_end = parse_timestamp(a["chain"][-1].get("timestamp", ""))
+    t_start = parse_timestamp(b["chain"][0].get("timestamp", ""))
+    return t_end is not None and t_start is not None and 0 <= (t_start - t_end).total_seconds() <= TIME_WINDOW
+
+
+def _link(a: dict, b: dict) -> dict:
+    affected = list(dict.fromkeys(a.get("affected_services", []) + b.get("affected_services", [])))
+    # A linked chain is only as confident as its weakest part
+    confidence = max(a.get("confidence", "MEDIUM"), b.get("confidence", "MEDIUM"), key=lambda c: CONFIDENCE_ORDER.get(c, 9))
+    return {
+        **a,
+        "chain": a["chain"] + b["chain"],
+        "blast_radius": len(affected),
+        "affected_services": affected,
+        "confidence": confidence,
+        "summary": " ".join(s for s in (a.get("summary", ""), b.get("summary", "")) if s),
+    }
+
+
+def _merge_chains(parts: list[dict]) -> list[dict]:
+    """Concatenate chains, linking a chain of one slice with its continuation in the next."""
+    chains: list[dict] = []
+    previous: list[int] = []  # Positions in `chains` of the previous slice's chains
+    for part in parts:
+        current = []
+        for chain in part.get("causal_chains", []):
+            target = next((i for i in previous if _continues(chains[i], chain)), None)
+            if target is None:
+                chains.append(chain)
+                current.append(len(chains) - 1)
+            else:
+                chains[target] = _link(chains[target], chain)
+                current.append(target)  # May continue again into the next slice
+        previous = current
+    return chains
+
+
+def _merge_pruning(parts: list[dict]) -> dict:
+    """Candidate selection across slices; the token budget applies to each slice on its own."""
+    pruning = [p.get("rca_pruning") or {} for p in parts]
+    if not any(pruning):
+        return {}
+    merged: dict = {"slices": len(pruning)}
+    for key in ("candidates_total", "graph_confirmed", "estimated_tokens"):
+        merged[key] = sum(p.get(key, 0) for p in pruning)
+    merged["token_budget"] = max(p.get("token_budget", 0) for p in pruning)
+    for key in ("sent", "dropped", "graph_pruned"):
+        merged[key] = [item for p in pruning for item in p.get(key, [])]
+    return merged
+
+
+def merge_results(parts: list[tuple[Slice, dict]]) -> dict:
+    """One pipeline result from the (reduced) results of a file's slices, in any order.
+
+    `log_entries` is the slices' entry samples; `log_entries_total` counts
+    every parsed entry. Fields that summarize the whole result (cookbook,
+    notification) are left empty for the caller to produce from the merged issues.
+    """
+    shifted = [_shift(result, piece.line_offset) for piece, result in sorted(parts, key=lambda p: p[0].index)]
+    return {
+        "log_entries": [e for part in shifted for e in part.get("log_entries", [])],
+        "log_entries_total": sum(part.get("entry_count", len(part.get("log_entries", []))) for part in shifted),
+        "issues": _merge_issues(shifted),
+        "cookbook": "",
+        "jira_tickets": _merge_tickets(shifted),
+        "notification": None,
+        "causal_chains": _merge_chains(shifted),
+        "rca_pruning": _merge_pruning(shifted),
+        "risk_predictions": _merge_risks(shifted),
+        "risk_suppressed": [s for part in shifted for s in part.get("risk_suppressed", [])],
+        "error": "; ".join(part["error"] for part in shifted if part.get("error")),
+    }
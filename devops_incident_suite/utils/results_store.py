@@ -1,24 +1,380 @@
-"""Results store — save and load pipeline results for the incidents dashboard."""
+"""Results store — save and load pipeline results for the incidents dashboard.
+
+Each result is stored as a summary row plus a payload. Summaries live in a
+SQLite index (results_history/results.db) with processed_at, filename,
+source, highest severity, counts and processing time, so the dashboard
+pages through summaries and only opens a payload when one incident is
+loaded. Payloads are compressed, content-addressed blobs (utils.blob_store)
+referenced by digest. Per-run metadata (processed_at, processing time,
+filename, source) is kept in the row, not the blob, so identical analyses
+share one blob.
+
+Per-day totals and per-day/service/severity issue counts are rolled up in
+the same transaction that indexes a result, so the dashboard's headline
+numbers and trend charts cost O(days) rather than O(incidents x issues).
+Log messages, issues, root causes and ticket summaries are added to an FTS5
+full-text index at the same time (search()); on SQLite builds without FTS5
+they go to a plain table searched with LIKE instead.
+
+Results saved before the index existed are plain JSON files in
+results_history/; they are imported into the index once, on first use, and
+converted to blobs by the compactor, which also applies the retention policy
+(RESULTS_RETENTION_DAYS) and removes unreferenced blobs.
+"""
 
 from __future__ import annotations
 
 import json
 import os
-from datetime import date, datetime, timezone
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterator
+
+from utils import blob_store
 
 _RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results_history")
 
 SEVERITY_ORDER = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
 
+_INDEX_NAME = "results.db"
+
+# Seconds a writer waits for another process's lock before failing
+_BUSY_TIMEOUT = 30
+
+# Unreferenced blobs younger than this are kept: a save may be between storing its blob and indexing it
+COMPACT_GRACE_SECONDS = 3600
+
+
+def _get_retention_days() -> int:
+    """Days of results to keep; 0 keeps everything."""
+    return int(os.getenv("RESULTS_RETENTION_DAYS", "0"))
+
+
+def _get_compact_interval() -> int:
+    return int(os.getenv("RESULTS_COMPACT_INTERVAL", "3600"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    result_file TEXT PRIMARY KEY,
+    processed_at TEXT NOT NULL,
+    processed_date TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    source TEXT NOT NULL,
+    highest_severity TEXT,
+    severity_rank INTEGER NOT NULL,
+    issue_count INTEGER NOT NULL,
+    critical_count INTEGER NOT NULL,
+    high_count INTEGER NOT NULL,
+    medium_count INTEGER NOT NULL,
+    low_count INTEGER NOT NULL,
+    chain_count INTEGER NOT NULL,
+    risk_count INTEGER NOT NULL,
+    ticket_count INTEGER NOT NULL,
+    processing_time_seconds REAL,
+    payload_digest TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_date ON results (processed_date, processed_at);
+CREATE INDEX IF NOT EXISTS idx_results_filename ON results (filename);
+CREATE INDEX IF NOT EXISTS idx_results_source ON results (source);
+CREATE INDEX IF NOT EXISTS idx_results_severity ON results (severity_rank);
+CREATE INDEX IF NOT EXISTS idx_results_payload ON results (payload_digest);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT PRIMARY KEY,
+    incidents INTEGER NOT NULL,
+    issues INTEGER NOT NULL,
+    critical_high INTEGER NOT NULL,
+    chains INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_issues (
+    day TEXT NOT NULL,
+    service TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    issues INTEGER NOT NULL,
+    PRIMARY KEY (day, service, severity)
+);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    text, kind UNINDEXED, service UNINDEXED, result_file UNINDEXED,
+    line_number UNINDEXED, timestamp UNINDEXED
+)
+"""
+
+# Same columns without FTS5: searched with LIKE
+_PLAIN_SEARCH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_index (
+    text TEXT, kind TEXT, service TEXT, result_file TEXT, line_number INTEGER, timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_search_result ON search_index (result_file);
+"""
+
+_COLUMNS = (
+    "result_file", "processed_at", "processed_date", "filename", "source",
+    "highest_severity", "severity_rank", "issue_count", "critical_count", "high_count",
+    "medium_count", "low_count", "chain_count", "risk_count", "ticket_count",
+    "processing_time_seconds", "payload_digest",
+)
+
+# Result fields stored in the index row only; the payload blob holds the rest
+_ROW_FIELDS = ("processed_at", "processing_time_seconds", "filename", "source")
+
+_local = threading.local()
+_migration_lock = threading.Lock()
 
-def save_result(result: dict, filename: str, source: str) -> str:
-    """Save a pipeline result to results_history/.
 
-    Adds `source` and `processed_at` if not already present.
-    Returns the path to the saved file.
+def _summarize(result: dict, result_file: str, payload_digest: str | None = None) -> dict | None:
+    """Index row for a result, or None if its processed_at is unusable."""
+    processed_at = result.get("processed_at", "")
+    try:
+        processed_date = datetime.fromisoformat(processed_at).date().isoformat()
+    except (ValueError, TypeError):
+        return None
+
+    counts = dict.fromkeys(SEVERITY_ORDER, 0)
+    for issue in result.get("issues", []):
+        severity = issue.get("severity", "LOW")
+        if severity in counts:
+            counts[severity] += 1
+    highest = next((s for s in SEVERITY_ORDER if counts[s]), None)
+
+    return {
+        "result_file": result_file,
+        "processed_at": processed_at,
+        "processed_date": processed_date,
+        "filename": result.get("filename", "unknown"),
+        "source": result.get("source", "unknown"),
+        "highest_severity": highest,
+        "severity_rank": SEVERITY_ORDER.get(highest, len(SEVERITY_ORDER)),
+        "issue_count": len(result.get("issues", [])),
+        "critical_count": counts["CRITICAL"],
+        "high_count": counts["HIGH"],
+        "medium_count": counts["MEDIUM"],
+        "low_count": counts["LOW"],
+        "chain_count": len(result.get("causal_chains", [])),
+        "risk_count": len(result.get("risk_predictions", [])),
+        "ticket_count": len(result.get("jira_tickets", [])),
+        "processing_time_seconds": result.get("processing_time_seconds"),
+        "payload_digest": payload_digest,
+    }
+
+
+def _index_rows(conn: sqlite3.Connection, rows: list[dict]) -> None:
+    conn.executemany(
+        f"INSERT OR REPLACE INTO results ({', '.join(_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+        [tuple(row[c] for c in _COLUMNS) for row in rows],
+    )
+
+
+def _issue_services(result: dict) -> list[str]:
+    """Service of each issue: the service of its first source entry."""
+    services = {e.get("line_number"): e.get("service", "unknown") for e in result.get("log_entries", [])}
+    return [
+        next((services[n] for n in issue.get("source_entries", []) if n in services), "unknown")
+        for issue in result.get("issues", [])
+    ]
+
+
+def _add_rollups(conn: sqlite3.Connection, result: dict, row: dict, sign: int = 1) -> None:
+    """Add one result to the per-day totals and per-day/service/severity issue counts (sign=-1 removes it)."""
+    day = row["processed_date"]
+    conn.execute(
+        "INSERT INTO daily_totals (day, incidents, issues, critical_high, chains) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (day) DO UPDATE SET incidents = incidents + excluded.incidents, "
+        "issues = issues + excluded.issues, critical_high = critical_high + excluded.critical_high, "
+        "chains = chains + excluded.chains",
+        (
+            day, sign, sign * row["issue_count"],
+            sign * (row["critical_count"] + row["high_count"]), sign * row["chain_count"],
+        ),
+    )
+    counts: dict[tuple[str, str], int] = {}
+    for issue, service in zip(result.get("issues", []), _issue_services(result)):
+        key = (service, issue.get("severity", "LOW"))
+        counts[key] = counts.get(key, 0) + 1
+    conn.executemany(
+        "INSERT INTO daily_issues (day, service, severity, issues) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (day, service, severity) DO UPDATE SET issues = issues + excluded.issues",
+        [(day, service, severity, sign * n) for (service, severity), n in counts.items()],
+    )
+    if sign < 0:
+        conn.execute("DELETE FROM daily_issues WHERE day = ? AND issues <= 0", (day,))
+
+
+def _add_search_docs(conn: sqlite3.Connection, result: dict, row: dict) -> None:
+    """Add a result's log messages, issues, root causes and ticket summaries to the full-text index.
+
+    Repeated log messages of a service are indexed once, at their first line.
     """
+    docs = []
+    seen: set[tuple[str, str]] = set()
+    lines = {}
+    for e in result.get("log_entries", []):
+        service, message = e.get("service", "unknown"), e.get("message", "")
+        lines.setdefault(e.get("line_number"), e)
+        if message and (service, message) not in seen:
+            seen.add((service, message))
+            docs.append((message, "log", service, e.get("line_number", 0), e.get("timestamp", "")))
+
+    for issue, service in zip(result.get("issues", []), _issue_services(result)):
+        first = next((lines[n] for n in issue.get("source_entries", []) if n in lines), {})
+        text = f"{issue.get('issue', '')} {issue.get('rationale', '')}".strip()
+        docs.append((text, "issue", service, first.get("line_number", 0), first.get("timestamp", "")))
+
+    for chain in result.get("causal_chains", []):
+        root = (chain.get("chain") or [{}])[0]
+        text = f"{chain.get('root_cause', '')} {chain.get('summary', '')}".strip()
+        docs.append((text, "root_cause", root.get("service", "unknown"), root.get("line_number", 0), root.get("timestamp", "")))
+
+    for ticket in result.get("jira_tickets", []):
+        docs.append((ticket.get("summary", ""), "ticket", "unknown", 0, ""))
+
+    conn.executemany(
+        "INSERT INTO search_index (text, kind, service, result_file, line_number, timestamp) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(text, kind, service, row["result_file"], line, ts) for text, kind, service, line, ts in docs if text],
+    )
+
+
+def _add_derived(conn: sqlite3.Connection, result: dict, row: dict) -> None:
+    _add_rollups(conn, result, row)
+    _add_search_docs(conn, result, row)
+
+
+def _remove_derived(conn: sqlite3.Connection, result_file: str) -> None:
+    """Take an indexed result out of the derived indexes before its row is replaced."""
+    old = conn.execute("SELECT * FROM results WHERE result_file = ?", (result_file,)).fetchone()
+    if old is None:
+        return
+    old = dict(old)
+    try:
+        result = _read_payload(result_file, old["payload_digest"], old)
+    except (json.JSONDecodeError, OSError, EOFError):
+        result = {}  # Payload gone: the totals can still be corrected from the row
+    _add_rollups(conn, result, old, sign=-1)
+    conn.execute("DELETE FROM search_index WHERE result_file = ?", (result_file,))
+
+
+# Indexes derived from payloads: meta flag -> (statements clearing them, function adding one result)
+_DERIVED = {
+    "rollups_built": (("DELETE FROM daily_totals", "DELETE FROM daily_issues"), _add_rollups),
+    "search_built": (("DELETE FROM search_index",), _add_search_docs),
+}
+
+
+def _backfill(conn: sqlite3.Connection, flags: list[str]) -> None:
+    """Rebuild the named derived indexes from every stored payload (one-time backfill)."""
+    for flag in flags:
+        for statement in _DERIVED[flag][0]:
+            conn.execute(statement)
+    for row in conn.execute("SELECT * FROM results").fetchall():
+        try:
+            result = _read_payload(row["result_file"], row["payload_digest"], dict(row))
+        except (json.JSONDecodeError, OSError, EOFError):
+            continue
+        for flag in flags:
+            _DERIVED[flag][1](conn, result, dict(row))
+
+
+def _import_json_files(conn: sqlite3.Connection) -> int:
+    """Index every results JSON file not yet in the index. Returns the number imported."""
+    known = {row[0] for row in conn.execute("SELECT result_file FROM results")}
+    imported = 0
+    for fname in os.listdir(_RESULTS_DIR):
+        if not fname.endswith(".results.json") or fname in known:
+            continue
+        try:
+            result = _read_payload(fname, None)
+        except (json.JSONDecodeError, OSError):
+            continue
+        row = _summarize(result, fname)
+        if row:
+            _index_rows(conn, [row])
+            _add_derived(conn, result, row)
+            imported += 1
+    return imported
+
+
+def _connect() -> sqlite3.Connection:
+    """Per-thread connection to the index, creating and migrating it on first use."""
+    path = os.path.join(_RESULTS_DIR, _INDEX_NAME)
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn
+
     os.makedirs(_RESULTS_DIR, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+    if columns and "payload_digest" not in columns:
+        conn.execute("ALTER TABLE results ADD COLUMN payload_digest TEXT")
+    conn.executescript(_SCHEMA)
+    _local.fts = _create_search_index(conn)
+
+    # One-time import of results saved before the index existed; BEGIN IMMEDIATE
+    # serializes concurrent first starts of the watcher and the UI
+    with _migration_lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = {row[0] for row in conn.execute("SELECT key FROM meta")}
+            now = datetime.now(timezone.utc).isoformat()
+            if "json_imported" not in done:
+                _import_json_files(conn)  # Also fills the derived indexes for what it imports
+                conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', ?)", (now,))
+                if not conn.execute("SELECT 1 FROM results WHERE payload_digest IS NOT NULL").fetchone():
+                    done.update(_DERIVED)  # Brand-new index: nothing else to backfill
+                    conn.executemany(
+                        "INSERT INTO meta (key, value) VALUES (?, ?)", [(flag, now) for flag in _DERIVED]
+                    )
+            missing = [flag for flag in _DERIVED if flag not in done]
+            if missing:
+                _backfill(conn, missing)
+                conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [(flag, now) for flag in missing])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    _local.conn, _local.path = conn, path
+    return conn
+
 
+def _create_search_index(conn: sqlite3.Connection) -> bool:
+    """Create the search table, as FTS5 if this SQLite build has it. Returns whether it is FTS5."""
+    existing = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'search_index'").fetchone()
+    if existing is not None:
+        return "fts5" in existing[0].lower()
+    try:
+        conn.execute(_FTS_SCHEMA)
+        return True
+    except sqlite3.OperationalError:
+        conn.executescript(_PLAIN_SEARCH_SCHEMA)
+        return False
+
+
+def reindex() -> int:
+    """Index results JSON files that are missing from the index (e.g. copied in by hand)."""
+    conn = _connect()
+    with conn:
+        return _import_json_files(conn)
+
+
+def save_result(result: dict, filename: str, source: str, record_baselines: bool = True) -> dict:
+    """Store a pipeline result as a compressed payload blob and index its summary.
+
+    Adds `source` and `processed_at` if not already present. With
+    record_baselines=False the entries are not added to the service
+    baselines (the caller already recorded them).
+    Returns the summary row (including `result_file` and `payload_digest`).
+    """
     if "processed_at" not in result:
         result["processed_at"] = datetime.now(timezone.utc).isoformat()
     if "source" not in result:
@@ -28,45 +384,283 @@ def save_result(result: dict, filename: str, source: str) -> str:
 
     ts = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
     safe_name = filename.replace("/", "_").replace("\\", "_")
-    out_name = f"{ts}_{safe_name}.results.json"
-    out_path = os.path.join(_RESULTS_DIR, out_name)
+    # Unique per save: one name is saved several times a second (clusters, follow batches, HTTP pushes)
+    result_file = f"{ts}_{uuid.uuid4().hex[:12]}_{safe_name}.results.json"
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, default=str)
+    row = _summarize(result, result_file)
+    if row is None:
+        raise ValueError(f"processed_at is not an ISO timestamp: {result['processed_at']!r}")
 
-    return out_path
+    conn = _connect()
+    replaced = conn.execute("SELECT 1 FROM results WHERE result_file = ?", (result_file,)).fetchone()
+    if replaced is None:
+        # Train the learned indexes on new results only, and before the row exists so a
+        # first-time rebuild doesn't count it twice
+        from utils.baselines import record_entries
+        from utils.service_graph import record_chains
+        record_chains(result.get("causal_chains", []))
+        if record_baselines:
+            record_entries(result.get("log_entries", []))
 
+    row["payload_digest"] = blob_store.put_json(_payload(result))
+    with conn:
+        _remove_derived(conn, result_file)  # Saved again under the same name: replace, don't count twice
+        _index_rows(conn, [row])
+        _add_derived(conn, result, row)
+    return row
 
-def load_results(from_date: date, to_date: date) -> list[dict]:
-    """Load results from results_history/ filtered by date range.
 
-    Returns a list of result dicts sorted by processed_at (newest first).
+def iter_results() -> Iterator[dict]:
+    """Yield every stored result dict (unordered)."""
+    if not os.path.isdir(_RESULTS_DIR):
+        return
+
+    for (result_file,) in _connect().execute("SELECT result_file FROM results").fetchall():
+        data = load_result(result_file)
+        if data is not None:
+            yield data
+
+
+def query_results(from_date: date, to_date: date, limit: int | None = None, offset: int = 0) -> list[dict]:
+    """Summary rows for results processed in the date range, newest first. Payloads are not read."""
+    if not os.path.isdir(_RESULTS_DIR):
+        return []
+
+    rows = _connect().execute(
+        "SELECT * FROM results WHERE processed_date BETWEEN ? AND ? "
+        "ORDER BY processed_at DESC LIMIT ? OFFSET ?",
+        (from_date.isoformat(), to_date.isoformat(), -1 if limit is None else limit, offset),
+    )
+    return [dict(row) for row in rows]
+
+
+def range_totals(from_date: date, to_date: date) -> dict:
+    """Incident, issue, CRITICAL/HIGH and causal chain totals for the date range (from daily rollups)."""
+    totals = {"incidents": 0, "issues": 0, "critical_high": 0, "chains": 0}
+    if not os.path.isdir(_RESULTS_DIR):
+        return totals
+
+    row = _connect().execute(
+        "SELECT SUM(incidents), SUM(issues), SUM(critical_high), SUM(chains) "
+        "FROM daily_totals WHERE day BETWEEN ? AND ?",
+        (from_date.isoformat(), to_date.isoformat()),
+    ).fetchone()
+    return dict(zip(totals, (value or 0 for value in row)))
+
+
+def daily_totals(from_date: date, to_date: date) -> list[dict]:
+    """Per-day incident, issue, CRITICAL/HIGH and chain counts, oldest first; days without results are 0."""
+    if not os.path.isdir(_RESULTS_DIR):
+        return []
+
+    rows = {
+        row["day"]: dict(row)
+        for row in _connect().execute(
+            "SELECT * FROM daily_totals WHERE day BETWEEN ? AND ?",
+            (from_date.isoformat(), to_date.isoformat()),
+        )
+    }
+    days = []
+    for offset in range((to_date - from_date).days + 1):
+        day = (from_date + timedelta(days=offset)).isoformat()
+        days.append(rows.get(day, {"day": day, "incidents": 0, "issues": 0, "critical_high": 0, "chains": 0}))
+    return days
+
+
+def issue_rollups(from_date: date, to_date: date, by: str = "severity", service: str | None = None) -> list[dict]:
+    """Issue counts per day grouped by "severity" or "service", optionally for one service.
+
+    Returns [{"day", by, "issues"}] rows, oldest first.
     """
+    if by not in ("severity", "service"):
+        raise ValueError(f"cannot group issue rollups by {by!r}")
     if not os.path.isdir(_RESULTS_DIR):
         return []
 
+    query = f"SELECT day, {by}, SUM(issues) AS issues FROM daily_issues WHERE day BETWEEN ? AND ?"
+    params: list = [from_date.isoformat(), to_date.isoformat()]
+    if service is not None:
+        query += " AND service = ?"
+        params.append(service)
+    query += f" GROUP BY day, {by} ORDER BY day, {by}"
+    return [dict(row) for row in _connect().execute(query, params)]
+
+
+def _phrases(text: str) -> list[str]:
+    """Words and "quoted phrases" of free search text."""
+    terms = re.findall(r'"([^"]+)"|(\S+)', text)
+    return [p for p in (phrase or word for phrase, word in terms) if p.strip('"')]
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word or "quoted phrase" must match."""
+    return " ".join('"' + p.replace('"', '""') + '"' for p in _phrases(text))
+
+
+def search(text: str, service: str | None = None, kinds: list[str] | None = None, limit: int = 50) -> list[dict]:
+    """Full-text search over past log messages, issues, root causes and ticket summaries.
+
+    Returns matches newest first with the incident (result_file, filename,
+    processed_at), the matching line and a highlighted snippet.
+    """
+    query = _fts_query(text)
+    if not query or not os.path.isdir(_RESULTS_DIR):
+        return []
+
+    conn = _connect()
+    if _local.fts:
+        sql = (
+            "SELECT s.kind, s.service, s.result_file, s.line_number, s.timestamp, "
+            "snippet(search_index, 0, '**', '**', '…', 16) AS snippet, r.filename, r.processed_at "
+            "FROM search_index s JOIN results r ON r.result_file = s.result_file "
+            "WHERE search_index MATCH ?"
+        )
+        params: list = [query]
+    else:
+        # No FTS5: every phrase must appear as a substring (case-insensitive for ASCII)
+        phrases = _phrases(text)
+        sql = (
+            "SELECT s.kind, s.service, s.result_file, s.line_number, s.timestamp, "
+            "substr(s.text, 1, 200) AS snippet, r.filename, r.processed_at "
+            "FROM search_index s JOIN results r ON r.result_file = s.result_file WHERE "
+            + " AND ".join("s.text LIKE ? ESCAPE '\\'" for _ in phrases)
+        )
+        params = [
+            "%" + p.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%" for p in phrases
+        ]
+    if service:
+        sql += " AND s.service = ?"
+        params.append(service)
+    if kinds:
+        sql += f" AND s.kind IN ({', '.join('?' * len(kinds))})"
+        params.extend(kinds)
+    sql += " ORDER BY r.processed_at DESC, s.line_number LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def _payload(result: dict) -> dict:
+    """A result without the per-run metadata that lives in its index row."""
+    return {key: value for key, value in result.items() if key not in _ROW_FIELDS}
+
+
+def _read_payload(result_file: str, payload_digest: str | None, row: dict | None = None) -> dict:
+    """Result from its blob, or from the legacy JSON file for results not yet compacted.
+
+    A blob's per-run metadata is filled in from row.
+    """
+    if not payload_digest:
+        with open(os.path.join(_RESULTS_DIR, os.path.basename(result_file)), "r", encoding="utf-8") as f:
+            return json.load(f)
+    data = blob_store.get_json(payload_digest)
+    for key in _ROW_FIELDS:
+        if row is not None and row.get(key) is not None:
+            data.setdefault(key, row[key])
+    return data
+
+
+def load_result(result_file: str) -> dict | None:
+    """Load one full result payload by its index `result_file`."""
+    row = _connect().execute("SELECT * FROM results WHERE result_file = ?", (result_file,)).fetchone()
+    row = dict(row) if row is not None else None
+    try:
+        data = _read_payload(result_file, row["payload_digest"] if row is not None else None, row)
+    except (json.JSONDecodeError, OSError, EOFError):
+        return None
+    data["_result_file"] = result_file
+    return data
+
+
+def load_results(from_date: date, to_date: date) -> list[dict]:
+    """Load full results from results_history/ filtered by date range.
+
+    Returns a list of result dicts sorted by processed_at (newest first).
+    Prefer query_results() + load_result() where only summaries are needed.
+    """
     results = []
-    for fname in os.listdir(_RESULTS_DIR):
-        if not fname.endswith(".results.json"):
-            continue
+    for row in query_results(from_date, to_date):
+        data = load_result(row["result_file"])
+        if data is not None:
+            results.append(data)
+    return results
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
 
-        fpath = os.path.join(_RESULTS_DIR, fname)
+
+def compact(retention_days: int | None = None) -> dict:
+    """Apply retention, convert legacy JSON payloads to blobs and drop unreferenced blobs.
+
+    Safe to run concurrently with saves and with other compactors. Returns counts of what was done.
+    """
+    stats = {"expired": 0, "converted": 0, "blobs_removed": 0, "bytes_freed": 0}
+    if not os.path.isdir(_RESULTS_DIR):
+        return stats
+    conn = _connect()
+    retention_days = _get_retention_days() if retention_days is None else retention_days
+
+    if retention_days > 0:
+        cutoff = (datetime.now(timezone.utc).date() - timedelta(days=retention_days)).isoformat()
+        expired = conn.execute(
+            "SELECT result_file, payload_digest FROM results WHERE processed_date < ?", (cutoff,)
+        ).fetchall()
+        with conn:
+            conn.execute(
+                "DELETE FROM search_index WHERE result_file IN "
+                "(SELECT result_file FROM results WHERE processed_date < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM results WHERE processed_date < ?", (cutoff,))
+            conn.execute("DELETE FROM daily_totals WHERE day < ?", (cutoff,))
+            conn.execute("DELETE FROM daily_issues WHERE day < ?", (cutoff,))
+        for row in expired:
+            if not row["payload_digest"]:
+                _remove(os.path.join(_RESULTS_DIR, row["result_file"]))
+        stats["expired"] = len(expired)
+
+    legacy = conn.execute("SELECT result_file FROM results WHERE payload_digest IS NULL").fetchall()
+    for (result_file,) in legacy:
+        path = os.path.join(_RESULTS_DIR, result_file)
         try:
-            with open(fpath, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            digest = blob_store.put_json(_payload(_read_payload(result_file, None)))
         except (json.JSONDecodeError, OSError):
             continue
+        with conn:
+            conn.execute(
+                "UPDATE results SET payload_digest = ? WHERE result_file = ?", (digest, result_file)
+            )
+        _remove(path)
+        stats["converted"] += 1
 
-        processed_at = data.get("processed_at", "")
+    referenced = {
+        row[0] for row in conn.execute("SELECT DISTINCT payload_digest FROM results WHERE payload_digest IS NOT NULL")
+    }
+    grace_cutoff = time.time() - COMPACT_GRACE_SECONDS
+    for digest, path in blob_store.iter_blobs():
+        if digest in referenced:
+            continue
         try:
-            dt = datetime.fromisoformat(processed_at)
-            result_date = dt.date()
-        except (ValueError, TypeError):
+            st = os.stat(path)
+        except FileNotFoundError:
             continue
+        if st.st_mtime < grace_cutoff and _remove(path):
+            stats["blobs_removed"] += 1
+            stats["bytes_freed"] += st.st_size
 
-        if from_date <= result_date <= to_date:
-            data["_result_file"] = fname
-            results.append(data)
+    return stats
 
-    results.sort(key=lambda r: r.get("processed_at", ""), reverse=True)
-    return results
+
+def start_compactor(stop_event: threading.Event, interval: int | None = None) -> None:
+    """Run compact() every `interval` seconds (RESULTS_COMPACT_INTERVAL) until stop_event is set."""
+    interval = interval or _get_compact_interval()
+    while not stop_event.is_set():
+        try:
+            compact()
+        except (OSError, sqlite3.Error):
+            pass  # A failed pass is retried on the next interval
+        stop_event.wait(timeout=interval)
@@ -0,0 +1,240 @@
+"""Risk state store — per-service rolling state that persists across pipeline runs.
+
+The Predictive Risk agent only sees one file at a time. This store keeps,
+per service, time-decayed event counters (short and long half-life), gap
+statistics (Welford mean/variance) and the last few values of each metric,
+so escalation that builds up over many small watcher drops is still visible.
+
+Each new event updates its service's state in O(1). Files are not always
+analyzed in time order (slices, worker threads and worker processes finish
+out of order), so an event up to REORDER_WINDOW_SECONDS older than the
+service's newest one is still counted: decayed counters are simply added at
+their age. Events seen before are recognized by their key within that
+window, so re-analysis of a file adds nothing; older events are ignored.
+
+State lives in SQLite (results_history/risk_state.db), one row per service:
+a run reads and writes only the services it saw, and concurrent worker
+processes serialize on the database lock instead of overwriting each other.
+Services not updated for STATE_TTL_SECONDS are evicted.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results_history")
+_STATE_PATH = os.path.join(_RESULTS_DIR, "risk_state.db")
+
+# JSON file used before the SQLite store; imported once
+_LEGACY_PATH = os.path.join(_RESULTS_DIR, "risk_state.json")
+
+# Seconds a writer waits for another process's lock before failing
+_BUSY_TIMEOUT = 30
+
+# Decay half-lives (seconds of event time) of the short- and long-term rate counters
+SHORT_HALF_LIFE = 300
+LONG_HALF_LIFE = 3600
+
+# How far (seconds of event time) an event may lag the service's newest one and
+# still count, and the width of the buckets that remember recent event keys
+REORDER_WINDOW_SECONDS = 600
+REORDER_BUCKET_SECONDS = 60
+
+# Event-time history a service needs before escalation can be reported
+WARMUP_SECONDS = 1800
+
+# Short-term rate must exceed the long-term rate by this factor
+ESCALATION_RATIO = 3.0
+MIN_SHORT_COUNT = 3.0
+
+# Last N values kept per metric, and wall-clock TTL of idle services
+METRIC_HISTORY = 20
+STATE_TTL_SECONDS = 7 * 86400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    service TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_services_updated ON services (updated_at);
+"""
+
+_local = threading.local()
+
+
+class ServiceState:
+    """Rolling state for one service; every update is O(1)."""
+
+    __slots__ = (
+        "first_ts", "last_ts", "recent", "short", "long", "events",
+        "gap_n", "gap_mean", "gap_m2", "metrics", "updated_at",
+    )
+
+    def __init__(self, data: dict | None = None):
+        data = data or {}
+        self.first_ts: float | None = data.get("first_ts")
+        self.last_ts: float | None = data.get("last_ts")
+        self.recent: dict[str, list[str]] = data.get("recent", {})  # Bucket start -> keys of its events
+        self.short: float = data.get("short", 0.0)
+        self.long: float = data.get("long", 0.0)
+        self.events: int = data.get("events", 0)
+        self.gap_n: int = data.get("gap_n", 0)
+        self.gap_mean: float = data.get("gap_mean", 0.0)
+        self.gap_m2: float = data.get("gap_m2", 0.0)
+        self.metrics: dict[str, list[list[float]]] = data.get("metrics", {})
+        self.updated_at: float = data.get("updated_at", 0.0)
+
+    def observe(self, t: float, key: str, metrics: dict[str, float]) -> bool:
+        """Fold one event (epoch seconds, dedupe key, metric values) into the state.
+
+        Returns False for an event already seen, or older than the reorder window.
+        """
+        if self.last_ts is not None and t < self.last_ts - REORDER_WINDOW_SECONDS:
+            return False
+        keys = self.recent.setdefault(str(int(t // REORDER_BUCKET_SECONDS) * REORDER_BUCKET_SECONDS), [])
+        if key in keys:
+            return False
+        keys.append(key)
+
+        if self.last_ts is None:
+            self.first_ts = self.last_ts = t
+            self.short = self.long = 1.0
+        elif t >= self.last_ts:
+            gap = t - self.last_ts
+            self.short = self.short * 0.5 ** (gap / SHORT_HALF_LIFE) + 1.0
+            self.long = self.long * 0.5 ** (gap / LONG_HALF_LIFE) + 1.0
+            if gap > 0:
+                self.gap_n += 1
+                delta = gap - self.gap_mean
+                self.gap_mean += delta / self.gap_n
+                self.gap_m2 += delta * (gap - self.gap_mean)
+            self.last_ts = t
+            horizon = t - REORDER_WINDOW_SECONDS - REORDER_BUCKET_SECONDS
+            for bucket in [b for b in self.recent if float(b) < horizon]:
+                del self.recent[bucket]
+        else:
+            # Late event: the counters are decayed to last_ts, so add it at its age there.
+            # Gap statistics only follow in-order arrivals.
+            age = self.last_ts - t
+            self.short += 0.5 ** (age / SHORT_HALF_LIFE)
+            self.long += 0.5 ** (age / LONG_HALF_LIFE)
+            self.first_ts = min(self.first_ts, t)
+
+        self.events += 1
+        for name, value in metrics.items():
+            history = self.metrics.setdefault(name, [])
+            bisect.insort(history, [t, value])
+            if len(history) > METRIC_HISTORY:
+                del history[0]
+        self.updated_at = time.time()
+        return True
+
+    def rates(self) -> tuple[float, float]:
+        """Short- and long-term event rates (events per minute).
+
+        A decayed counter only approaches rate * half_life / ln 2 after several
+        half-lives; dividing by (1 - 2^(-history / half_life)) corrects the
+        bias while the service's history is still short.
+        """
+        history = max((self.last_ts or 0) - (self.first_ts or 0), 1.0)
+
+        def rate(counter: float, half_life: float) -> float:
+            return 60 * counter * math.log(2) / half_life / (1 - 0.5 ** (history / half_life))
+
+        return rate(self.short, SHORT_HALF_LIFE), rate(self.long, LONG_HALF_LIFE)
+
+    def gap_std(self) -> float:
+        return math.sqrt(self.gap_m2 / (self.gap_n - 1)) if self.gap_n > 1 else 0.0
+
+    def is_escalating(self) -> bool:
+        """Warmed-up service whose short-term rate far exceeds its long-term rate."""
+        if self.first_ts is None or self.last_ts - self.first_ts < WARMUP_SECONDS:
+            return False
+        short_rate, long_rate = self.rates()
+        return self.short >= MIN_SHORT_COUNT and short_rate >= ESCALATION_RATIO * long_rate
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+def _connect() -> sqlite3.Connection:
+    """Per-thread connection to the state store, creating it (and importing the legacy JSON) on first use."""
+    path = _STATE_PATH
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == path:
+        return conn
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=_BUSY_TIMEOUT)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    if os.path.exists(_LEGACY_PATH):
+        _import_legacy(conn)
+    _local.conn, _local.path = conn, path
+    return conn
+
+
+def _import_legacy(conn: sqlite3.Connection) -> None:
+    try:
+        with open(_LEGACY_PATH, "r", encoding="utf-8") as f:
+            services = json.load(f).get("services", {})
+    except (OSError, json.JSONDecodeError):
+        services = {}
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO services (service, state, updated_at) VALUES (?, ?, ?)",
+            [
+                (svc, json.dumps(ServiceState(data).to_dict(), separators=(",", ":")), data.get("updated_at", 0.0))
+                for svc, data in services.items()
+            ],
+        )
+    try:
+        os.remove(_LEGACY_PATH)
+    except FileNotFoundError:
+        pass  # Another process imported it first
+
+
+def observe(events_by_service: dict[str, list[tuple[float, str, dict[str, float]]]]) -> dict[str, ServiceState]:
+    """Fold new (epoch seconds, dedupe key, metrics) events into the persisted state.
+
+    Only the services in events_by_service are read and written, in one
+    transaction. Returns the updated state of every service that received at
+    least one new event.
+    """
+    services = [svc for svc, events in events_by_service.items() if events]
+    if not services:
+        return {}
+
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM services WHERE updated_at < ?", (time.time() - STATE_TTL_SECONDS,))
+        rows = conn.execute(
+            f"SELECT service, state FROM services WHERE service IN ({', '.join('?' * len(services))})", services
+        ).fetchall()
+        states = {svc: ServiceState(json.loads(state)) for svc, state in rows}
+
+        touched: dict[str, ServiceState] = {}
+        for service in services:
+            state = states.setdefault(service, ServiceState())
+            for t, key, metrics in sorted(events_by_service[service], key=lambda ev: ev[0]):
+                if state.observe(t, key, metrics):
+                    touched[service] = state
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO services (service, state, updated_at) VALUES (?, ?, ?)",
+            [(svc, json.dumps(s.to_dict(), separators=(",", ":")), s.updated_at) for svc, s in touched.items()],
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return touched
@@ -0,0 +1,163 @@
+"""Service dependency graph — directed service edges learned from past causal chains.
+
+Every saved result contributes the consecutive service hops of its causal
+chains (with observed lag). The graph is persisted as a compact JSON index
+next to the results history and is used by the Root Cause Correlator to
+score and prune candidates, and to confirm well-established chains without
+an LLM call.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+from utils import file_lock
+from utils.correlation import parse_timestamp
+
+_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "results_history", "service_graph.json"
+)
+
+# An edge is "well established" once it was seen in at least this many chains
+ESTABLISHED_EDGE_COUNT = 3
+
+# Chains produced from the graph itself are tagged with this source and not re-learned
+GRAPH_CHAIN_SOURCE = "dependency_graph"
+
+_lock = threading.Lock()
+_cache: tuple[float, "ServiceGraph"] | None = None
+
+
+class ServiceGraph:
+    """Directed service edges with occurrence counts and mean lag."""
+
+    def __init__(self, edges: dict[tuple[str, str], list[float]] | None = None):
+        # (src, dst) -> [count, lag_samples, lag_sum_seconds]
+        self.edges: dict[tuple[str, str], list[float]] = edges or {}
+
+    def add_chains(self, chains: list[dict]) -> int:
+        """Learn edges from causal chains. Returns the number of hops recorded."""
+        added = 0
+        for chain in chains:
+            if chain.get("source") == GRAPH_CHAIN_SOURCE or chain.get("confidence") == "LOW":
+                continue
+            events = chain.get("chain", [])
+            for prev, cur in zip(events, events[1:]):
+                src, dst = prev.get("service", ""), cur.get("service", "")
+                if not src or not dst or src == dst or "unknown" in (src, dst):
+                    continue
+                stats = self.edges.setdefault((src, dst), [0, 0, 0.0])
+                stats[0] += 1
+                t_src = parse_timestamp(prev.get("timestamp", ""))
+                t_dst = parse_timestamp(cur.get("timestamp", ""))
+                if t_src and t_dst and t_dst >= t_src:
+                    stats[1] += 1
+                    stats[2] += (t_dst - t_src).total_seconds()
+                added += 1
+        return added
+
+    def count(self, src: str, dst: str) -> int:
+        return int(self.edges.get((src, dst), (0,))[0])
+
+    def mean_lag(self, src: str, dst: str) -> float | None:
+        stats = self.edges.get((src, dst))
+        if not stats or not stats[1]:
+            return None
+        return stats[2] / stats[1]
+
+    def is_established(self, src: str, dst: str) -> bool:
+        return self.count(src, dst) >= ESTABLISHED_EDGE_COUNT
+
+    def known_services(self) -> set[str]:
+        return {s for edge in self.edges for s in edge}
+
+    def support(self, services: list[str]) -> int:
+        """Total edge count between any ordered pair of the given services."""
+        return sum(self.count(a, b) for a in services for b in services if a != b)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 1,
+            "edges": [[src, dst, *stats] for (src, dst), stats in sorted(self.edges.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ServiceGraph":
+        return cls({(row[0], row[1]): list(row[2:5]) for row in data.get("edges", [])})
+
+
+def _write(graph: ServiceGraph) -> None:
+    os.makedirs(os.path.dirname(_INDEX_PATH), exist_ok=True)
+    tmp_path = f"{_INDEX_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(graph.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp_path, _INDEX_PATH)
+
+
+def _read() -> ServiceGraph | None:
+    try:
+        with open(_INDEX_PATH, "r", encoding="utf-8") as f:
+            return ServiceGraph.from_dict(json.load(f))
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+def _rebuild() -> ServiceGraph:
+    from utils.results_store import iter_results
+
+    graph = ServiceGraph()
+    for result in iter_results():
+        graph.add_chains(result.get("causal_chains", []))
+    _write(graph)
+    return graph
+
+
+def _remember(mtime: float, graph: ServiceGraph) -> None:
+    global _cache
+    with _lock:
+        _cache = (mtime, graph)
+
+
+def rebuild() -> ServiceGraph:
+    """Rebuild the index from every causal chain in the results history."""
+    with file_lock.locked(_INDEX_PATH):
+        graph = _rebuild()
+        _remember(os.path.getmtime(_INDEX_PATH), graph)
+    return graph
+
+
+def load_graph() -> ServiceGraph:
+    """Return the persisted graph, building it from history on first use."""
+    try:
+        mtime = os.path.getmtime(_INDEX_PATH)
+    except OSError:
+        mtime = None
+    with _lock:
+        if mtime is not None and _cache is not None and _cache[0] == mtime:
+            return _cache[1]
+
+    graph = _read() if mtime is not None else None
+    if graph is not None:
+        _remember(mtime, graph)  # Stat before read: a newer write only forces a re-read
+        return graph
+    with file_lock.locked(_INDEX_PATH):
+        graph = _read() or _rebuild()  # Another process may have built it meanwhile
+        _remember(os.path.getmtime(_INDEX_PATH), graph)
+    return graph
+
+
+def record_chains(chains: list[dict]) -> None:
+    """Incrementally add a new result's causal chains to the persisted graph.
+
+    The index is re-read and rewritten under an inter-process file lock, so
+    concurrent savers (worker processes, several daemons) don't lose updates.
+    """
+    if not chains:
+        return
+    with file_lock.locked(_INDEX_PATH):
+        graph = _read() or _rebuild()
+        if graph.add_chains(chains):
+            _write(graph)
+        _remember(os.path.getmtime(_INDEX_PATH), graph)
@@ -0,0 +1,97 @@
+"""Signal scanner — extracts numeric metrics and escalation pattern hits in one regex pass.
+
+A single compiled alternation with named groups tokenizes a log message;
+the tokens are then folded into a compact `signals` dict:
+
+    disk_percent, latency_ms, retry_count  first value of each metric
+    pool_usage, rate_value                 first "N/M connections" / "N/M req" as percent
+    brute_force, circuit_breaker           True when the signature is present
+    disk_critical                          first percentage following a "disk" mention
+    pool_exhaustion                        [current, total] when a pool is mentioned with a ratio
+
+Only keys that were found are present. The Log Classifier attaches the
+result to every entry so the Predictive Risk agent never rescans messages.
+"""
+
+from __future__ import annotations
+
+import re
+
+# Applied to the lowercased message. All number-led tokens share one branch
+# and the leading lookahead lets the engine skip positions that cannot start
+# any token, so one pass is cheaper than the ten separate searches it replaces.
+# Within a branch, longer tokens come before their prefixes.
+SCANNER = re.compile(
+    r"""
+    (?=[\dabcdflpr])
+    (?:
+        (?P<num>\d+)
+        (?: /(?P<den>\d+)(?P<unit>\s*connections?|\s*req)?
+          | (?P<ms>\s*ms)
+          | (?P<pct>%)
+        )
+      | (?P<word>
+            circuit\s*breaker | retries?\s*exhausted | retry\s*(?P<retry>\d+)
+          | brute\s*force | locked | failed\s*attempts | failed
+          | auth | login | credentials
+          | disk | connection\s*pool | pool\s*utilization
+        )
+    )
+    """,
+    re.VERBOSE,
+)
+
+METRIC_NAMES = ("disk_percent", "latency_ms", "retry_count", "pool_usage", "rate_value")
+
+_AUTH_WORDS = {"auth", "login", "credentials"}
+
+
+def scan_message(message: str) -> dict:
+    """Extract every metric and escalation pattern hit from a message in one pass."""
+    signals: dict = {}
+    ratio: list[int] | None = None
+    seen_failed = seen_disk = seen_pool = False
+
+    for m in SCANNER.finditer(message.lower()):
+        word = m.group("word")
+        if word is None:
+            num = int(m.group("num"))
+            if m.group("den") is not None:
+                den = int(m.group("den"))
+                ratio = ratio or [num, den]
+                unit = m.group("unit")
+                if unit and den:
+                    name = "rate_value" if unit.endswith("req") else "pool_usage"
+                    signals.setdefault(name, 100.0 * num / den)
+            elif m.group("ms") is not None:
+                signals.setdefault("latency_ms", float(num))
+            else:
+                signals.setdefault("disk_percent", float(num))
+                if seen_disk:
+                    signals.setdefault("disk_critical", num)
+        elif m.group("retry") is not None:
+            signals.setdefault("retry_count", float(m.group("retry")))
+        elif word in _AUTH_WORDS:
+            if seen_failed:
+                signals["brute_force"] = True
+        elif word == "failed":
+            seen_failed = True
+        elif word == "disk":
+            seen_disk = True
+        elif word.startswith(("circuit", "retr")):
+            signals["circuit_breaker"] = True
+        elif word.startswith(("connection", "pool")):
+            seen_pool = True
+        else:  # brute force, locked, failed attempts
+            signals["brute_force"] = True
+
+    if seen_pool and ratio is not None:
+        signals["pool_exhaustion"] = ratio
+    return signals
+
+
+def entry_signals(entry: dict) -> dict:
+    """Signals attached at classification time, scanning the message only if missing."""
+    if "signals" in entry:
+        return entry["signals"]
+    return scan_message(entry.get("message", ""))
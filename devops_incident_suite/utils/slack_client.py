@@ -1,14 +1,53 @@
-"""Slack webhook helper — supports live and dry-run modes."""
+"""Slack webhook helper — supports live and dry-run modes.
+
+Requests go through one pooled HTTP session per process, so repeated
+messages reuse a kept-alive connection instead of opening a new one each.
+"""
 
 from __future__ import annotations
 
 import os
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
+
+# Seconds to wait for Slack to answer one request
+TIMEOUT_SECONDS = 10
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+            session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+            _session = session
+        return _session
+
+
+def post_webhook(webhook_url: str, payload: dict) -> tuple[int, float | None]:
+    """POST a payload to a webhook. Returns (HTTP status, Retry-After seconds).
+
+    The status is 0 when Slack could not be reached (connection error or timeout).
+    """
+    try:
+        resp = _get_session().post(webhook_url, json=payload, timeout=TIMEOUT_SECONDS)
+    except requests.RequestException:
+        return 0, None
+    retry_after = resp.headers.get("Retry-After")
+    try:
+        return resp.status_code, float(retry_after) if retry_after else None
+    except ValueError:
+        return resp.status_code, None
 
 
 def send_slack_message(payload: dict) -> tuple[bool, str]:
-    """Send a Slack message via webhook.
+    """Send a Slack message via webhook, waiting for the answer.
 
     Returns:
         (sent: bool, mode: str) — whether the message was sent and which mode was used.
@@ -18,9 +57,7 @@ def send_slack_message(payload: dict) -> tuple[bool, str]:
     if not webhook_url:
         return False, "dry-run"
 
-    try:
-        resp = requests.post(webhook_url, json=payload, timeout=10)
-        resp.raise_for_status()
+    status, _ = post_webhook(webhook_url, payload)
+    if 200 <= status < 300:
         return True, "live"
-    except Exception:
-        return False, "dry-run (send failed)"
+    return False, "dry-run (send failed)"
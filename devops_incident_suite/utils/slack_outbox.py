@@ -0,0 +1,299 @@
+"""Slack outbox — asynchronous, coalescing, deduplicating delivery of notifications.
+
+notification.run() hands its message to the outbox and returns at once; a
+background thread delivers messages over the pooled Slack session
+(utils.slack_client), off the pipeline's critical path.
+
+- Dedupe: every message carries fingerprints of its issues (severity and
+  normalized description). A message whose fingerprints were all queued or
+  delivered within SLACK_DEDUPE_SECONDS is dropped; a storm of the same
+  incident pings once, and an escalated severity pings again.
+- Coalescing: messages queued within SLACK_COALESCE_SECONDS of the first
+  pending one are sent as one digest message.
+- Rate limit: at most SLACK_RATE_PER_SECOND messages per second (Slack
+  allows about one per second per webhook).
+- Retries: unreachable Slack, 5xx and 429 answers are retried with
+  exponential backoff (429 waits Retry-After) up to SLACK_MAX_ATTEMPTS
+  attempts; other answers drop the message.
+
+Pending messages are flushed when the process exits (close()). In the
+worker daemon, worker processes forward messages to the supervisor's
+outbox (set_forwarder), so coalescing, dedupe and the rate limit apply to
+all workers together.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from utils.slack_client import post_webhook
+
+# Slack limits: 50 blocks per message, 3000 characters per section text
+MAX_BLOCKS = 50
+MAX_SECTION_CHARS = 3000
+
+# Most messages combined into one digest
+MAX_DIGEST_MESSAGES = 20
+
+# Backoff after the first failed attempt, doubling up to RETRY_MAX_SECONDS
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+# How long close() keeps delivering pending messages at exit
+FLUSH_SECONDS = 10.0
+
+_forwarder: Callable[[dict], None] | None = None
+_outbox: SlackOutbox | None = None
+_outbox_lock = threading.Lock()
+
+
+def _get_coalesce_seconds() -> float:
+    return float(os.getenv("SLACK_COALESCE_SECONDS", "10"))
+
+
+def _get_dedupe_seconds() -> float:
+    return float(os.getenv("SLACK_DEDUPE_SECONDS", "900"))
+
+
+def _get_rate() -> float:
+    return float(os.getenv("SLACK_RATE_PER_SECOND", "1"))
+
+
+def _get_max_attempts() -> int:
+    return int(os.getenv("SLACK_MAX_ATTEMPTS", "5"))
+
+
+def issue_fingerprint(issue: dict) -> str:
+    """Stable identity of an issue across files: severity and description, numbers and case ignored."""
+    text = re.sub(r"\s+", " ", re.sub(r"\d+", "#", str(issue.get("issue", "")).lower())).strip()
+    return hashlib.sha1(f"{issue.get('severity', '')}|{text}".encode()).hexdigest()[:16]
+
+
+@dataclass
+class _Message:
+    webhook_url: str
+    payload: dict
+    fingerprints: list[str]
+    queued_at: float = field(default_factory=time.time)
+
+
+class SlackOutbox:
+    """Background sender: dedupe on queue, coalesce per window, rate limit and retry on delivery."""
+
+    def __init__(
+        self,
+        coalesce_seconds: float = 10.0,
+        dedupe_seconds: float = 900.0,
+        rate_per_second: float = 1.0,
+        max_attempts: int = 5,
+        post: Callable[[str, dict], tuple[int, float | None]] = post_webhook,
+    ):
+        self.coalesce_seconds = coalesce_seconds
+        self.dedupe_seconds = dedupe_seconds
+        self.min_interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.max_attempts = max(1, max_attempts)
+        self.post = post
+        self._pending: list[_Message] = []
+        self._recent: dict[str, float] = {}  # Fingerprint -> when it was last queued
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._flush_deadline = float("inf")
+        self._last_sent_at = 0.0
+        self._thread: threading.Thread | None = None
+        self._counts = dict.fromkeys(
+            ("queued", "deduplicated", "coalesced", "sent", "failed", "retries", "delivered_messages"), 0
+        )
+        self._queue_latency = 0.0  # Seconds from queued to delivered, summed over delivered messages
+
+    def start(self) -> SlackOutbox:
+        self._thread = threading.Thread(target=self._run, name="slack-outbox", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, webhook_url: str, payload: dict, fingerprints: list[str]) -> str:
+        """Queue a message. Returns "queued", or "deduplicated" if its issues were all notified recently."""
+        now = time.time()
+        with self._cond:
+            for fp, at in list(self._recent.items()):
+                if now - at > self.dedupe_seconds:
+                    del self._recent[fp]
+            if fingerprints and all(fp in self._recent for fp in fingerprints):
+                self._counts["deduplicated"] += 1
+                return "deduplicated"
+            for fp in fingerprints:
+                self._recent[fp] = now
+            self._pending.append(_Message(webhook_url, payload, list(fingerprints)))
+            self._counts["queued"] += 1
+            self._cond.notify()
+        return "queued"
+
+    # --- Delivery ---
+
+    def _next_batch(self) -> list[_Message] | None:
+        """Wait for the coalescing window of the oldest pending message; None once stopped and drained."""
+        with self._cond:
+            while not self._pending:
+                if self._stopping:
+                    return None
+                self._cond.wait()
+            while not self._stopping and len(self._pending) < MAX_DIGEST_MESSAGES:
+                remaining = self._pending[0].queued_at + self.coalesce_seconds - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            url = self._pending[0].webhook_url
+            batch = [m for m in self._pending if m.webhook_url == url][:MAX_DIGEST_MESSAGES]
+            taken = {id(m) for m in batch}
+            self._pending = [m for m in self._pending if id(m) not in taken]
+            return batch
+
+    def _wait(self, seconds: float) -> bool:
+        """Sleep (rate limit or backoff); False if that would run past the flush deadline at exit."""
+        if time.time() + seconds > self._flush_deadline:
+            return False
+        time.sleep(max(0.0, seconds))
+        return True
+
+    def _deliver(self, batch: list[_Message]) -> None:
+        payload = _digest(batch)
+        for attempt in range(1, self.max_attempts + 1):
+            if not self._wait(self._last_sent_at + self.min_interval - time.time()):
+                break
+            status, retry_after = self.post(batch[0].webhook_url, payload)
+            self._last_sent_at = time.time()
+            if 200 <= status < 300:
+                with self._cond:
+                    self._counts["sent"] += 1
+                    self._counts["delivered_messages"] += len(batch)
+                    self._counts["coalesced"] += len(batch) - 1
+                    self._queue_latency += sum(self._last_sent_at - m.queued_at for m in batch)
+                return
+            if status and status != 429 and status < 500:
+                break  # Bad webhook or payload: retrying won't help
+            if attempt == self.max_attempts:
+                break
+            delay = retry_after if status == 429 and retry_after else min(
+                RETRY_BASE_SECONDS * 2 ** (attempt - 1), RETRY_MAX_SECONDS
+            )
+            with self._cond:
+                self._counts["retries"] += 1
+            if not self._wait(delay):
+                break
+
+        with self._cond:
+            self._counts["failed"] += len(batch)
+            # Not delivered, so the next occurrence of these issues should notify again
+            for fp in (fp for m in batch for fp in m.fingerprints):
+                self._recent.pop(fp, None)
+
+    def _run(self) -> None:
+        while (batch := self._next_batch()) is not None:
+            try:
+                self._deliver(batch)
+            except Exception:
+                with self._cond:
+                    self._counts["failed"] += len(batch)
+
+    def close(self, timeout: float = FLUSH_SECONDS) -> None:
+        """Deliver what is pending without waiting out coalescing windows, for up to timeout seconds."""
+        with self._cond:
+            self._stopping = True
+            self._flush_deadline = time.time() + timeout
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            counts = dict(self._counts)
+            pending = len(self._pending)
+            latency = self._queue_latency
+        delivered = counts.pop("delivered_messages")
+        return {
+            **counts,
+            "pending": pending,
+            "mean_delivery_seconds": round(latency / delivered, 2) if delivered else 0.0,
+        }
+
+
+def _digest(batch: list[_Message]) -> dict:
+    """One Slack payload for a batch: the message itself, or a digest of several."""
+    if len(batch) == 1:
+        return batch[0].payload
+    texts = [m.payload.get("text", "") for m in batch]
+    header = f":rotating_light: *{len(batch)} incident notifications*"
+    blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": header}}]
+    for text in texts:
+        if len(blocks) + 2 > MAX_BLOCKS:
+            break  # Still in the plain-text fallback
+        blocks.append({"type": "divider"})
+        blocks.append({"type": "section", "text": {"type": "mrkdwn", "text": text[:MAX_SECTION_CHARS]}})
+    return {
+        "channel": batch[0].payload.get("channel"),
+        "text": "\n\n".join([header, *texts])[:40000],
+        "blocks": blocks,
+    }
+
+
+def get_outbox() -> SlackOutbox:
+    """This process's outbox, started on first use and flushed at exit."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = SlackOutbox(
+                coalesce_seconds=_get_coalesce_seconds(),
+                dedupe_seconds=_get_dedupe_seconds(),
+                rate_per_second=_get_rate(),
+                max_attempts=_get_max_attempts(),
+            ).start()
+            atexit.register(_outbox.close)
+        return _outbox
+
+
+def set_forwarder(forward: Callable[[dict], None] | None) -> None:
+    """Send this process's messages to forward(message) instead of delivering them here."""
+    global _forwarder
+    _forwarder = forward
+
+
+def submit_message(message: dict) -> str:
+    """Queue a message as produced by notify() (e.g. forwarded from a worker process)."""
+    return get_outbox().submit(message["webhook_url"], message["payload"], message["fingerprints"])
+
+
+def notify(payload: dict, issues: list[dict]) -> str:
+    """Queue a Slack message about issues. Returns the notification mode.
+
+    "dry-run" without SLACK_WEBHOOK_URL, else "queued" or "deduplicated".
+    """
+    webhook_url = os.getenv("SLACK_WEBHOOK_URL", "")
+    if not webhook_url:
+        return "dry-run"
+    message = {
+        "webhook_url": webhook_url,
+        "payload": payload,
+        "fingerprints": list(dict.fromkeys(issue_fingerprint(i) for i in issues)),
+    }
+    if _forwarder is not None:
+        _forwarder(message)
+        return "queued"
+    return submit_message(message)
+
+
+def close(timeout: float = FLUSH_SECONDS) -> None:
+    """Deliver this process's pending messages and stop its outbox, if it was started."""
+    if _outbox is not None:
+        _outbox.close(timeout)
+
+
+def outbox_stats() -> dict | None:
+    """Delivery statistics of this process's outbox, or None if nothing was queued yet."""
+    outbox = _outbox
+    return outbox.stats() if outbox is not None else None
@@ -0,0 +1,22 @@
+"""Stub LLM — answers every prompt with "[]" after a fixed latency, without calling an API.
+
+Selected with LLM_PROVIDER=stub, for running the pipeline and the worker
+daemon offline and for benchmarks. Regex-parsed logs still yield entries,
+signals and correlation results; LLM-derived issues and tickets are empty.
+"""
+
+from __future__ import annotations
+
+import time
+
+from langchain_core.messages import AIMessage
+
+
+class StubLLM:
+    def __init__(self, latency_seconds: float = 0.5, reply: str = "[]"):
+        self.latency_seconds = latency_seconds
+        self.reply = reply
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        time.sleep(self.latency_seconds)
+        return AIMessage(content=self.reply)
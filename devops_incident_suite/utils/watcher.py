@@ -1,57 +1,88 @@
-"""Live folder watcher — polls a directory for new log files and runs the pipeline."""
+"""Live folder watcher — picks up new log files in a directory and runs the pipeline."""
 
 from __future__ import annotations
 
+import itertools
 import json
+import logging
 import os
 import shutil
 import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from typing import Iterator
+
+from utils import claims, compressed, inotify, job_store
+from utils.correlation import StreamingCorrelator
+from utils.follower import Batch, FileFollower
+from utils.log_slicer import Slice, iter_slices, merge_results, reduce
+from utils.work_queue import WorkerPool, prescan_priority
 
 VALID_EXTENSIONS = {".log", ".txt", ".csv", ".json"}
 
+# Close streamed correlation windows after this many seconds without new files
+CORRELATOR_IDLE_SECONDS = 60
+
+# Longest an inotify wait blocks before checking stop_event and expiring correlation windows
+STOP_CHECK_SECONDS = 1.0
+
+# How long stopping the watcher waits for in-flight files to finish
+WORKER_SHUTDOWN_SECONDS = 30
+
+_active_pool: WorkerPool | None = None
+
+log = logging.getLogger(__name__)
+
+
+def _get_workers() -> int:
+    return int(os.getenv("WATCHER_WORKERS", "2"))
+
+
+def _get_queue_size() -> int:
+    return int(os.getenv("WATCHER_QUEUE_SIZE", "100"))
+
+
+def _get_slice_bytes() -> int:
+    """Files larger than this are analyzed in time-ordered slices of about this size."""
+    return int(float(os.getenv("WATCHER_SLICE_MB", "64")) * 1024 * 1024)
+
+
+def _get_slice_workers() -> int:
+    return int(os.getenv("WATCHER_SLICE_WORKERS", "4"))
 
-def _get_pending_files(watch_dir: str, processed_dir: str) -> list[str]:
-    """Return files in watch_dir that haven't been processed yet."""
+
+def _get_watcher_mode() -> str:
+    """"inotify", "poll", or "auto" (inotify when available, else polling)."""
+    return os.getenv("WATCHER_MODE", "auto").lower()
+
+
+def _is_log_file(fname: str) -> bool:
+    """A log file by extension, also when compressed ("api.log.gz", "events.json.zst")."""
+    return os.path.splitext(compressed.base_name(fname))[1].lower() in VALID_EXTENSIONS
+
+
+def _get_pending_files(watch_dir: str) -> list[str]:
+    """Return the log files currently in watch_dir."""
     if not os.path.isdir(watch_dir):
         return []
 
-    processed_names = set(os.listdir(processed_dir)) if os.path.isdir(processed_dir) else set()
     pending = []
-
     for fname in os.listdir(watch_dir):
         fpath = os.path.join(watch_dir, fname)
         if not os.path.isfile(fpath):
             continue
-        ext = os.path.splitext(fname)[1].lower()
-        if ext not in VALID_EXTENSIONS:
-            continue
-        if fname in processed_names:
+        if not _is_log_file(fname):
             continue
         pending.append(fpath)
 
     return sorted(pending)
 
 
-def _process_file(file_path: str, processed_dir: str) -> dict | None:
-    """Read a log file, run the pipeline, save results, and move the file."""
-    from graph import run_pipeline
-
-    fname = os.path.basename(file_path)
-    os.makedirs(processed_dir, exist_ok=True)
-
-    start = time.time()
-
-    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-        raw_logs = f.read()
-
-    result = run_pipeline(raw_logs, fname)
-    elapsed = time.time() - start
-
-    # Build results with metadata
-    output = {
-        "filename": fname,
+def _output(result: dict, name: str, elapsed: float) -> dict:
+    """Result record with metadata from a final pipeline state."""
+    return {
+        "filename": name,
         "processed_at": datetime.now(timezone.utc).isoformat(),
         "processing_time_seconds": round(elapsed, 2),
         "log_entries": result.get("log_entries", []),
@@ -60,50 +91,437 @@ def _process_file(file_path: str, processed_dir: str) -> dict | None:
         "jira_tickets": result.get("jira_tickets", []),
         "notification": result.get("notification"),
         "causal_chains": result.get("causal_chains", []),
+        "rca_pruning": result.get("rca_pruning", {}),
         "risk_predictions": result.get("risk_predictions", []),
+        "risk_suppressed": result.get("risk_suppressed", []),
     }
 
-    # Save results JSON
-    results_path = os.path.join(processed_dir, f"{fname}.results.json")
-    with open(results_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, default=str)
 
-    # Move original file to processed
+def analyze_text(raw_logs: str, name: str) -> dict:
+    """Run the pipeline on raw log text and build the result with metadata."""
+    from graph import run_pipeline
+
+    start = time.time()
+    result = run_pipeline(raw_logs, name)
+    return _output(result, name, time.time() - start)
+
+
+def _analyze_slices(slices: Iterator[Slice], name: str) -> dict:
+    """Analyze a large file as concurrent time-ordered slices merged into one result.
+
+    Slices are read lazily, at most two per worker ahead of the analysis.
+    As each slice finishes, its entries are recorded in the service baselines
+    and then cut down to a sample (log_slicer.reduce), so neither the file's
+    text nor all of its parsed entries are held in memory at once. Each slice
+    runs the pipeline without a notification; the cookbook and the Slack
+    notification are produced once, from the merged issues.
+    """
+    from agents import cookbook, notification
+    from graph import get_llm, run_pipeline
+    from utils.baselines import record_entries
+
+    def analyze(piece: Slice) -> tuple[Slice, dict]:
+        result = run_pipeline(piece.text, f"{name} [slice {piece.index + 1}]", notify=False)
+        record_entries(result.get("log_entries", []))
+        return piece, reduce(result)
+
+    start = time.time()
+    workers = max(1, _get_slice_workers())
+    parts: list[tuple[Slice, dict]] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watcher-slice") as executor:
+        pending = set()
+        for piece in slices:
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                parts.extend(future.result() for future in done)
+            pending.add(executor.submit(analyze, piece))
+        parts.extend(future.result() for future in pending)
+
+    merged = merge_results(parts)
+    llm = get_llm()
+    merged.update(cookbook.run(merged, llm))
+    merged.update(notification.run(merged, llm))
+    output = _output(merged, name, time.time() - start)
+    output["slices"] = len(parts)
+    output["log_entries_total"] = merged["log_entries_total"]
+    return output
+
+
+def _processed_path(processed_dir: str, fname: str, digest: str | None) -> str:
+    """Destination in processed_dir; a name already taken there gets a content-hash suffix."""
     dest_path = os.path.join(processed_dir, fname)
+    if digest and os.path.exists(dest_path):
+        stem, ext = os.path.splitext(fname)
+        dest_path = os.path.join(processed_dir, f"{stem}.{digest[:12]}{ext}")
+    return dest_path
+
+
+def _process_file(
+    file_path: str, processed_dir: str, job: dict | None = None, fname: str | None = None
+) -> dict | None:
+    """Read a log file, run the pipeline, save results, and move the file.
+
+    Files larger than WATCHER_SLICE_MB are analyzed in slices (_analyze_slices).
+    With a job whose result was already saved (the watcher crashed before
+    moving the file), the saved result is reused instead of re-running the pipeline.
+    fname is the file's name in the watch directory, if file_path is a claimed copy.
+
+    Compressed files (.gz, .zst) are decompressed as a stream into the
+    slicer; their size is only known once read, so the first two slices are
+    read to tell a small file (one slice, analyzed whole) from a large one.
+    """
+    fname = fname or os.path.basename(file_path)
+    os.makedirs(processed_dir, exist_ok=True)
+    from utils.results_store import load_result, save_result
+
+    ref = job_store.result_ref(job) if job else None
+    if ref is None:
+        slice_bytes = _get_slice_bytes()
+        if compressed.compression(fname) is None and os.path.getsize(file_path) <= slice_bytes:
+            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                raw_logs = f.read()
+            output = analyze_text(raw_logs, fname)
+        else:
+            slices = iter_slices(file_path, slice_bytes)
+            head = list(itertools.islice(slices, 2))
+            if len(head) < 2:
+                output = analyze_text(head[0].text if head else "", fname)
+            else:
+                output = _analyze_slices(itertools.chain(head, slices), fname)
+
+        # Store the payload once in the results store; processed/ only keeps a reference to it
+        # A sliced result only keeps a sample of its entries; the slices already recorded them all
+        summary = save_result(output, fname, source="watcher", record_baselines="slices" not in output)
+        ref = {key: summary[key] for key in ("filename", "processed_at", "result_file", "payload_digest")}
+        if job:
+            job_store.record_result(job["id"], ref)
+    else:
+        output = load_result(ref["result_file"])
+
+    # Move original file to processed, next to the reference to its result
+    dest_path = _processed_path(processed_dir, fname, job["content_hash"] if job else None)
+    with open(f"{dest_path}.results.json", "w", encoding="utf-8") as f:
+        json.dump(ref, f, indent=2)
     shutil.move(file_path, dest_path)
 
-    # Also save to results_history for the dashboard
+    return output
+
+
+def _move_duplicate(file_path: str, processed_dir: str, original: dict) -> None:
+    """Move a file whose content was already queued or analyzed, without analyzing it again."""
+    fname = os.path.basename(file_path)
+    dest_path = _processed_path(processed_dir, fname, original["content_hash"])
+    ref = {**(job_store.result_ref(original) or {}), "filename": fname, "duplicate_of": original["filename"]}
+    with open(f"{dest_path}.results.json", "w", encoding="utf-8") as f:
+        json.dump(ref, f, indent=2)
+    shutil.move(file_path, dest_path)
+
+
+def analyze_clusters(clusters: list[dict]) -> None:
+    """Run root cause analysis on streamed clusters that span more than one file.
+
+    The saved result holds the causal chains and references to the cluster's
+    entries (source file and line), not the entries themselves: each file's
+    own result already recorded them in the baselines, rollups and search index.
+    """
+    if not clusters:
+        return
+    from agents import root_cause
+    from graph import get_llm
     from utils.results_store import save_result
-    save_result(output, fname, source="watcher")
 
+    for cluster in clusters:
+        sources = cluster.get("sources", [])
+        if len(sources) < 2:
+            continue  # Single-file clusters were already analyzed by that file's pipeline
+
+        start = time.time()
+        try:
+            rca = root_cause.run({"log_entries": cluster["entries"], "issues": []}, get_llm())
+        except Exception:
+            continue  # Each file's own result is already saved; cross-file analysis is best effort
+        elapsed = time.time() - start
+
+        output = {
+            "filename": " + ".join(sources),
+            "processed_at": datetime.now(timezone.utc).isoformat(),
+            "processing_time_seconds": round(elapsed, 2),
+            "deployment": cluster.get("deployment", "default"),
+            "log_entries": [],
+            "entry_refs": [
+                {"source_file": e.get("source_file", ""), "line_number": e.get("line_number", 0)}
+                for e in cluster["entries"]
+            ],
+            "issues": [],
+            "causal_chains": rca.get("causal_chains", []),
+            "rca_pruning": rca.get("rca_pruning", {}),
+            "risk_predictions": [],
+        }
+        save_result(output, output["filename"], source="correlator")
+
+
+def _open_watch(watch_dir: str) -> inotify.DirectoryWatch | None:
+    """inotify watch on watch_dir per WATCHER_MODE, or None to poll."""
+    mode = _get_watcher_mode()
+    if mode == "poll" or not inotify.available():
+        return None
+    try:
+        return inotify.DirectoryWatch(watch_dir)
+    except OSError:
+        return None  # e.g. inotify watch limit reached; polling still works
+
+
+def enqueue_files(paths: list[str], processed_dir: str, seen: dict[str, tuple[int, int]]) -> None:
+    """Add new files to the job store, moving files whose content was already seen to processed_dir.
+
+    `seen` maps paths already enqueued to their (ctime_ns, size), so files
+    left in the watch directory (e.g. dead-lettered ones) are not hashed again.
+    The ctime changes when a file is renamed back from a claim, so a file
+    reclaimed from a dead worker is looked at again.
+    """
+    for fpath in paths:
+        try:
+            st = os.stat(fpath)
+            key = (st.st_ctime_ns, st.st_size)
+            if seen.get(fpath) == key:
+                continue
+            job, created = job_store.enqueue(fpath, job_store.content_hash(fpath), prescan_priority(fpath))
+            seen[fpath] = key
+            if not created and job["state"] != "failed" and (job["path"] != fpath or job["state"] == "done"):
+                _move_duplicate(fpath, processed_dir, job)
+                seen.pop(fpath, None)
+        except OSError:
+            continue  # Vanished or unreadable; picked up again by the next scan or event
+
+
+def run_job(job: dict, processed_dir: str, owner: str | None = None) -> dict | None:
+    """Process a running job and record the outcome in the job store.
+
+    The file is first claimed for owner (utils.claims), so workers of other
+    daemons or hosts sharing the watch directory never analyze it too.
+    Returns the result, or None if the file is gone (claimed elsewhere, or
+    removed) and the job was dropped. A failure puts the file back, is
+    recorded as a failed attempt (retried or dead-lettered) and re-raised.
+    """
+    fpath = job["path"]
+    claimed = claims.claim(fpath, owner or claims.owner_name())
+    if claimed is None:
+        job_store.discard(job["id"])
+        return None
+    try:
+        output = _process_file(claimed, processed_dir, job, os.path.basename(fpath))
+    except Exception as exc:
+        claims.unclaim(claimed, fpath)
+        job_store.fail(job["id"], f"{type(exc).__name__}: {exc}")
+        raise
+    job_store.finish(job["id"])
     return output
 
 
+def watch_files(watch_dir: str, stop_event: threading.Event, poll_interval: float = 5) -> Iterator[list[str]]:
+    """Yield batches of candidate files in watch_dir until stop_event is set.
+
+    The first batch is every file already there. After that, on Linux, files
+    are yielded as soon as they are closed after writing or moved into
+    watch_dir (inotify), with an empty batch at least every
+    STOP_CHECK_SECONDS; elsewhere, or with WATCHER_MODE=poll, the directory
+    is rescanned every poll_interval seconds.
+
+    inotify only sees changes made through this host's kernel: files written
+    into a shared NFS/SMB watch directory by other hosts (or restored there
+    by their reclaim_expired()) raise no event. So in inotify mode the whole
+    directory is still rescanned every poll_interval seconds as well.
+    """
+    os.makedirs(watch_dir, exist_ok=True)
+    watch = _open_watch(watch_dir)
+    try:
+        yield _get_pending_files(watch_dir)
+        last_scan = time.time()
+        while not stop_event.is_set():
+            if watch is None:
+                stop_event.wait(timeout=poll_interval)
+                yield _get_pending_files(watch_dir)
+                continue
+
+            names, overflowed = watch.read(timeout=min(poll_interval, STOP_CHECK_SECONDS))
+            if overflowed or time.time() - last_scan >= poll_interval:
+                yield _get_pending_files(watch_dir)
+                last_scan = time.time()
+            else:
+                yield [
+                    os.path.join(watch_dir, fname)
+                    for fname in dict.fromkeys(names)
+                    if _is_log_file(fname) and os.path.isfile(os.path.join(watch_dir, fname))
+                ]
+    finally:
+        if watch is not None:
+            watch.close()
+
+
 def start_watcher(
     watch_dir: str,
     processed_dir: str,
     stop_event: threading.Event,
     poll_interval: int = 5,
+    correlator: StreamingCorrelator | None = None,
+    deployment: str = "default",
 ) -> None:
-    """Poll watch_dir for new files and process them. Runs until stop_event is set."""
-    os.makedirs(watch_dir, exist_ok=True)
+    """Watch watch_dir for new files and process them in this process. Runs until stop_event is set.
+
+    Files are picked up by watch_files(). Every new file becomes a job in
+    the durable job store (utils.job_store), keyed by its content hash: a
+    file whose content was already seen is moved to processed_dir as a
+    duplicate without being analyzed. Failed files are retried with backoff
+    and dead-lettered after JOB_MAX_ATTEMPTS; jobs interrupted by a crash
+    are requeued when the watcher starts. Files are claimed before they are
+    analyzed (utils.claims), so several watchers or worker daemons, also on
+    different hosts, can share one watch directory.
+
+    Due jobs go through a bounded priority queue to WATCHER_WORKERS worker
+    threads, files with the most CRITICAL/ERROR lines first; when the queue
+    (WATCHER_QUEUE_SIZE) is full the watcher waits before accepting more.
+    The worker daemon (python -m worker) runs the same jobs in separate processes.
+
+    Parsed entries of every processed file are also fed to a streaming
+    correlator so cascades spanning several files of the same deployment
+    get their own root cause analysis as their correlation window closes.
+    """
+    global _active_pool
     os.makedirs(processed_dir, exist_ok=True)
+    correlator = correlator or StreamingCorrelator()
+    lock = threading.Lock()
+    in_flight: dict[str, int] = {}  # path -> job id, submitted and not finished
+    seen: dict[str, tuple[int, int]] = {}
 
-    while not stop_event.is_set():
+    claims.reclaim_expired(watch_dir)
+    job_store.recover()
+    claims.start_keep_alive(watch_dir, claims.owner_name(), stop_event)
+
+    def handle(fpath: str) -> None:
+        with lock:
+            job_id = in_flight[fpath]
         try:
-            pending = _get_pending_files(watch_dir, processed_dir)
-            for fpath in pending:
-                if stop_event.is_set():
-                    break
-                try:
-                    _process_file(fpath, processed_dir)
-                except Exception:
-                    # Bad file should not crash the watcher
-                    pass
-        except Exception:
-            pass
+            if not job_store.start(job_id):
+                return
+            output = run_job(job_store.get(job_id), processed_dir)
+        finally:
+            with lock:
+                in_flight.pop(fpath, None)
+        with lock:
+            seen.pop(fpath, None)
+            closed = correlator.add(output["log_entries"], deployment, output["filename"]) if output else []
+        analyze_clusters(closed)
+
+    def dispatch() -> None:
+        # Worst files first, even beyond what fits in the queue; retries once their backoff ran out
+        for job in job_store.due():
+            with lock:
+                if job["path"] in in_flight:
+                    continue
+                in_flight[job["path"]] = job["id"]
+            # Blocks while the queue is full (backpressure)
+            if not pool.submit(job["path"], stop_event, (job["critical_count"], job["error_count"])):
+                with lock:
+                    in_flight.pop(job["path"], None)
+                break
+
+    pool = WorkerPool(handle, workers=_get_workers(), max_queue=_get_queue_size()).start()
+    _active_pool = pool
+
+    def cycle(paths: list[str]) -> None:
+        enqueue_files(paths, processed_dir, seen)
+        dispatch()
+        claims.reclaim_expired(watch_dir)
+        with lock:
+            expired = correlator.expire(CORRELATOR_IDLE_SECONDS)
+        analyze_clusters(expired)
+
+    try:
+        while not stop_event.is_set():
+            try:
+                retry: list[str] = []
+                for paths in watch_files(watch_dir, stop_event, poll_interval):
+                    paths = list(dict.fromkeys(retry + paths))
+                    try:
+                        cycle(paths)
+                        retry = []
+                    except Exception:
+                        # e.g. "database is locked": a failed cycle must not end the watcher;
+                        # its files are looked at again in the next one
+                        log.exception("Watcher cycle failed; retrying on the next one")
+                        retry = paths
+            except Exception:
+                log.exception("Watching %s failed; restarting the watch", watch_dir)
+                stop_event.wait(timeout=poll_interval)
+    finally:
+        pool.shutdown(timeout=WORKER_SHUTDOWN_SECONDS)
+        if _active_pool is pool:
+            _active_pool = None
+
+
+def queue_stats() -> dict | None:
+    """Worker pool statistics of the running watcher, or None if it is stopped."""
+    pool = _active_pool
+    return pool.stats() if pool is not None else None
+
+
+def follow_patterns() -> list[str]:
+    """Comma-separated globs of continuously appended log files to follow (FOLLOW_PATHS)."""
+    return [p.strip() for p in os.getenv("FOLLOW_PATHS", "").split(",") if p.strip()]
+
+
+def start_follower(
+    stop_event: threading.Event,
+    patterns: list[str] | None = None,
+    poll_interval: float = 0.5,
+    correlator: StreamingCorrelator | None = None,
+    deployment: str = "default",
+) -> None:
+    """Follow growing log files (tail -F) and analyze new lines in micro-batches.
+
+    Each batch of a file (FOLLOW_BATCH_LINES lines, or FOLLOW_BATCH_SECONDS
+    after its first line) runs through the pipeline, is saved with source
+    "follow" and is fed to the streaming correlator. Offsets are committed
+    after the batch was saved, so a restart resumes where delivery stopped;
+    a batch that fails is retried with backoff before its file is read on.
+    """
+    from utils.results_store import save_result
+
+    follower = FileFollower(
+        patterns if patterns is not None else follow_patterns(),
+        batch_lines=int(os.getenv("FOLLOW_BATCH_LINES", "500")),
+        batch_seconds=float(os.getenv("FOLLOW_BATCH_SECONDS", "10")),
+    )
+    correlator = correlator or StreamingCorrelator()
+
+    def deliver(batches: list[Batch]) -> None:
+        for batch in batches:
+            name = os.path.basename(batch.path)
+            try:
+                output = analyze_text("\n".join(batch.lines), name)
+                save_result(output, name, source="follow")
+            except Exception:
+                log.exception("Follow batch of %s failed; retrying with backoff", batch.path)
+                follower.fail(batch)  # Retried with backoff; not committed until delivered
+                continue
+            follower.commit(batch)
+            try:
+                analyze_clusters(correlator.add(output["log_entries"], deployment, name))
+            except Exception:
+                # The batch itself is saved; the rest of this poll's batches must still be delivered
+                log.exception("Cross-file correlation of a follow batch of %s failed", batch.path)
 
-        stop_event.wait(timeout=poll_interval)
+    try:
+        while not stop_event.is_set():
+            try:
+                deliver(follower.poll())
+                analyze_clusters(correlator.expire(CORRELATOR_IDLE_SECONDS))
+            except Exception:
+                log.exception("Follow cycle failed; retrying on the next one")
+            stop_event.wait(timeout=poll_interval)
+        deliver(follower.flush())
+    finally:
+        follower.close()
 
 
 def stop_watcher(stop_event: threading.Event) -> None:
@@ -0,0 +1,125 @@
+"""Work queue — bounded, prioritized worker pool for the live folder watcher.
+
+Files are pre-scanned cheaply (byte counts of CRITICAL/ERROR) and analyzed
+worst-first by a fixed number of worker threads. The queue is bounded:
+`submit` blocks while it is full, which stops the watcher from accepting
+more files until workers catch up (backpressure). Queue depth, wait times
+and worker utilization are exposed through `stats()` for the UI.
+"""
+
+from __future__ import annotations
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from utils.compressed import open_log
+
+# Bytes read by the priority pre-scan; a huge file is ranked on its head
+PRESCAN_BYTES = 8 * 1024 * 1024
+
+# Recent queue waits kept for the mean/max shown in the UI
+WAIT_HISTORY = 200
+
+
+def prescan_priority(path: str) -> tuple[int, int]:
+    """(CRITICAL lines, ERROR lines) from a cheap byte scan of the file's (decompressed) head."""
+    try:
+        with open_log(path) as f:
+            data = f.read(PRESCAN_BYTES)
+    except Exception:
+        return 0, 0  # Unreadable or corrupt (gzip and zstd raise their own errors); the analysis reports it
+    return data.count(b"CRITICAL"), data.count(b"ERROR")
+
+
+class WorkerPool:
+    """Fixed pool of worker threads draining a bounded priority queue."""
+
+    def __init__(self, handler: Callable[[str], None], workers: int = 2, max_queue: int = 100):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self._queue: queue.PriorityQueue = queue.PriorityQueue(maxsize=max(1, max_queue))
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._waits: deque[float] = deque(maxlen=WAIT_HISTORY)
+        self._busy = 0
+        self._busy_seconds = 0.0
+        self._completed = 0
+        self._failed = 0
+        self._started_at = time.time()
+        self._stopping = threading.Event()
+
+    def start(self) -> "WorkerPool":
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"watcher-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, path: str, stop_event: threading.Event, priority: tuple[int, int] | None = None) -> bool:
+        """Queue a file, worst first; blocks while the queue is full. False if stopped first.
+
+        `priority` is the file's prescan_priority() if the caller already computed it.
+        """
+        critical, errors = priority or prescan_priority(path)
+        item = (-critical, -errors, next(self._seq), time.time(), path)
+        while not stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=1.0)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                _, _, _, enqueued_at, path = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            started = time.time()
+            with self._lock:
+                self._waits.append(started - enqueued_at)
+                self._busy += 1
+            try:
+                self.handler(path)
+                ok = True
+            except Exception:
+                ok = False  # The handler reports its own failures; keep the worker alive
+            with self._lock:
+                self._busy -= 1
+                self._busy_seconds += time.time() - started
+                self._completed += ok
+                self._failed += not ok
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """Drop queued work and stop the workers after their current file."""
+        self._stopping.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        """Queue depth, in-flight count, wait times (seconds) and worker utilization."""
+        with self._lock:
+            waits = list(self._waits)
+            elapsed = max(time.time() - self._started_at, 1e-9)
+            return {
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "in_flight": self._busy,
+                "completed": self._completed,
+                "failed": self._failed,
+                "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+                "max_wait": max(waits, default=0.0),
+                "utilization": min(self._busy_seconds / (self.workers * elapsed), 1.0),
+            }
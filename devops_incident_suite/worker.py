@@ -0,0 +1,559 @@
+"""Headless worker daemon — runs log ingestion and analysis without the Streamlit UI.
+
+    cd devops_incident_suite
+    python -m worker [--workers N] [--watch-dir DIR] [--metrics-port PORT]
+
+A supervisor process watches the live folder (utils.watcher.watch_files)
+and adds new files to the durable job store; N worker processes claim due
+jobs from the store and run the pipeline, so analysis throughput scales
+with cores rather than sharing the UI's GIL. The supervisor also runs
+follow mode (FOLLOW_PATHS), cross-file correlation of finished files,
+Slack delivery (workers forward their notifications to the supervisor's
+outbox, utils.slack_outbox) and results compaction, and with --ingest-port
+an HTTP endpoint that log shippers push to (utils.ingest); pushed lines are
+analyzed in micro-batches without going through the filesystem, except for
+a batch whose analysis failed: it is written into the watch directory and
+retried as a job. The Streamlit app only reads what the daemon stores.
+
+Several daemons, on one host or on hosts sharing the watch directory over
+a network volume, split its files between them: a worker claims a file by
+renaming it (utils.claims) before analyzing it, and files claimed by a
+worker that died are taken over once its lease expires. Each host keeps
+its own job store; a job whose file was claimed by another host is dropped.
+
+SIGINT/SIGTERM stop the daemon gracefully: no new jobs are claimed and
+workers finish their current file, for up to WORKER_SHUTDOWN_SECONDS; a
+worker still busy after that is killed and its job requeued. A worker that
+dies unexpectedly is restarted and its job requeued; one that keeps dying
+right after its start is restarted with a growing delay. A failed cycle of
+the supervisor or of the event collector is logged and does not stop the
+daemon.
+
+Health and metrics are written every HEALTH_INTERVAL seconds to
+results_history/worker_health.json (shown in the app's sidebar) and, with
+--metrics-port, served over HTTP as /health (JSON) and /metrics
+(Prometheus text format), on 127.0.0.1 unless WORKER_METRICS_HOST says
+otherwise: the health snapshot includes the host name, pid and watch
+directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ensure project root is on the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+from utils import claims, job_store, slack_outbox
+from utils.correlation import ACTIONABLE_LEVELS, StreamingCorrelator
+from utils.ingest import IngestServer
+from utils.results_store import save_result, start_compactor
+from utils.watcher import (
+    CORRELATOR_IDLE_SECONDS, STOP_CHECK_SECONDS, WORKER_SHUTDOWN_SECONDS,
+    analyze_clusters, analyze_text, enqueue_files, follow_patterns, run_job, start_follower, watch_files,
+)
+
+load_dotenv()
+
+log = logging.getLogger(__name__)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEALTH_PATH = os.path.join(_APP_DIR, "results_history", "worker_health.json")
+
+# Seconds between health file writes; the app treats a heartbeat older than STALE_HEALTH_SECONDS as down
+HEALTH_INTERVAL = 5
+STALE_HEALTH_SECONDS = 30
+
+# Seconds an idle worker waits before looking for due jobs again
+IDLE_WAIT = 0.5
+
+# Delay before restarting a worker that died, doubling while it keeps dying within
+# RESTART_STABLE_SECONDS of its start (e.g. a broken install), up to RESTART_MAX_SECONDS
+RESTART_BASE_SECONDS = 1.0
+RESTART_MAX_SECONDS = 60.0
+RESTART_STABLE_SECONDS = 60.0
+
+
+def _get_processes() -> int:
+    return int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 2)))
+
+
+def _get_metrics_port() -> int:
+    """Port for the /health and /metrics endpoints; 0 disables them."""
+    return int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+
+def _get_metrics_host() -> str:
+    """Interface the /health and /metrics endpoints listen on."""
+    return os.getenv("WORKER_METRICS_HOST", "127.0.0.1")
+
+
+def _get_ingest_port() -> int:
+    """Port of the HTTP ingestion endpoint; 0 disables it."""
+    return int(os.getenv("INGEST_PORT", "0"))
+
+
+def _ingest_server(analyze, spill, port: int) -> IngestServer:
+    return IngestServer(
+        analyze,
+        spill,
+        host=os.getenv("INGEST_HOST", "127.0.0.1"),
+        port=port,
+        batch_lines=int(os.getenv("INGEST_BATCH_LINES", "500")),
+        batch_seconds=float(os.getenv("INGEST_BATCH_SECONDS", "5")),
+        max_buffered_bytes=int(float(os.getenv("INGEST_MAX_BUFFER_MB", "64")) * 1024 * 1024),
+        workers=int(os.getenv("INGEST_WORKERS", "4")),
+    )
+
+
+def _worker_main(index: int, watch_dir: str, processed_dir: str, stop, events) -> None:
+    """Worker process: claim due jobs and run them until stop is set."""
+    # The supervisor handles signals and tells workers to stop after their current job
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    name = claims.owner_name()
+    # One outbox in the supervisor coalesces, dedupes and rate limits the notifications of all workers
+    slack_outbox.set_forwarder(lambda message: events.put(("notify", index, message)))
+    beat_stop = threading.Event()
+    claims.start_keep_alive(watch_dir, name, beat_stop)
+
+    while not stop.is_set():
+        job = job_store.claim(name)
+        if job is None:
+            stop.wait(IDLE_WAIT)
+            continue
+        events.put(("start", index, job["filename"]))
+        started = time.time()
+        try:
+            output = run_job(job, processed_dir, name)
+        except Exception:
+            events.put(("failed", index, time.time() - started))
+            continue  # Recorded on the job by run_job(): retried or dead-lettered
+        if output is None:
+            events.put(("skipped", index))  # Claimed by another daemon or host
+            continue
+        # The correlator only keeps actionable entries: don't pickle the rest across processes
+        entries = [e for e in output["log_entries"] if e.get("level") in ACTIONABLE_LEVELS]
+        events.put(("done", index, time.time() - started, job["filename"], entries))
+    beat_stop.set()
+
+
+def load_health() -> dict | None:
+    """The daemon's last health snapshot, or None if it never ran."""
+    try:
+        with open(HEALTH_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _prometheus(health: dict) -> str:
+    lines = [
+        "# TYPE incident_worker_up gauge",
+        "# TYPE incident_worker_jobs_total counter",
+        "# TYPE incident_worker_busy_seconds_total counter",
+        "# TYPE incident_worker_restarts_total counter",
+        "# TYPE incident_worker_skipped_total counter",
+    ]
+    for w in health["workers"]:
+        label = f'worker="{w["index"]}"'
+        lines += [
+            f"incident_worker_up{{{label}}} {int(w['alive'])}",
+            f'incident_worker_jobs_total{{{label},outcome="done"}} {w["jobs_done"]}',
+            f'incident_worker_jobs_total{{{label},outcome="failed"}} {w["jobs_failed"]}',
+            f"incident_worker_busy_seconds_total{{{label}}} {w['busy_seconds']:.3f}",
+            f"incident_worker_restarts_total{{{label}}} {w['restarts']}",
+            f"incident_worker_skipped_total{{{label}}} {w['jobs_skipped']}",
+        ]
+    lines.append("# TYPE incident_jobs gauge")
+    lines += [f'incident_jobs{{state="{state}"}} {count}' for state, count in health["jobs"].items()]
+    lines.append("# TYPE incident_claimed_files gauge")
+    lines += [f'incident_claimed_files{{owner="{owner}"}} {count}' for owner, count in health["claimed"].items()]
+    lines += [
+        "# TYPE incident_worker_utilization gauge",
+        f"incident_worker_utilization {health['utilization']:.4f}",
+        "# TYPE incident_daemon_uptime_seconds gauge",
+        f"incident_daemon_uptime_seconds {health['uptime_seconds']:.0f}",
+    ]
+    slack = health.get("slack")
+    if slack:
+        lines.append("# TYPE incident_slack_notifications_total counter")
+        lines += [
+            f'incident_slack_notifications_total{{outcome="{outcome}"}} {slack[outcome]}'
+            for outcome in ("queued", "deduplicated", "coalesced", "sent", "failed", "retries")
+        ]
+        lines += ["# TYPE incident_slack_pending gauge", f"incident_slack_pending {slack['pending']}"]
+    ingest = health.get("ingest")
+    if ingest:
+        lines += [
+            "# TYPE incident_ingest_lines_total counter",
+            f"incident_ingest_lines_total {ingest['lines']}",
+            "# TYPE incident_ingest_rejected_total counter",
+            f"incident_ingest_rejected_total {ingest['rejected']}",
+            "# TYPE incident_ingest_buffered_bytes gauge",
+            f"incident_ingest_buffered_bytes {ingest['buffered_bytes']}",
+            "# TYPE incident_ingest_batch_latency_p95_seconds gauge",
+            f"incident_ingest_batch_latency_p95_seconds {ingest['batch_latency']['p95']:.3f}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        health = self.server.worker_daemon.health()
+        if self.path == "/health":
+            status = 200 if health["status"] == "running" else 503
+            body, ctype = json.dumps(health).encode(), "application/json"
+        elif self.path == "/metrics":
+            status, body, ctype = 200, _prometheus(health).encode(), "text/plain; version=0.0.4"
+        else:
+            status, body, ctype = 404, b"not found\n", "text/plain"
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass  # Scraped every few seconds; don't flood the daemon's output
+
+
+class WorkerDaemon:
+    """Supervisor: file discovery, N worker processes, correlation, health."""
+
+    def __init__(
+        self,
+        watch_dir: str,
+        processed_dir: str,
+        processes: int,
+        poll_interval: float = 5,
+        deployment: str = "default",
+        metrics_port: int = 0,
+        metrics_host: str = "127.0.0.1",
+        ingest_port: int = 0,
+    ):
+        self.watch_dir = watch_dir
+        self.processed_dir = processed_dir
+        self.processes = max(1, processes)
+        self.poll_interval = poll_interval
+        self.deployment = deployment
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+        self.ingest = _ingest_server(self._analyze_pushed, self._spill_pushed, ingest_port) if ingest_port else None
+        # spawn: workers must not inherit the supervisor's threads and SQLite connections
+        self._ctx = mp.get_context("spawn")
+        self._worker_stop = self._ctx.Event()
+        self._events = self._ctx.Queue()
+        self.stop_event = threading.Event()
+        self._collector_done = threading.Event()
+        self._lock = threading.Lock()
+        self._slots: list[dict] = []
+        self._spill_seq = itertools.count(1)
+        self.started_at = time.time()
+        self.status = "starting"
+
+    def _spawn(self, index: int) -> mp.Process:
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.watch_dir, self.processed_dir, self._worker_stop, self._events),
+            name=f"incident-worker-{index}",
+        )
+        proc.start()
+        return proc
+
+    def _check_workers(self) -> None:
+        """Requeue the job of a worker that died and start a replacement, with backoff."""
+        now = time.time()
+        for slot in self._slots:
+            proc = slot["process"]
+            if proc.is_alive() or self.stop_event.is_set():
+                continue
+            if slot["restart_at"] is None:
+                log.warning("Worker %d (pid %s) exited with code %s", slot["index"], proc.pid, proc.exitcode)
+                # Its claimed file goes back into the watch directory before the job is due again
+                claims.reclaim_expired(self.watch_dir)
+                job_store.release(claims.owner_name(proc.pid))
+                if now - slot["started_at"] < RESTART_STABLE_SECONDS:
+                    slot["quick_deaths"] += 1
+                else:
+                    slot["quick_deaths"] = 0
+                delay = min(RESTART_BASE_SECONDS * 2 ** max(slot["quick_deaths"] - 1, 0), RESTART_MAX_SECONDS)
+                slot["restart_at"] = now + delay
+                with self._lock:
+                    slot["current"] = None
+            if now < slot["restart_at"]:
+                continue
+            with self._lock:
+                slot["restarts"] += 1
+                slot["process"] = self._spawn(slot["index"])
+                slot["started_at"], slot["restart_at"] = time.time(), None
+
+    def _collect(self) -> None:
+        """Record worker events and feed finished files to the streaming correlator."""
+        correlator = StreamingCorrelator()
+        while True:
+            try:
+                event = self._events.get(timeout=STOP_CHECK_SECONDS)
+            except queue.Empty:
+                if self._collector_done.is_set():
+                    break
+                try:
+                    analyze_clusters(correlator.expire(CORRELATOR_IDLE_SECONDS))
+                except Exception:
+                    log.exception("Cross-file correlation of expired windows failed")
+                continue
+            try:
+                self._handle_event(correlator, event)
+            except Exception:
+                # One bad event (e.g. "database is locked" while saving clusters) must not end the collector
+                log.exception("Handling worker event %r failed", event[0])
+
+    def _handle_event(self, correlator: StreamingCorrelator, event: tuple) -> None:
+        kind, index, *rest = event
+        if kind == "notify":
+            slack_outbox.submit_message(rest[0])
+            return
+        if kind == "ingested":
+            filename, entries = rest
+            analyze_clusters(correlator.add(entries, self.deployment, filename))
+            return
+        with self._lock:
+            slot = self._slots[index]
+            if kind == "start":
+                slot["current"], slot["current_since"] = rest[0], time.time()
+            elif kind == "skipped":
+                slot["current"] = None
+                slot["jobs_skipped"] += 1
+            else:
+                slot["current"] = None
+                slot["busy_seconds"] += rest[0]
+                slot["jobs_done" if kind == "done" else "jobs_failed"] += 1
+        if kind == "done":
+            _, filename, entries = rest
+            analyze_clusters(correlator.add(entries, self.deployment, filename))
+
+    def _analyze_pushed(self, source: str, lines: list[str]) -> None:
+        """Analyze one micro-batch pushed over HTTP (runs on the ingest server's thread pool)."""
+        name = f"http:{source}"
+        output = analyze_text("\n".join(lines), name)
+        save_result(output, name, source="http")
+        self._events.put(("ingested", None, name, output["log_entries"]))
+
+    def _spill_pushed(self, source: str, lines: list[str]) -> None:
+        """Write a pushed batch whose analysis failed into the watch directory.
+
+        It is then picked up like any dropped file: queued as a job, and
+        retried or dead-lettered by the job store.
+        """
+        fname = f"http-{source}-{time.strftime('%Y%m%d_%H%M%S')}-{next(self._spill_seq)}.log"
+        os.makedirs(self.watch_dir, exist_ok=True)
+        tmp_path = os.path.join(self.watch_dir, f".{fname}.tmp")  # Not a log file until renamed
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, os.path.join(self.watch_dir, fname))
+
+    def health(self) -> dict:
+        now = time.time()
+        with self._lock:
+            workers = [
+                {
+                    "index": slot["index"],
+                    "pid": slot["process"].pid,
+                    "alive": slot["process"].is_alive(),
+                    "current": slot["current"],
+                    "current_seconds": round(now - slot["current_since"], 1) if slot["current"] else 0.0,
+                    "jobs_done": slot["jobs_done"],
+                    "jobs_failed": slot["jobs_failed"],
+                    "jobs_skipped": slot["jobs_skipped"],
+                    "busy_seconds": round(slot["busy_seconds"], 3),
+                    "restarts": slot["restarts"],
+                }
+                for slot in self._slots
+            ]
+        uptime = max(now - self.started_at, 1e-9)
+        done = sum(w["jobs_done"] for w in workers)
+        return {
+            "status": self.status,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "started_at": self.started_at,
+            "heartbeat_at": now,
+            "uptime_seconds": round(uptime, 1),
+            "watch_dir": self.watch_dir,
+            "follow_patterns": follow_patterns(),
+            "processes": self.processes,
+            "workers": workers,
+            "jobs": job_store.counts(),
+            "claimed": claims.claimed_counts(self.watch_dir),
+            "jobs_done": done,
+            "jobs_failed": sum(w["jobs_failed"] for w in workers),
+            "files_per_minute": round(done * 60 / uptime, 2),
+            "utilization": min(sum(w["busy_seconds"] for w in workers) / (self.processes * uptime), 1.0),
+            "ingest": self.ingest.stats() if self.ingest else None,
+            "slack": slack_outbox.outbox_stats(),
+        }
+
+    def _write_health(self) -> None:
+        os.makedirs(os.path.dirname(HEALTH_PATH), exist_ok=True)
+        tmp_path = f"{HEALTH_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.health(), f, indent=2)
+        os.replace(tmp_path, HEALTH_PATH)
+
+    def _start_thread(self, target, *args) -> threading.Thread:
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+    def run(self) -> None:
+        """Run until SIGINT/SIGTERM (or stop_event), then shut down gracefully."""
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: self.stop_event.set())
+        os.makedirs(self.processed_dir, exist_ok=True)
+        claims.reclaim_expired(self.watch_dir)
+        job_store.recover()
+
+        self._slots = [
+            {
+                "index": i, "process": self._spawn(i), "current": None, "current_since": 0.0,
+                "jobs_done": 0, "jobs_failed": 0, "jobs_skipped": 0, "busy_seconds": 0.0, "restarts": 0,
+                "started_at": time.time(), "restart_at": None, "quick_deaths": 0,
+            }
+            for i in range(self.processes)
+        ]
+        collector = self._start_thread(self._collect)
+        self._start_thread(start_compactor, self.stop_event)
+        if follow_patterns():
+            self._start_thread(start_follower, self.stop_event)
+        ingest = self._start_thread(self.ingest.run, self.stop_event) if self.ingest else None
+        server = None
+        if self.metrics_port:
+            server = ThreadingHTTPServer((self.metrics_host, self.metrics_port), _HealthHandler)
+            server.worker_daemon = self
+            self._start_thread(server.serve_forever)
+
+        self.status = "running"
+        seen: dict[str, tuple[int, int]] = {}
+        last_health = 0.0
+
+        def cycle(paths: list[str]) -> None:
+            nonlocal last_health
+            self._check_workers()
+            enqueue_files(paths, self.processed_dir, seen)
+            if time.time() - last_health >= HEALTH_INTERVAL:
+                for path in [p for p in seen if not os.path.exists(p)]:
+                    del seen[path]  # Processed and moved
+                claims.reclaim_expired(self.watch_dir)  # Files of dead workers on other hosts
+                self._write_health()
+                last_health = time.time()
+
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    retry: list[str] = []
+                    for paths in watch_files(self.watch_dir, self.stop_event, self.poll_interval):
+                        paths = list(dict.fromkeys(retry + paths))
+                        try:
+                            cycle(paths)
+                            retry = []
+                        except Exception:
+                            # e.g. "database is locked": the supervisor keeps running and
+                            # looks at the cycle's files again in the next one
+                            log.exception("Supervisor cycle failed; retrying on the next one")
+                            retry = paths
+                except Exception:
+                    log.exception("Watching %s failed; restarting the watch", self.watch_dir)
+                    self.stop_event.wait(timeout=self.poll_interval)
+        finally:
+            self._shutdown(collector, server, ingest)
+
+    def _shutdown(
+        self, collector: threading.Thread, server: ThreadingHTTPServer | None, ingest: threading.Thread | None
+    ) -> None:
+        self.status = "stopping"
+        self.stop_event.set()
+        self._worker_stop.set()
+        self._write_health()
+
+        deadline = time.time() + WORKER_SHUTDOWN_SECONDS
+        for slot in self._slots:
+            slot["process"].join(max(0.0, deadline - time.time()))
+        for slot in self._slots:
+            proc = slot["process"]
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        # Jobs of workers killed here, or that died just before: file back first, then the job
+        claims.reclaim_expired(self.watch_dir)
+        for slot in self._slots:
+            job_store.release(claims.owner_name(slot["process"].pid))
+
+        if ingest is not None:
+            ingest.join(timeout=WORKER_SHUTDOWN_SECONDS)  # Flushes buffered pushes first
+        self._collector_done.set()
+        collector.join(timeout=WORKER_SHUTDOWN_SECONDS)
+        slack_outbox.close()
+        if server is not None:
+            server.shutdown()
+        self.status = "stopped"
+        self._write_health()
+
+
+def main(argv: list[str] | None = None) -> int:
+    watch_default = os.path.join(_APP_DIR, "live_logs")
+    parser = argparse.ArgumentParser(prog="python -m worker", description=__doc__.split("\n")[0])
+    parser.add_argument("--watch-dir", default=watch_default, help="directory to watch (default: live_logs/)")
+    parser.add_argument("--processed-dir", help="where processed files go (default: <watch-dir>/processed)")
+    parser.add_argument("--workers", type=int, default=_get_processes(), help="worker processes (WORKER_PROCESSES)")
+    parser.add_argument("--poll-interval", type=float, default=5, help="seconds between rescans when polling")
+    parser.add_argument("--deployment", default="default", help="deployment name for cross-file correlation")
+    parser.add_argument(
+        "--metrics-port", type=int, default=_get_metrics_port(), help="serve /health and /metrics (WORKER_METRICS_PORT)"
+    )
+    parser.add_argument(
+        "--ingest-port", type=int, default=_get_ingest_port(), help="accept HTTP log pushes (INGEST_PORT)"
+    )
+    parser.add_argument(
+        "--health", action="store_true", help="print the running daemon's health and exit 1 if it is down"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.health:
+        health = load_health()
+        print(json.dumps(health, indent=2))
+        fresh = health and health["status"] == "running" and time.time() - health["heartbeat_at"] < STALE_HEALTH_SECONDS
+        return 0 if fresh else 1
+
+    daemon = WorkerDaemon(
+        args.watch_dir,
+        args.processed_dir or os.path.join(args.watch_dir, "processed"),
+        args.workers,
+        poll_interval=args.poll_interval,
+        deployment=args.deployment,
+        metrics_port=args.metrics_port,
+        metrics_host=_get_metrics_host(),
+        ingest_port=args.ingest_port,
+    )
+    print(f"Worker daemon: {daemon.processes} workers watching {daemon.watch_dir} (pid {os.getpid()})", flush=True)
+    daemon.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())